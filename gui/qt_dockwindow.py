@@ -1,5 +1,6 @@
-from PyQt4 import QtGui
+from PyQt4 import QtGui, QtCore
 from PyQt4.QtCore import pyqtSlot, pyqtSignal, Qt, QObject, QEvent
+import numpy as np
 from helpers import Struct
 from xmlreader import XMLReader
 from xmlwriter import XMLWriter
@@ -456,3 +457,170 @@ class DockManager(QObject):
                 dock.expand()
                 self.active_right = dock
             
+
+class StatsDock(QtGui.QDockWidget):
+    """Shows the step timings of the simulator, see
+       :meth:`simulator.Simulator.get_stats`"""
+
+    def __init__(self, parent):
+        QtGui.QDockWidget.__init__(self, "Performance", parent)
+        self.setAllowedAreas(Qt.LeftDockWidgetArea | Qt.RightDockWidgetArea | Qt.BottomDockWidgetArea)
+
+        self.__tree = QtGui.QTreeWidget(self)
+        self.__tree.setColumnCount(5)
+        self.__tree.setHeaderLabels(["Phase", "Mean, ms", "p95, ms", "Max, ms", "Count"])
+        self.__tree.setRootIsDecorated(True)
+        self.setWidget(self.__tree)
+
+    def __add_phases(self, parent, phases):
+        for phase, summary in sorted(phases.items()):
+            if summary is None:
+                continue
+            QtGui.QTreeWidgetItem(parent,
+                [phase] +
+                ["{:.3f}".format(1000*summary[key]) for key in ('mean', 'p95', 'max')] +
+                [str(summary['count'])])
+
+    def update_stats(self, stats):
+        """Show the *stats* dictionary from a ``stats`` event"""
+        self.__tree.clear()
+        self.__add_phases(self.__tree, stats['phases'])
+        for i, phases in enumerate(stats['robots']):
+            item = QtGui.QTreeWidgetItem(self.__tree, ["Robot {}".format(i+1)])
+            self.__add_phases(item, phases)
+            item.setExpanded(True)
+        if stats.get('counters'):
+            item = QtGui.QTreeWidgetItem(self.__tree, ["Counts per step", "Mean", "p95", "Max", "Total"])
+            for name, summary in sorted(stats['counters'].items()):
+                QtGui.QTreeWidgetItem(item,
+                    [name] +
+                    ["{:.1f}".format(summary[key]) for key in ('mean', 'p95', 'max')] +
+                    [str(stats['counter_totals'][name])])
+            item.setExpanded(True)
+        for column in range(self.__tree.columnCount()):
+            self.__tree.resizeColumnToContents(column)
+
+class AnalyticsDock(QtGui.QDockWidget):
+    """Shows the metrics of the run of every robot, see
+       :meth:`simulator.Simulator.get_analytics`"""
+
+    def __init__(self, parent):
+        QtGui.QDockWidget.__init__(self, "Run analytics", parent)
+        self.setAllowedAreas(Qt.LeftDockWidgetArea | Qt.RightDockWidgetArea | Qt.BottomDockWidgetArea)
+
+        self.__tree = QtGui.QTreeWidget(self)
+        self.__tree.setColumnCount(2)
+        self.__tree.setHeaderLabels(["Metric", "Value"])
+        self.__tree.setRootIsDecorated(True)
+        self.setWidget(self.__tree)
+
+    def update_analytics(self, analytics):
+        """Show the *analytics* list from an ``analytics`` event"""
+        def value(v, unit):
+            return "-" if v is None else "{:.3f} {}".format(v, unit)
+
+        self.__tree.clear()
+        for i, summary in enumerate(analytics):
+            if summary is None:
+                continue
+            item = QtGui.QTreeWidgetItem(self.__tree, ["Robot {}".format(i+1)])
+            for name, text in (
+                    ("Path length", value(summary['path_length'], "m")),
+                    ("Minimal clearance", value(summary['clearance']['min'], "m")),
+                    ("Mean clearance", value(summary['clearance']['mean'], "m")),
+                    ("Time to goal", value(summary['time_to_goal'], "s")),
+                    ("Maximal drift", value(summary['drift']['max'], "m")),
+                    ("Final drift", value(summary['drift']['final'], "m")),
+                    ("Controller switches", str(summary['switches']))):
+                QtGui.QTreeWidgetItem(item, [name, text])
+            for name, t in sorted(summary['controller_time'].items()):
+                QtGui.QTreeWidgetItem(item, ["Time in " + name, value(t, "s")])
+            item.setExpanded(True)
+        for column in range(self.__tree.columnCount()):
+            self.__tree.resizeColumnToContents(column)
+
+class SignalPlot(QtGui.QWidget):
+    """Plots the decimated history of the supervisor signals of a robot,
+       one strip per signal, as the band between the minimum and the
+       maximum of every time bucket"""
+
+    colors = (0x55AAEE, 0x66BB22, 0xFFBB22, 0xCC66AA,
+              0x77CCAA, 0xFF7711, 0xFF5555, 0x55CC88, 0x8855CC)
+
+    def __init__(self, parent):
+        QtGui.QWidget.__init__(self, parent)
+        self.setMinimumSize(200, 120)
+        self.__signals = None
+
+    def set_signals(self, signals):
+        """Show an entry of a ``signals`` event"""
+        self.__signals = signals
+        self.update()
+
+    def paintEvent(self, event):
+        painter = QtGui.QPainter(self)
+        painter.fillRect(self.rect(), Qt.white)
+        if self.__signals is None or len(self.__signals['times']) == 0:
+            painter.drawText(self.rect(), Qt.AlignCenter, "No signals")
+            return
+
+        times = self.__signals['times'].mean(axis=1)
+        t0, t1 = times[0], max(times[-1], times[0] + 1e-9)
+        names = self.__signals['names']
+        strip = float(self.height())/len(names)
+        channel = 0
+        for row, (name, length) in enumerate(names):
+            top = row*strip
+            channels = range(channel, channel + max(length, 1))
+            channel = channels[-1] + 1
+            mins = self.__signals['mins'][:,channels]
+            maxs = self.__signals['maxs'][:,channels]
+            low, high = np.nanmin(mins), np.nanmax(maxs)
+            if np.isnan(low):
+                low, high = 0.0, 1.0
+            if high - low < 1e-9:
+                low, high = low - 0.5, high + 0.5
+
+            def x(t):
+                return (t - t0)/(t1 - t0)*(self.width() - 1)
+            def y(v):
+                return top + 2 + (high - v)/(high - low)*(strip - 16)
+
+            painter.setPen(QtGui.QColor(0xC0C0C0))
+            painter.drawLine(0, int(top + strip - 1), self.width(), int(top + strip - 1))
+            for k, c in enumerate(channels):
+                color = QtGui.QColor(self.colors[k % len(self.colors)])
+                valid = ~np.isnan(mins[:,k])
+                if not valid.any():
+                    continue
+                band = QtGui.QPolygonF(
+                    [QtCore.QPointF(x(t), y(v)) for t, v in zip(times[valid], maxs[valid,k])] +
+                    [QtCore.QPointF(x(t), y(v)) for t, v in reversed(zip(times[valid], mins[valid,k]))])
+                color.setAlpha(160)
+                painter.setPen(color)
+                color.setAlpha(80)
+                painter.setBrush(color)
+                painter.drawPolygon(band)
+            painter.setPen(Qt.black)
+            painter.drawText(QtCore.QRectF(4, top + strip - 15, self.width() - 8, 14),
+                Qt.AlignLeft, name)
+            painter.drawText(QtCore.QRectF(4, top + strip - 15, self.width() - 8, 14),
+                Qt.AlignRight, "{:.3g} .. {:.3g}".format(low, high))
+
+class PlotDock(QtGui.QDockWidget):
+    """Shows the supervisor signals of a robot over time, see
+       :meth:`simulator.Simulator.get_signals`"""
+
+    def __init__(self, parent, robot):
+        QtGui.QDockWidget.__init__(self, "Robot {}: signals".format(robot + 1), parent)
+        self.setAllowedAreas(Qt.LeftDockWidgetArea | Qt.RightDockWidgetArea | Qt.BottomDockWidgetArea)
+        self.__plot = SignalPlot(self)
+        self.setWidget(self.__plot)
+
+    def get_plot_width(self):
+        """Get the width of the plot in pixels"""
+        return self.__plot.width()
+
+    def update_signals(self, signals):
+        """Show an entry of a ``signals`` event"""
+        self.__plot.set_signals(signals)
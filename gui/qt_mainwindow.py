@@ -7,9 +7,11 @@ sys.path.insert(0, './scripts')
 from PyQt4 import QtGui, QtCore
 import os
 from qt_renderer import QtRenderer
-from qt_dockwindow import ParamDock, DockManager
+from qt_dockwindow import ParamDock, DockManager, StatsDock, PlotDock, AnalyticsDock
 
 import simulator as sim
+from eventlog import INFO, WARNING
+from simprocess import SimulatorProcess
 import Queue as queue
 from traceback import format_exception
 
@@ -50,7 +52,7 @@ class PlayPauseAction(QtGui.QAction):
         self.setStatusTip(actset[3])
 
 class SimulationWidget(QtGui.QMainWindow):
-    def __init__(self,parent=None):
+    def __init__(self,parent=None,backend='thread'):
         QtGui.QMainWindow.__init__(self,parent)
         self.setWindowTitle("QtSimiam")
         self.setWindowIcon(QtGui.QIcon("./res/image/appicon.png"))
@@ -92,18 +94,43 @@ class SimulationWidget(QtGui.QMainWindow):
         self.sim_timer = QtCore.QTimer(self)
         self.sim_timer.setInterval(10)
         self.sim_timer.timeout.connect(self.update_time)
+
+        # the performance statistics are requested while they are shown
+        self.stats_dock = None
+        self.stats_timer = QtCore.QTimer(self)
+        self.stats_timer.setInterval(1000)
+        self.stats_timer.timeout.connect(self.request_stats)
+
+        # the run metrics are requested while they are shown
+        self.analytics_dock = None
+        self.analytics_timer = QtCore.QTimer(self)
+        self.analytics_timer.setInterval(1000)
+        self.analytics_timer.timeout.connect(self.request_analytics)
+
+        # the signal plots are requested while they are enabled
+        self.plot_docks = []
+        self.plot_timer = QtCore.QTimer(self)
+        self.plot_timer.setInterval(500)
+        self.plot_timer.timeout.connect(self.request_signals)
         
         self.sim_queue = queue.Queue()
         
-        # create the simulator thread
-        self.simulator_thread = sim.Simulator(self.viewer.renderer,
-                                               self.sim_queue)
+        # create the simulator thread, or a process if requested
+        if backend == 'process':
+            self.simulator_thread = SimulatorProcess(self.viewer.renderer,
+                                                     self.sim_queue)
+        else:
+            self.simulator_thread = sim.Simulator(self.viewer.renderer,
+                                                   self.sim_queue)
 
         self.in_queue = self.simulator_thread._out_queue
                                                
         self.dockmanager = DockManager(self)
         self.dockmanager.apply_request.connect(self.apply_parameters)
 
+        # Show collisions and errors in the console, like before the event log
+        self.sim_queue.put(('set_event_log',(INFO, None, WARNING)))
+
         self.simulator_thread.start()
         self.sim_timer.start()
 
@@ -118,6 +145,11 @@ class SimulationWidget(QtGui.QMainWindow):
         self.open_world_action.setShortcut(QtGui.QKeySequence(QtGui.QKeySequence.Open))
 
         self.open_world_action.setStatusTip("Open a new simulation")
+
+        self.open_recording_action = \
+            QtGui.QAction("Open &Recording...", self)
+        self.open_recording_action.triggered.connect(self.on_open_recording)
+        self.open_recording_action.setStatusTip("Replay a recorded simulation")
                             
         self.exit_action = \
             QtGui.QAction(QtGui.QIcon.fromTheme("application-exit"),
@@ -207,6 +239,47 @@ class SimulationWidget(QtGui.QMainWindow):
         self.rotate_action.setChecked(False)
         self.rotate_action.setEnabled(False)
         
+        self.ccd_action = \
+            QtGui.QAction("Continuous collision detection", self)
+        self.ccd_action.setStatusTip("Stop robots at the exact time of impact")
+        self.ccd_action.triggered[bool].connect(self.set_ccd)
+        self.ccd_action.setCheckable(True)
+        self.ccd_action.setChecked(False)
+
+        self.record_action = \
+            QtGui.QAction(QtGui.QIcon.fromTheme("media-record"),
+                          "Record run...", self)
+        self.record_action.setStatusTip("Record the state of the robots at every step")
+        self.record_action.triggered[bool].connect(self.record_run)
+        self.record_action.setCheckable(True)
+        self.record_action.setChecked(False)
+
+        self.profile_action = \
+            QtGui.QAction("Profile next steps...", self)
+        self.profile_action.setStatusTip("Profile the next simulation steps and save the results")
+        self.profile_action.triggered.connect(self.profile_steps)
+
+        self.stats_action = \
+            QtGui.QAction("Performance statistics", self)
+        self.stats_action.setStatusTip("Show the time spent in every phase of a step")
+        self.stats_action.triggered[bool].connect(self.show_stats)
+        self.stats_action.setCheckable(True)
+        self.stats_action.setChecked(False)
+
+        self.analytics_action = \
+            QtGui.QAction("Run analytics", self)
+        self.analytics_action.setStatusTip("Show the path length, clearance and other metrics of the run")
+        self.analytics_action.triggered[bool].connect(self.show_analytics)
+        self.analytics_action.setCheckable(True)
+        self.analytics_action.setChecked(False)
+
+        self.plots_action = \
+            QtGui.QAction("Signal plots", self)
+        self.plots_action.setStatusTip("Plot the signals of the supervisors over time")
+        self.plots_action.triggered[bool].connect(self.show_plots)
+        self.plots_action.setCheckable(True)
+        self.plots_action.setChecked(False)
+
         self.about_action = \
             QtGui.QAction(QtGui.QIcon.fromTheme("help-about",
                             self.windowIcon()),
@@ -240,6 +313,18 @@ class SimulationWidget(QtGui.QMainWindow):
         self.speed_label = QtGui.QLabel(" Speed: 1.0x ",self)
         self.speed_label.setToolTip("Current speed multiplier")
         tbar.addWidget(self.speed_label)
+
+        self.replay_slider = QtGui.QSlider(QtCore.Qt.Horizontal,self)
+        self.replay_slider.setToolTip("Replay position")
+        self.replay_slider.setStatusTip("Move through the recording")
+        self.replay_slider.setTickPosition(QtGui.QSlider.NoTicks)
+        self.replay_slider.setMaximumWidth(300)
+        self.replay_slider.setRange(0,1000)
+        self.replay_slider.setValue(0)
+        self.replay_slider.setEnabled(False)
+        self.replay_slider.sliderMoved[int].connect(self.seek_replay)
+        tbar.addWidget(self.replay_slider)
+        self.replay_duration = None
                        
         self.addToolBar(tbar)
 
@@ -281,6 +366,7 @@ class SimulationWidget(QtGui.QMainWindow):
         file_menu = menu.addMenu("&File")
         
         file_menu.addAction(self.open_world_action)
+        file_menu.addAction(self.open_recording_action)
         file_menu.addSeparator()
         file_menu.addAction(self.exit_action)
         
@@ -295,12 +381,21 @@ class SimulationWidget(QtGui.QMainWindow):
         view_menu.addAction(self.sens_action)
         view_menu.addAction(self.trace_action)
         view_menu.addAction(self.superv_action)
+        view_menu.addSeparator()
+        view_menu.addAction(self.stats_action)
+        view_menu.addAction(self.analytics_action)
+        view_menu.addAction(self.plots_action)
         
         run_menu = menu.addMenu("&Simulation")
         
         run_menu.addAction(self.run_action)
         run_menu.addAction(self.step_action)
         run_menu.addAction(self.rev_action)
+        run_menu.addSeparator()
+        run_menu.addAction(self.ccd_action)
+        run_menu.addSeparator()
+        run_menu.addAction(self.record_action)
+        run_menu.addAction(self.profile_action)
         
         help_menu = menu.addMenu("&Help")
         help_menu.addAction(self.about_action)
@@ -313,6 +408,9 @@ class SimulationWidget(QtGui.QMainWindow):
 
     def closeEvent(self,event):
         self.sim_timer.stop()
+        self.stats_timer.stop()
+        self.plot_timer.stop()
+        self.analytics_timer.stop()
         self.sim_queue.put(('stop',()))
         while self.simulator_thread.isAlive():
             self.process_events(True)
@@ -327,6 +425,9 @@ class SimulationWidget(QtGui.QMainWindow):
                 print "Cannot open file {}".format(filename)
                 return
         self.dockmanager.clear()
+        self.clear_plots()
+        self.replay_slider.setEnabled(False)
+        self.replay_duration = None
         self.sim_queue.put(('read_config',(filename,)))
 
     # Slots
@@ -363,6 +464,32 @@ class SimulationWidget(QtGui.QMainWindow):
         if self.world_dialog.exec_():
             self.load_world(self.world_dialog.selectedFiles()[0])
 
+    @QtCore.pyqtSlot()
+    def on_open_recording(self):
+        self.on_pause()
+        path = QtGui.QFileDialog.getExistingDirectory(self, "Select Recording")
+        if path:
+            self.run_action.setEnabled(False)
+            self.dockmanager.clear()
+            self.clear_plots()
+            self.sim_queue.put(('replay_run',(str(path),)))
+
+    @QtCore.pyqtSlot(bool)
+    def record_run(self,record):
+        if not record:
+            self.sim_queue.put(('record_run',()))
+            return
+        path = QtGui.QFileDialog.getExistingDirectory(self, "Record Run")
+        if path:
+            self.sim_queue.put(('record_run',(str(path),)))
+        else:
+            self.record_action.setChecked(False)
+
+    @QtCore.pyqtSlot(int)
+    def seek_replay(self,value):
+        if self.replay_duration is not None:
+            self.sim_queue.put(('seek_replay',(self.replay_duration*value/1000.0,)))
+
     @QtCore.pyqtSlot()
     def refresh_view(self):
         self.sim_queue.put(('refresh',()))
@@ -383,6 +510,84 @@ class SimulationWidget(QtGui.QMainWindow):
     def show_supervisors(self,show):
         self.sim_queue.put(('show_supervisors',(show,)))
             
+    @QtCore.pyqtSlot(bool)
+    def set_ccd(self,enabled):
+        self.sim_queue.put(('set_ccd',(enabled,)))
+            
+    @QtCore.pyqtSlot()
+    def profile_steps(self):
+        steps, ok = QtGui.QInputDialog.getInteger(self, "Profile next steps",
+                                                  "Number of steps:", 100, 1, 1000000)
+        if ok:
+            self.sim_queue.put(('profile_steps',(steps,)))
+            self.status_label.setText("Profiling the next {} steps".format(steps))
+
+    @QtCore.pyqtSlot(bool)
+    def show_stats(self,show):
+        if self.stats_dock is None:
+            self.stats_dock = StatsDock(self)
+            self.stats_dock.visibilityChanged[bool].connect(self.stats_visible)
+            self.addDockWidget(QtCore.Qt.BottomDockWidgetArea, self.stats_dock)
+        self.stats_dock.setVisible(show)
+
+    @QtCore.pyqtSlot(bool)
+    def stats_visible(self,visible):
+        self.stats_action.setChecked(visible)
+        if visible:
+            self.request_stats()
+            self.stats_timer.start()
+        else:
+            self.stats_timer.stop()
+
+    @QtCore.pyqtSlot()
+    def request_stats(self):
+        self.sim_queue.put(('get_stats',()))
+
+    @QtCore.pyqtSlot(bool)
+    def show_analytics(self,show):
+        if self.analytics_dock is None:
+            self.analytics_dock = AnalyticsDock(self)
+            self.analytics_dock.visibilityChanged[bool].connect(self.analytics_visible)
+            self.addDockWidget(QtCore.Qt.BottomDockWidgetArea, self.analytics_dock)
+            # the metrics are computed from the moment they are first shown
+            self.sim_queue.put(('track_analytics',()))
+        self.analytics_dock.setVisible(show)
+
+    @QtCore.pyqtSlot(bool)
+    def analytics_visible(self,visible):
+        self.analytics_action.setChecked(visible)
+        if visible:
+            self.request_analytics()
+            self.analytics_timer.start()
+        else:
+            self.analytics_timer.stop()
+
+    @QtCore.pyqtSlot()
+    def request_analytics(self):
+        self.sim_queue.put(('get_analytics',()))
+
+    @QtCore.pyqtSlot(bool)
+    def show_plots(self,show):
+        self.sim_queue.put(('track_signals',(show,)))
+        for dock in self.plot_docks:
+            dock.setVisible(show)
+        if show:
+            self.plot_timer.start()
+        else:
+            self.plot_timer.stop()
+
+    @QtCore.pyqtSlot()
+    def request_signals(self):
+        # one time bucket per pixel
+        width = max([dock.get_plot_width() for dock in self.plot_docks] + [200])
+        self.sim_queue.put(('get_signals',(width,)))
+
+    def clear_plots(self):
+        for dock in self.plot_docks:
+            self.removeDockWidget(dock)
+            dock.deleteLater()
+        self.plot_docks = []
+            
     @QtCore.pyqtSlot()
     def zoom_scene(self):
         self.zoom_slider.setEnabled(False)
@@ -418,8 +623,14 @@ class SimulationWidget(QtGui.QMainWindow):
             t = self.simulator_thread.get_time()
             minutes = int(t//60)
             #self.time_label.setText("%02d:%04.1f"%(minutes,t - minutes*60))
-            self.status_label.setText(
-                "Simulation running... {:02d}:{:04.1f}".format(minutes,t - minutes*60))
+            status = "Simulation running... {:02d}:{:04.1f}".format(minutes,t - minutes*60)
+            factor = self.simulator_thread.get_real_time_factor()
+            if factor is not None:
+                status += " (actual speed {:.1f}x)".format(factor)
+            self.status_label.setText(status)
+        if self.replay_duration and not self.replay_slider.isSliderDown():
+            self.replay_slider.setValue(int(1000*self.simulator_thread.get_time()/
+                                            self.replay_duration))
         self.process_events(True)
     
     def process_events(self, process_all = False):
@@ -467,12 +678,52 @@ class SimulationWidget(QtGui.QMainWindow):
     def simulator_reset(self):
         self.run_action.reset()
         self.run_action.setEnabled(True)
+        # a new run is not recorded
+        self.record_action.setChecked(False)
         self.status_label.setText("Simulation ready")
 
     def simulator_stopped(self):
         # FIXME this function isn't necessary
         self.speed_slider.setEnabled(False)
         
+    def simulator_profile_saved(self, summary):
+        total = max(summary['total'], 1e-9)
+        times = "<br>".join("{}: {:.3f} s ({:.0%})".format(category, t, t/total)
+                            for category, t in sorted(summary['times'].items(),
+                                                      key=lambda item: -item[1]))
+        QtGui.QMessageBox.information(self, "Profile saved",
+            "Profiled {} steps, {:.3f} s<br><br>{}<br><br>Saved to {}.prof and {}.folded".format(
+                summary['steps'], summary['total'], times,
+                summary['path'], summary['path']))
+
+    def simulator_replay_loaded(self, duration):
+        self.replay_duration = duration
+        self.replay_slider.setValue(0)
+        self.replay_slider.setEnabled(duration > 0)
+        self.status_label.setText("Replay ready")
+
+    def simulator_stats(self, stats):
+        if self.stats_dock is not None:
+            self.stats_dock.update_stats(stats)
+
+    def simulator_analytics(self, analytics):
+        if self.analytics_dock is not None:
+            self.analytics_dock.update_analytics(analytics)
+
+    def simulator_signals(self, signals):
+        if not self.plots_action.isChecked():
+            return
+        for i, entry in enumerate(signals):
+            if entry is None:
+                continue
+            while len(self.plot_docks) <= i:
+                dock = PlotDock(self, len(self.plot_docks))
+                self.addDockWidget(QtCore.Qt.BottomDockWidgetArea, dock)
+                if self.plot_docks:
+                    self.tabifyDockWidget(self.plot_docks[0], dock)
+                self.plot_docks.append(dock)
+            self.plot_docks[i].update_signals(entry)
+
     def simulator_update_view(self):
         self.viewer.update_bitmap()
         
@@ -150,3 +150,7 @@ class QtRenderer(Renderer):
     def draw_line(self, x1, y1, x2, y2):
         """Draws a line using the current pen from (x1,y1) to (x2,y2)"""
         self._painter.drawLine(QLineF(x1,y1,x2,y2))
+
+    def draw_lines(self, lines):
+        """Draws many lines using the current pen in one call"""
+        self._painter.drawLines([QLineF(*line) for line in lines])
@@ -183,3 +183,11 @@ class wxGCRenderer(Renderer):
         """Draws a line using the current pen from (x1,y1) to (x2,y2)
         """
         self._gc.DrawLines([(x1,y1),(x2,y2)])
+
+    def draw_lines(self, lines):
+        """Draws many lines using the current pen in one call
+        """
+        lines = np.asarray(lines, dtype=float)
+        if len(lines):
+            self._gc.StrokeLineSegments([tuple(p) for p in lines[:,:2]],
+                                        [tuple(p) for p in lines[:,2:]])
@@ -0,0 +1,237 @@
+#!/usr/bin/python
+# Headless Simiam
+# Description: Runs a simulation without the user interface, as fast
+#              as possible, and reports the result.
+import sys
+sys.path.insert(0, './scripts')
+import Queue as queue
+import json
+from time import time
+
+from renderer import Renderer
+from simulator import Simulator
+from eventlog import WARNING, format_event
+from analytics import summary_to_json
+
+class NullRenderer(Renderer):
+    """A renderer that draws nothing"""
+    def __init__(self, size = (500, 500)):
+        self.__size = size
+        Renderer.__init__(self, None)
+
+    def _get_canvas_size(self, canvas):
+        return self.__size
+
+    def push_state(self):
+        pass
+
+    def pop_state(self):
+        pass
+
+    def scale(self, factor):
+        pass
+
+    def rotate(self, angle):
+        pass
+
+    def translate(self, dx, dy):
+        pass
+
+    def _calculate_bounds(self):
+        pass
+
+    def _draw_grid(self):
+        pass
+
+    def set_pen(self, color):
+        pass
+
+    def set_brush(self, color):
+        pass
+
+    def clear_screen(self):
+        pass
+
+    def draw_line(self, x1, y1, x2, y2):
+        pass
+
+    def draw_lines(self, lines):
+        pass
+
+    def draw_ellipse(self, cx, cy, ra, rb=None):
+        pass
+
+    def draw_rectangle(self, x, y, width, height):
+        pass
+
+    def draw_polygon(self, points):
+        pass
+
+def run(world, duration, commands = (), multiplier = 1e9):
+    """Simulate *world* (a world XML file) for *duration* seconds of
+       simulation time, or until the simulation is paused by a collision.
+
+       *commands* is a sequence of ``(name, args)`` messages that are sent
+       to the simulator after the world is loaded, e.g.
+       ``[('set_ccd', (True,))]``. See :ref:`ui-sim-queue`. The simulation
+       is paced at *multiplier* times the real time, by default as fast as
+       possible.
+
+       Returns a dictionary with the simulation time (``'time'``), the wall
+       clock time (``'wall_time'``), ``'collision'``, the final robot
+       poses (``'poses'``) and the sensor cache hits and misses of every
+       robot (``'sensor_cache'``), the achieved real-time factor
+       (``'real_time_factor'``), the late and all steps (``'overruns'``)
+       the step timings (``'stats'``, see
+       :meth:`simulator.Simulator.get_stats`), the logged events
+       (``'events'``, a list of :class:`eventlog.Event`) and the run
+       metrics (``'analytics'``, see :meth:`simulator.Simulator.get_analytics`,
+       if ``('track_analytics', ())`` is one of the *commands*).
+       Exceptions in the simulator are re-raised.
+    """
+    in_queue = queue.Queue()
+    simulator = Simulator(NullRenderer(), in_queue)
+    simulator.daemon = True
+
+    # The whole setup is processed before the first step
+    in_queue.put(('read_config', (world,)))
+    for command in commands:
+        in_queue.put(command)
+    in_queue.put(('set_time_multiplier', (multiplier,)))
+    in_queue.put(('set_time_limit', (duration,)))
+    in_queue.put(('start_simulation', ()))
+
+    robots, new_robots = [], []
+    collision, error, stats, events, analytics = False, None, None, [], None
+    running, loaded = True, False
+
+    start = time()
+    wall_time = 0.0
+    simulator.start()
+    while simulator.is_alive() or not simulator._out_queue.empty():
+        try:
+            name, args = simulator._out_queue.get(timeout=0.1)
+        except queue.Empty:
+            continue
+        if running:
+            if name == 'make_param_window':
+                new_robots.append(args[0])
+            elif name == 'reset':
+                robots, new_robots = new_robots, []
+                loaded = True
+            elif name == 'exception':
+                error = args
+                if not loaded:
+                    # the world could not be loaded, nothing will be paused
+                    in_queue.put(('stop', ()))
+                    wall_time = time() - start
+                    running = False
+            elif name == 'paused':
+                # a collision, an exception or the end of the run
+                collision = error is None and simulator.get_time() < duration
+                in_queue.put(('get_stats', ()))
+                in_queue.put(('get_events', ()))
+                in_queue.put(('get_analytics', ()))
+                in_queue.put(('stop', ()))
+                wall_time = time() - start
+                running = False
+        elif name == 'stats':
+            stats = args[0]
+        elif name == 'events':
+            events = args[0]
+        elif name == 'analytics':
+            analytics = args[0]
+        simulator._out_queue.task_done()
+
+    simulator.join()
+    if error is not None:
+        raise error[0], error[1], error[2]
+
+    return {'time': simulator.get_time(),
+            'wall_time': wall_time,
+            'collision': collision,
+            'poses': [robot.get_pose() for robot in robots],
+            'sensor_cache': simulator.get_sensor_cache_stats(),
+            'real_time_factor': simulator.get_real_time_factor(),
+            'overruns': simulator.get_overruns(),
+            'stats': stats,
+            'events': events,
+            'analytics': analytics}
+
+def print_stats(stats):
+    """Print the step timings from the report of :func:`run`"""
+    def line(name, summary):
+        if summary is not None:
+            print "  {:<14} {:>9.3f} {:>9.3f} {:>9.3f} {:>8}".format(
+                name, 1000*summary['mean'], 1000*summary['p95'],
+                1000*summary['max'], summary['count'])
+
+    print "  {:<14} {:>9} {:>9} {:>9} {:>8}".format(
+        "phase, ms", "mean", "p95", "max", "count")
+    for phase, summary in sorted(stats['phases'].items()):
+        line(phase, summary)
+    for i, phases in enumerate(stats['robots']):
+        print "  Robot {}".format(i+1)
+        for phase, summary in sorted(phases.items()):
+            line("  " + phase, summary)
+
+    print "  {:<22} {:>9} {:>9} {:>9} {:>10}".format(
+        "counter", "mean", "p95", "max", "total")
+    for name, summary in sorted(stats['counters'].items()):
+        print "  {:<22} {:>9.1f} {:>9.1f} {:>9.0f} {:>10}".format(
+            name, summary['mean'], summary['p95'], summary['max'],
+            stats['counter_totals'][name])
+
+def print_analytics(analytics):
+    """Print the run metrics from the report of :func:`run`"""
+    def value(v, unit):
+        return "-" if v is None else "{:.3f} {}".format(v, unit)
+
+    for i, summary in enumerate(analytics):
+        if summary is None:
+            continue
+        print "  Robot {}: path {}, clearance min {} mean {}, time to goal {}".format(
+            i+1, value(summary['path_length'], "m"),
+            value(summary['clearance']['min'], "m"),
+            value(summary['clearance']['mean'], "m"),
+            value(summary['time_to_goal'], "s"))
+        print "    drift max {} final {}, {} controller switches".format(
+            value(summary['drift']['max'], "m"),
+            value(summary['drift']['final'], "m"), summary['switches'])
+        for name, t in sorted(summary['controller_time'].items()):
+            print "    {:<20} {:>9.2f} s".format(name, t)
+
+if __name__ == "__main__":
+    if len(sys.argv) not in (2, 3, 4, 5):
+        print "Usage: python headless.py world.xml [duration] [speed] [analytics.json]"
+        sys.exit(1)
+    duration = 10.0
+    multiplier = 1e9
+    if len(sys.argv) > 2:
+        duration = float(sys.argv[2])
+    if len(sys.argv) > 3:
+        multiplier = float(sys.argv[3])
+
+    report = run(sys.argv[1], duration, [('track_analytics', ())], multiplier)
+    print "Simulated {:.2f} s in {:.2f} s".format(report['time'], report['wall_time'])
+    if report['real_time_factor'] is not None:
+        overruns, steps = report['overruns']
+        print "Real-time factor {:.2f}, {} of {} steps late".format(
+            report['real_time_factor'], overruns, steps)
+    if report['collision']:
+        print "Stopped by a collision"
+    for event in report['events']:
+        if event.level >= WARNING:
+            print format_event(event)
+    for i, pose in enumerate(report['poses']):
+        hits, misses = report['sensor_cache'][i]
+        print "Robot {}: {}, sensor cache hit rate {:.1%}".format(
+            i+1, pose, hits/float(max(1, hits + misses)))
+    if report['stats'] is not None:
+        print_stats(report['stats'])
+    if report['analytics'] is not None:
+        print_analytics(report['analytics'])
+        if len(sys.argv) > 4:
+            with open(sys.argv[4], 'w') as f:
+                json.dump([None if summary is None else summary_to_json(summary)
+                           for summary in report['analytics']], f)
@@ -11,11 +11,17 @@ from qt_mainwindow import SimulationWidget
 
 if __name__ == "__main__":
     app = QtGui.QApplication(sys.argv)
-    simWidget = SimulationWidget()
+    args = sys.argv[1:]
+    backend = 'thread'
+    if '--process' in args:
+        # run the simulator in a separate process
+        args.remove('--process')
+        backend = 'process'
+    simWidget = SimulationWidget(backend=backend)
     simWidget.show()
-    if len(sys.argv) > 1:
-        if len(sys.argv) == 2:
-            simWidget.load_world(sys.argv[1])
+    if len(args) > 0:
+        if len(args) == 1:
+            simWidget.load_world(args[0])
         else:
             print "Too many command-line options"
     app.exec_()
@@ -1,9 +1,10 @@
 import numpy as np
 from pose import Pose
-from sensor import ProximitySensor
+from sensor import ProximitySensor, LidarSensor, MarkerSensor
 from robot import Robot
 from math import ceil, exp, sin, cos, tan, pi
 from helpers import Struct
+from noise import quantize
 
 class Khepera3_IRSensor(ProximitySensor):
     """Inherits from the proximity sensor class. Performs calculations specific to the khepera3 for its characterized proximity sensors"""
@@ -43,6 +44,8 @@ class Khepera3(Robot):
                              [-0.048, -0.010, 1],
                              [-0.048,  0.010, 1],
                              [-0.042,  0.043, 1]])
+        # the farthest point of the envelope from the center of rotation
+        self.__rmax = np.sqrt((self._p2[:,:2]**2).sum(axis=1)).max()
 
         # create IR sensors
         self.ir_sensors = []
@@ -64,6 +67,7 @@ class Khepera3(Robot):
                                 
         # initialize motion
         self.ang_velocity = (0.0,0.0)
+        self.noise = None
 
         self.info = Struct()
         self.info.wheels = Struct()
@@ -84,6 +88,9 @@ class Khepera3(Robot):
         self.info.ir_sensors.rmax = 0.2
         self.info.ir_sensors.rmin = 0.02
 
+        # ground truth, only for debugging and metrics
+        self.info.clearance = self.get_clearance()
+
     def draw(self,r):
         r.set_pose(self.get_pose())
         r.set_pen(0)
@@ -99,6 +106,9 @@ class Khepera3(Robot):
     def move(self,dt):
         # There's no need to use the integrator - these equations have a solution        
         (vl, vr) = self.get_wheel_speeds()
+        if self.noise is not None:
+            vl *= 1 + self.noise.speeds[0]
+            vr *= 1 + self.noise.speeds[1]
         (v,w) = self.diff2uni((vl,vr))
         x, y, theta = self.get_pose()
         if w == 0:
@@ -119,11 +129,43 @@ class Khepera3(Robot):
         
     def get_info(self):
         self.info.ir_sensors.readings = [sensor.reading() for sensor in self.ir_sensors]
+        if self.noise is not None:
+            # the readings stay in the range of the sensors
+            self.info.ir_sensors.readings = np.clip(quantize(
+                np.add(self.info.ir_sensors.readings,
+                       self.noise.readings[:len(self.ir_sensors)]),
+                self.noise.ir_quantum), 0, 3960).tolist()
+        self.info.clearance = self.get_clearance()
         return self.info
     
+    def get_odometry(self):
+        return (self.left_revolutions, self.right_revolutions)
+
+    def set_odometry(self, odometry):
+        self.left_revolutions, self.right_revolutions = odometry
+        self.info.wheels.left_ticks = int(self.left_revolutions*self.info.wheels.ticks_per_rev)
+        self.info.wheels.right_ticks = int(self.right_revolutions*self.info.wheels.ticks_per_rev)
+
+    def set_noise(self, noise):
+        """Add the encoder slip to the ticks of the wheels that turn, and
+           keep the noise of the readings and the wheel speeds"""
+        self.noise = noise
+        if noise is not None:
+            vl, vr = self.get_wheel_speeds()
+            if vl != 0:
+                self.left_revolutions += noise.ticks[0]/self.info.wheels.ticks_per_rev
+            if vr != 0:
+                self.right_revolutions += noise.ticks[1]/self.info.wheels.ticks_per_rev
+            self.info.wheels.left_ticks = int(self.left_revolutions*self.info.wheels.ticks_per_rev)
+            self.info.wheels.right_ticks = int(self.right_revolutions*self.info.wheels.ticks_per_rev)
+
     def set_inputs(self,inputs):
         self.set_wheel_speeds(inputs)
     
+    def get_max_speed(self):
+        (v,w) = self.diff2uni(self.get_wheel_speeds())
+        return abs(v) + abs(w)*self.__rmax
+    
     def diff2uni(self,diff):
         (vl,vr) = diff
         v = (vl+vr) * self.info.wheels.radius/2;
@@ -164,6 +206,76 @@ class Khepera3(Robot):
     def update_sensors(self):
         for sensor in self.ir_sensors:
             sensor.update_distance()
+
+class Khepera3Lidar(Khepera3):
+    """A Khepera3 with a 360 degree lidar on top, in addition to the IR sensors.
+    
+       The supervisors get the lidar scan in ``info.lidar``, with the beam
+       ``angles`` relative to the robot, the range ``rmax`` and the
+       ``distances`` (arrays, infinite where nothing was hit)."""
+    def __init__(self, pose, color = 0xFFFFFF):
+        Khepera3.__init__(self, pose, color)
+        self.lidar = LidarSensor(Pose(0.0, 0.0, 0.0), self, 360, 2*pi, 2.0)
+
+        self.info.lidar = Struct()
+        self.info.lidar.angles = self.lidar.get_beam_angles()
+        self.info.lidar.rmax = self.lidar.rmax
+        self.info.lidar.distances = self.lidar.get_distances().copy()
+
+    def get_info(self):
+        Khepera3.get_info(self)
+        self.info.lidar.distances = self.lidar.get_distances().copy()
+        return self.info
+
+    def get_external_sensors(self):
+        return self.ir_sensors + [self.lidar]
+
+    def draw_sensors(self,renderer):
+        """Draw the IR sensors and the lidar beams"""
+        Khepera3.draw_sensors(self, renderer)
+        self.lidar.draw(renderer)
+
+class Khepera3Camera(Khepera3):
+    """A Khepera3 with a forward camera that detects the markers of the
+       world, in addition to the IR sensors.
+
+       The supervisors get the detections in ``info.markers``, with the
+       marker indices in ``ids``, and the ``bearings`` (relative to the
+       robot) and ``ranges`` arrays, nearest first. The number of
+       detections is limited to ``slots``, the unused slots have the id -1
+       and `numpy.nan` bearings and ranges."""
+    def __init__(self, pose, color = 0xFFFFFF, slots = 8):
+        Khepera3.__init__(self, pose, color)
+        self.camera = MarkerSensor(Pose(0.0, 0.0, 0.0), self, pi/2, 2.0)
+
+        self.info.markers = Struct()
+        self.info.markers.fov = self.camera.fov
+        self.info.markers.rmax = self.camera.rmax
+        self.info.markers.slots = slots
+        self.__update_markers()
+
+    def __update_markers(self):
+        markers = self.info.markers
+        detections = self.camera.get_detections()[:markers.slots]
+        empty = markers.slots - len(detections)
+        markers.ids = [marker for marker, bearing, distance in detections] + [-1]*empty
+        markers.bearings = np.array([bearing for marker, bearing, distance in detections] +
+                                    [np.nan]*empty)
+        markers.ranges = np.array([distance for marker, bearing, distance in detections] +
+                                  [np.nan]*empty)
+
+    def get_info(self):
+        Khepera3.get_info(self)
+        self.__update_markers()
+        return self.info
+
+    def get_external_sensors(self):
+        return self.ir_sensors + [self.camera]
+
+    def draw_sensors(self,renderer):
+        """Draw the IR sensors and the lines of sight to the markers"""
+        Khepera3.draw_sensors(self, renderer)
+        self.camera.draw(renderer)
     
 if __name__ == "__main__":
     # JP limits
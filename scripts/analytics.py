@@ -0,0 +1,144 @@
+from math import sqrt, floor
+import numpy as np
+
+class RunAnalytics(object):
+    """Summarizes the run of one robot while it happens, without keeping
+       the trajectory.
+
+       Every :meth:`add_step` takes constant time. The time between two
+       steps is attributed to the state of the robot in the later step.
+       The visitation heatmap is a sparse grid of square cells of
+       *cell_size* meters with the time spent in every cell. The goal is
+       reached when the robot is closer than *goal_tolerance* meters.
+    """
+
+    def __init__(self, cell_size = 0.1, goal_tolerance = 0.05):
+        self.__cell_size = cell_size
+        self.__goal_tolerance = goal_tolerance
+        self.reset()
+
+    def reset(self):
+        """Forget all steps"""
+        self.__time = None
+        self.__start = None
+        self.__position = None
+        self.__path_length = 0.0
+        self.__clearance_min = None
+        self.__clearance_sum = 0.0
+        self.__clearance_time = 0.0
+        self.__clearance_last = None
+        self.__controller = None
+        self.__controller_time = {}
+        self.__switches = 0
+        self.__time_to_goal = None
+        self.__drift_max = None
+        self.__drift_sum = 0.0
+        self.__drift_count = 0
+        self.__drift_last = None
+        self.__cells = {}
+
+    def add_step(self, time, pose, clearance = None, controller = None,
+                       pose_est = None, goal = None):
+        """Add the state of the robot at *time*.
+
+           :param pose: The true pose of the robot
+           :param clearance: The distance to the nearest obstacle, or `None`
+           :param controller: The name of the current controller, or `None`
+           :param pose_est: The pose estimated by the supervisor, or `None`
+           :param goal: The (x, y) goal of the supervisor, or `None`
+        """
+        x, y = pose.x, pose.y
+        if self.__time is None:
+            self.__start = time
+            dt = 0.0
+        else:
+            dt = time - self.__time
+            self.__path_length += sqrt((x - self.__position[0])**2 +
+                                       (y - self.__position[1])**2)
+        self.__time = time
+        self.__position = (x, y)
+
+        if clearance is not None:
+            if self.__clearance_min is None or clearance < self.__clearance_min:
+                self.__clearance_min = clearance
+            self.__clearance_sum += clearance*dt
+            self.__clearance_time += dt
+            self.__clearance_last = clearance
+
+        if controller is not None:
+            if self.__controller is not None and controller != self.__controller:
+                self.__switches += 1
+            self.__controller = controller
+            self.__controller_time[controller] = \
+                self.__controller_time.get(controller, 0.0) + dt
+
+        if goal is not None and self.__time_to_goal is None and \
+           (x - goal[0])**2 + (y - goal[1])**2 < self.__goal_tolerance**2:
+            self.__time_to_goal = time - self.__start
+
+        if pose_est is not None:
+            drift = sqrt((x - pose_est.x)**2 + (y - pose_est.y)**2)
+            if self.__drift_max is None or drift > self.__drift_max:
+                self.__drift_max = drift
+            self.__drift_sum += drift
+            self.__drift_count += 1
+            self.__drift_last = drift
+
+        cell = (int(floor(x/self.__cell_size)), int(floor(y/self.__cell_size)))
+        self.__cells[cell] = self.__cells.get(cell, 0.0) + dt
+
+    def get_heatmap(self):
+        """Get the visitation heatmap as a tuple of the (x, y) of the corner
+           of the first cell and an array of the time spent in every cell,
+           indexed by [row, column] (y, x), or `None` if there are no steps"""
+        if not self.__cells:
+            return None
+        columns = [cell[0] for cell in self.__cells]
+        rows = [cell[1] for cell in self.__cells]
+        x0, y0 = min(columns), min(rows)
+        grid = np.zeros((max(rows) - y0 + 1, max(columns) - x0 + 1))
+        for (column, row), t in self.__cells.iteritems():
+            grid[row - y0, column - x0] = t
+        return (x0*self.__cell_size, y0*self.__cell_size), grid
+
+    def get_summary(self):
+        """Get the metrics of the run as a dictionary with the
+           ``'duration'``, the ``'path_length'``, the ``'clearance'``
+           (``'min'``, time-weighted ``'mean'``), the ``'controller_time'``
+           by controller name, the controller ``'switches'``, the
+           ``'time_to_goal'``, the odometry ``'drift'`` (``'max'``,
+           ``'mean'``, ``'final'`` distance between the estimated and the
+           true position) and the ``'heatmap'`` with its ``'cell_size'``,
+           ``'origin'`` and ``'time'`` grid, see :meth:`get_heatmap`.
+           Unknown values are `None`.
+        """
+        if self.__clearance_time > 0:
+            clearance_mean = self.__clearance_sum/self.__clearance_time
+        else:
+            clearance_mean = self.__clearance_last
+        drift_mean = None
+        if self.__drift_count > 0:
+            drift_mean = self.__drift_sum/self.__drift_count
+        heatmap = self.get_heatmap()
+        if heatmap is not None:
+            origin, grid = heatmap
+            heatmap = {'cell_size': self.__cell_size, 'origin': origin, 'time': grid}
+        return {'duration': 0.0 if self.__time is None else self.__time - self.__start,
+                'path_length': self.__path_length,
+                'clearance': {'min': self.__clearance_min, 'mean': clearance_mean},
+                'controller_time': dict(self.__controller_time),
+                'switches': self.__switches,
+                'time_to_goal': self.__time_to_goal,
+                'drift': {'max': self.__drift_max, 'mean': drift_mean,
+                          'final': self.__drift_last},
+                'heatmap': heatmap}
+
+def summary_to_json(summary):
+    """Convert a summary from :meth:`RunAnalytics.get_summary` to
+       a structure that can be saved with :func:`json.dump`"""
+    summary = dict(summary)
+    if summary['heatmap'] is not None:
+        heatmap = dict(summary['heatmap'])
+        heatmap['time'] = heatmap['time'].tolist()
+        summary['heatmap'] = heatmap
+    return summary
@@ -0,0 +1,45 @@
+from collections import defaultdict
+
+class CounterRegistry(object):
+    """A registry of named event counters, shared by the modules of the
+       simulator.
+
+       Counting is a dictionary update, cheap enough for the hot paths.
+       The counters only grow. To count the events of a period, take a
+       :meth:`snapshot` at its start and get the :meth:`difference` at its
+       end. This way, several users of the registry do not interfere.
+
+       The simulator counts:
+
+       * ``'quadtree_queries'`` - calls of :meth:`quadtree.QuadTree.find_items`
+       * ``'quadtree_candidates'`` - items returned by these queries
+       * ``'sat_tests'`` - separating axis tests between two polygons
+       * ``'collisions'`` - colliding pairs found by the simulator
+       * ``'sensor_intersections'`` - sensor-object intersections computed
+       * ``'polygons'`` - :class:`pylygon.Polygon` objects built for collision
+         checks
+    """
+
+    def __init__(self):
+        self.__counts = defaultdict(int)
+
+    def add(self, name, n = 1):
+        """Add *n* to the counter *name*"""
+        self.__counts[name] += n
+
+    def get(self, name):
+        """Get the value of the counter *name*"""
+        return self.__counts.get(name, 0)
+
+    def snapshot(self):
+        """Get the values of all counters as a dictionary"""
+        return dict(self.__counts)
+
+    def difference(self, snapshot):
+        """Get the increments of all counters since *snapshot*,
+           as a dictionary"""
+        return dict((name, count - snapshot.get(name, 0))
+                    for name, count in self.__counts.iteritems())
+
+# The counters of this process
+registry = CounterRegistry()
@@ -0,0 +1,189 @@
+import os
+import hashlib
+import tempfile
+import numpy as np
+
+FORMAT_VERSION = 1
+
+def _polygon_distance(points, polygon):
+    """Get the signed distance from every row of *points* to the convex
+       CCW *polygon* (an array of xy rows), negative inside"""
+    distance = np.empty(len(points))
+    distance.fill(np.inf)
+    inside = np.ones(len(points), dtype=bool)
+    for a, b in zip(polygon, np.roll(polygon, -1, axis=0)):
+        edge = b - a
+        offset = points - a
+        length2 = np.dot(edge, edge)
+        if length2 > 0:
+            t = np.clip(np.dot(offset, edge)/length2, 0.0, 1.0)
+        else:
+            t = np.zeros(len(points))
+        closest = offset - t[:,None]*edge
+        np.minimum(distance, np.sqrt((closest**2).sum(axis=1)), distance)
+        inside &= edge[0]*offset[:,1] - edge[1]*offset[:,0] >= 0
+    distance[inside] *= -1
+    return distance
+
+class DistanceField(object):
+    """A signed distance field of static obstacles on a regular grid.
+
+       The value at a point is the distance to the nearest obstacle,
+       negative inside the obstacles. The obstacles are the convex hulls
+       of their envelopes, like in the collision checks. The field is
+       truncated at *max_distance*: farther points get *max_distance*,
+       so that every obstacle only changes the grid near itself.
+
+       Between the grid points, the field is interpolated bilinearly, so
+       the error is in the order of the *resolution* (in meters).
+
+       :param obstacles: A list of :class:`~simobject.SimObject`
+       :param resolution: The distance between the grid points
+       :param max_distance: The largest distance in the field
+    """
+
+    def __init__(self, obstacles, resolution = 0.01, max_distance = 1.0):
+        self.resolution = float(resolution)
+        self.max_distance = float(max_distance)
+        polygons = [obstacle.get_world_polygon().P for obstacle in obstacles]
+        if polygons:
+            points = np.concatenate(polygons)
+            low = points.min(axis=0) - max_distance
+            high = points.max(axis=0) + max_distance
+        else:
+            low, high = np.zeros(2), np.zeros(2)
+        self.origin = low
+        columns, rows = np.ceil((high - low)/resolution).astype(int) + 1
+        self.grid = np.empty((rows, columns))
+        self.grid.fill(max_distance)
+
+        for polygon in polygons:
+            # only the part of the grid that is nearer than max_distance
+            i0, j0 = np.floor((polygon.min(axis=0) - max_distance - low)/resolution).astype(int)
+            i1, j1 = np.ceil((polygon.max(axis=0) + max_distance - low)/resolution).astype(int) + 1
+            i0, j0 = max(i0, 0), max(j0, 0)
+            i1, j1 = min(i1, columns), min(j1, rows)
+            xs = low[0] + resolution*np.arange(i0, i1)
+            ys = low[1] + resolution*np.arange(j0, j1)
+            x, y = np.meshgrid(xs, ys)
+            distance = _polygon_distance(np.column_stack((x.ravel(), y.ravel())),
+                                         polygon).reshape(x.shape)
+            window = self.grid[j0:j1, i0:i1]
+            np.minimum(window, distance, window)
+
+    @classmethod
+    def from_arrays(cls, origin, resolution, max_distance, grid):
+        """Create a field from the values of :meth:`get_arrays`"""
+        field = cls.__new__(cls)
+        field.origin = np.asarray(origin, dtype=float)
+        field.resolution = float(resolution)
+        field.max_distance = float(max_distance)
+        field.grid = np.asarray(grid, dtype=float)
+        return field
+
+    def get_arrays(self):
+        """Get the origin, resolution, maximal distance and grid of the field"""
+        return self.origin, self.resolution, self.max_distance, self.grid
+
+    def sample(self, points):
+        """Get the interpolated field at every row of the array *points*.
+           Points outside of the grid are at least *max_distance* away
+           from all obstacles."""
+        points = np.asarray(points, dtype=float)
+        rows, columns = self.grid.shape
+        u = (points[...,0] - self.origin[0])/self.resolution
+        v = (points[...,1] - self.origin[1])/self.resolution
+        outside = (u < 0) | (v < 0) | (u > columns - 1) | (v > rows - 1)
+        i = np.clip(np.floor(u).astype(int), 0, columns - 2)
+        j = np.clip(np.floor(v).astype(int), 0, rows - 2)
+        fu = np.clip(u - i, 0.0, 1.0)
+        fv = np.clip(v - j, 0.0, 1.0)
+        g = self.grid
+        values = (g[j, i]*(1 - fu) + g[j, i+1]*fu)*(1 - fv) + \
+                 (g[j+1, i]*(1 - fu) + g[j+1, i+1]*fu)*fv
+        return np.where(outside, self.max_distance, values)
+
+    def sample_boundary(self, polygon):
+        """Get the field on the boundary of the closed *polygon* (an array
+           of xy rows), at the vertices and along the edges at most one
+           *resolution* apart. The smallest of these values is the
+           distance from the polygon to the nearest obstacle, with an
+           error in the order of the resolution.
+        """
+        polygon = np.asarray(polygon, dtype=float)
+        edges = np.roll(polygon, -1, axis=0) - polygon
+        lengths = np.sqrt((edges**2).sum(axis=1))
+        counts = np.maximum(np.ceil(lengths/self.resolution).astype(int), 1)
+        edge = np.repeat(np.arange(len(polygon)), counts)
+        # the fractions 0, 1/n, ..., (n-1)/n along every edge
+        fractions = (np.arange(counts.sum()) - np.repeat(np.cumsum(counts) - counts, counts)) / \
+                    np.repeat(counts, counts).astype(float)
+        return self.sample(polygon[edge] + fractions[:,None]*edges[edge])
+
+    def trace(self, origins, angles, ranges, tolerance = None):
+        """Find the distance along rays to the nearest obstacle by sphere
+           tracing, for all rays at once.
+
+           The rays start at the rows of *origins* in the directions
+           *angles*. A ray stops at the first point that is nearer than
+           *tolerance* (by default half the resolution) to an obstacle.
+           Returns an array of the distances, `numpy.inf` for the rays
+           that do not hit anything within their *ranges*.
+        """
+        if tolerance is None:
+            tolerance = self.resolution/2
+        origins = np.asarray(origins, dtype=float)
+        directions = np.column_stack((np.cos(angles), np.sin(angles)))
+        ranges = np.broadcast_to(np.asarray(ranges, dtype=float), (len(origins),))
+        t = np.zeros(len(origins))
+        hits = np.empty(len(origins))
+        hits.fill(np.inf)
+        active = np.arange(len(origins))
+        while len(active):
+            d = self.sample(origins[active] + t[active,None]*directions[active])
+            hit = d < tolerance
+            hits[active[hit]] = t[active[hit]]
+            t[active] += np.maximum(d, tolerance)
+            active = active[~hit & (t[active] <= ranges[active])]
+        return hits
+
+def world_key(world_file, resolution, max_distance):
+    """Get the cache key of the field of *world_file*: a hash of the file
+       contents and the field parameters"""
+    digest = hashlib.sha1()
+    with open(world_file, 'rb') as f:
+        digest.update(f.read())
+    digest.update(repr((FORMAT_VERSION, float(resolution), float(max_distance))))
+    return digest.hexdigest()
+
+def load_field(world_file, obstacles, resolution = 0.01, max_distance = 1.0,
+               cache_dir = None):
+    """Get the :class:`DistanceField` of the *obstacles* of *world_file*.
+
+       The field is loaded from *cache_dir* (by default a folder in the
+       temporary directory) if it was built for the same file contents and
+       parameters (see :func:`world_key`), and built and saved otherwise.
+       Returns a (field, loaded) tuple.
+    """
+    if cache_dir is None:
+        cache_dir = os.path.join(tempfile.gettempdir(), 'pysimiam-fields')
+    filename = os.path.join(cache_dir, world_key(world_file, resolution,
+                                                 max_distance) + '.npz')
+    if os.path.exists(filename):
+        try:
+            with np.load(filename) as data:
+                return DistanceField.from_arrays(data['origin'], data['resolution'],
+                                                 data['max_distance'], data['grid']), True
+        except (IOError, KeyError, ValueError):
+            pass # rebuild a damaged file
+
+    field = DistanceField(obstacles, resolution, max_distance)
+    if not os.path.isdir(cache_dir):
+        os.makedirs(cache_dir)
+    origin, resolution, max_distance, grid = field.get_arrays()
+    handle, temporary = tempfile.mkstemp(dir = cache_dir, suffix = '.npz')
+    with os.fdopen(handle, 'wb') as f:
+        np.savez(f, origin = origin, resolution = resolution,
+                 max_distance = max_distance, grid = grid)
+    os.rename(temporary, filename)
+    return field, False
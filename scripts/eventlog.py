@@ -0,0 +1,128 @@
+import threading
+import Queue as queue
+import json
+from collections import deque, namedtuple
+
+DEBUG = 10
+INFO = 20
+WARNING = 30
+ERROR = 40
+
+LEVEL_NAMES = {DEBUG: 'debug', INFO: 'info', WARNING: 'warning', ERROR: 'error'}
+
+class Event(namedtuple('Event', 'time level kind robot message')):
+    """An entry of the :class:`EventLog`.
+
+       *time* is the simulation time, *level* one of :data:`DEBUG`,
+       :data:`INFO`, :data:`WARNING` and :data:`ERROR`, *kind* a short string
+       like ``'collision'``, and *robot* the number of the robot (starting
+       from 1, like in the UI) or `None`."""
+    __slots__ = ()
+
+def format_event(event):
+    """Format *event* as a line of text"""
+    text = "[{}] {}".format(LEVEL_NAMES.get(event.level, event.level), event.kind)
+    if event.time is not None:
+        text = "{:9.3f} {}".format(event.time, text)
+    if event.robot is not None:
+        text += " (Robot {})".format(event.robot)
+    return "{}: {}".format(text, event.message)
+
+class _FileWriter(threading.Thread):
+    """Writes events to a file as JSON lines, in the background"""
+
+    def __init__(self, filename, size):
+        super(_FileWriter, self).__init__()
+        self.daemon = True
+        self.__file = open(filename, 'a')
+        self.__queue = queue.Queue(size)
+        self.dropped = 0
+
+    def write(self, event):
+        """Queue *event* for writing, or drop it if the queue is full"""
+        try:
+            self.__queue.put_nowait(event)
+        except queue.Full:
+            self.dropped += 1
+
+    def close(self):
+        """Write the queued events and close the file"""
+        self.__queue.put(None)
+        self.join()
+
+    def run(self):
+        while True:
+            event = self.__queue.get()
+            if event is None:
+                break
+            self.__file.write(json.dumps(event._asdict()) + '\n')
+            if self.__queue.empty():
+                self.__file.flush()
+        self.__file.close()
+
+class EventLog(object):
+    """A log of structured simulation events.
+
+       The last *size* events of at least the log *level* are kept in
+       memory. They can also be written to a file by a background
+       thread (see :meth:`open`), and echoed to the standard output.
+       Neither the file nor the memory log can block the caller: if
+       the writer does not keep up, the events are dropped from the file.
+    """
+
+    def __init__(self, size = 1000, level = INFO):
+        self.__events = deque(maxlen = size)
+        self.__level = level
+        self.__echo = None
+        self.__writer = None
+
+    def set_level(self, level):
+        """Ignore the events below *level*"""
+        self.__level = level
+
+    def get_level(self):
+        """Get the lowest level that is logged"""
+        return self.__level
+
+    def set_echo(self, level = None):
+        """Print the logged events from *level* on.
+           If *level* is `None`, nothing is printed."""
+        self.__echo = level
+
+    def open(self, filename, size = 10000):
+        """Write the following events to *filename* as JSON lines.
+           At most *size* events wait for the writer."""
+        self.close()
+        self.__writer = _FileWriter(filename, size)
+        self.__writer.start()
+
+    def close(self):
+        """Finish writing to the file, if one is open.
+           Returns the number of events that were dropped."""
+        if self.__writer is None:
+            return 0
+        writer, self.__writer = self.__writer, None
+        writer.close()
+        return writer.dropped
+
+    def log(self, level, kind, message, time = None, robot = None):
+        """Log an event, see :class:`Event`"""
+        if level < self.__level:
+            return
+        event = Event(time, level, kind, robot, message)
+        self.__events.append(event)
+        if self.__writer is not None:
+            self.__writer.write(event)
+        if self.__echo is not None and level >= self.__echo:
+            print format_event(event)
+
+    def get_events(self, level = None, kind = None):
+        """Get the events in memory as a list, optionally only those
+           from *level* on, or of *kind*."""
+        return [event for event in self.__events
+                if (level is None or event.level >= level) and
+                   (kind is None or event.kind == kind)]
+
+    def clear(self):
+        """Forget the events in memory"""
+        self.__events.clear()
@@ -0,0 +1,117 @@
+import threading
+from BaseHTTPServer import HTTPServer, BaseHTTPRequestHandler
+from timeit import default_timer as timer
+
+CONTENT_TYPE = 'text/plain; version=0.0.4; charset=utf-8'
+
+class Metric(object):
+    """A metric family in the Prometheus text format.
+
+       *kind* is ``'counter'`` or ``'gauge'``. The samples are added with
+       :meth:`add` as a value and a dictionary of labels.
+    """
+
+    def __init__(self, name, kind, description):
+        self.name = name
+        self.kind = kind
+        self.description = description
+        self.samples = []
+
+    def add(self, value, **labels):
+        """Add a sample with *labels*. `None` values are skipped."""
+        if value is not None:
+            self.samples.append((labels, value))
+        return self
+
+def _format_value(value):
+    value = float(value)
+    if value != value:
+        return 'NaN'
+    if value in (float('inf'), float('-inf')):
+        return '+Inf' if value > 0 else '-Inf'
+    return repr(value)
+
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('\n', '\\n').replace('"', '\\"')
+
+def format_metrics(metrics):
+    """Format a list of :class:`Metric` in the Prometheus text format"""
+    lines = []
+    for metric in metrics:
+        lines.append("# HELP {} {}".format(metric.name, metric.description))
+        lines.append("# TYPE {} {}".format(metric.name, metric.kind))
+        for labels, value in metric.samples:
+            if labels:
+                lines.append("{}{{{}}} {}".format(metric.name,
+                    ",".join('{}="{}"'.format(key, _escape(labels[key]))
+                             for key in sorted(labels)), _format_value(value)))
+            else:
+                lines.append("{} {}".format(metric.name, _format_value(value)))
+    return "\n".join(lines) + "\n"
+
+class _Handler(BaseHTTPRequestHandler):
+    """Serves the last snapshot of the metrics server on /metrics"""
+
+    def do_GET(self):
+        if self.path.split('?')[0] != '/metrics':
+            self.send_error(404)
+            return
+        body = self.server.metrics.get_text()
+        self.send_response(200)
+        self.send_header('Content-Type', CONTENT_TYPE)
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+class MetricsServer(object):
+    """Serves metrics in the Prometheus text format on
+       ``http://127.0.0.1:port/metrics``, from a background thread.
+
+       The server never calls back into the simulator. The simulator
+       :meth:`update` s a snapshot when it is :meth:`due`, every *interval*
+       seconds, and the requests get the last snapshot. The server only
+       listens on the loopback interface. If *port* is 0, a free port is
+       chosen, see :meth:`get_port`.
+    """
+
+    def __init__(self, port = 9100, interval = 1.0):
+        self.__interval = interval
+        self.__updated = None
+        self.__text = format_metrics([])
+        self.__server = HTTPServer(('127.0.0.1', port), _Handler)
+        self.__server.metrics = self
+        self.__thread = threading.Thread(target=self.__server.serve_forever)
+        self.__thread.daemon = True
+        self.__thread.start()
+
+    def get_port(self):
+        """Get the port the server listens on"""
+        return self.__server.server_address[1]
+
+    def due(self):
+        """Return `True` if the snapshot is older than the interval"""
+        return self.__updated is None or timer() - self.__updated >= self.__interval
+
+    def get_elapsed(self):
+        """Get the wall clock time since the last update, or `None`"""
+        if self.__updated is None:
+            return None
+        return timer() - self.__updated
+
+    def update(self, metrics):
+        """Replace the snapshot with a list of :class:`Metric`"""
+        self.__text = format_metrics(metrics)
+        self.__updated = timer()
+
+    def get_text(self):
+        """Get the snapshot in the text format"""
+        return self.__text
+
+    def stop(self):
+        """Stop serving and close the socket"""
+        self.__server.shutdown()
+        self.__server.server_close()
+        self.__thread.join()
@@ -0,0 +1,61 @@
+import numpy as np
+from helpers import Struct
+
+def quantize(values, quantum):
+    """Round *values* to the nearest multiples of *quantum*, unless it is 0"""
+    if quantum <= 0:
+        return values
+    return np.round(np.asarray(values)/quantum)*quantum
+
+class NoiseModel(object):
+    """Draws the sensor and actuator noise of all robots for a step at once.
+
+       The noise is drawn from a NumPy generator seeded with *seed*, with
+       one vectorized call per step, so that a run with the same seed and
+       the same commands gets exactly the same noise.
+
+       :param seed: The seed of the generator
+       :param ir_sigma: The standard deviation of the noise added to the
+                        readings of the external sensors, in reading units
+       :param ir_quantum: The resolution of the readings (0 for none)
+       :param encoder_sigma: The standard deviation of the wheel encoder
+                             slip in every step, in ticks
+       :param speed_sigma: The relative standard deviation of the wheel
+                           speeds from the speeds that were set
+    """
+
+    def __init__(self, seed, ir_sigma = 0.0, ir_quantum = 0.0,
+                       encoder_sigma = 0.0, speed_sigma = 0.0):
+        self.seed = seed
+        self.ir_sigma = ir_sigma
+        self.ir_quantum = ir_quantum
+        self.encoder_sigma = encoder_sigma
+        self.speed_sigma = speed_sigma
+        self.reset()
+
+    def reset(self):
+        """Restart the generator from the seed"""
+        self.__random = np.random.RandomState(self.seed)
+
+    def draw(self, robots, sensors):
+        """Draw the noise of a step for *robots* robots that have at most
+           *sensors* external sensors.
+
+           Returns a list with a :class:`~helpers.Struct` for every robot,
+           with the ``readings`` noise (an array of *sensors* values),
+           the encoder slip in ``ticks`` and the relative wheel ``speeds``
+           errors (arrays of (left, right)), and the ``ir_quantum``.
+        """
+        values = self.__random.standard_normal((robots, sensors + 4))
+        values[:,:sensors] *= self.ir_sigma
+        values[:,sensors:sensors+2] *= self.encoder_sigma
+        values[:,sensors+2:] *= self.speed_sigma
+        noise = []
+        for row in values:
+            robot = Struct()
+            robot.readings = row[:sensors]
+            robot.ticks = row[sensors:sensors+2]
+            robot.speeds = row[sensors+2:]
+            robot.ir_quantum = self.ir_quantum
+            noise.append(robot)
+        return noise
@@ -0,0 +1,150 @@
+import cProfile
+import pstats
+import os
+from collections import defaultdict
+from time import strftime
+
+# The parts of the code the time is attributed to, by folder
+CATEGORIES = ('supervisors', 'controllers', 'robots', 'simulator', 'other')
+
+def _category(func):
+    """Find the category of the function *func* ``(filename, line, name)``.
+       Returns `None` for built-in functions."""
+    filename = func[0]
+    if filename == '~' or filename.startswith('<'):
+        return None
+    folder = os.path.basename(os.path.dirname(os.path.abspath(filename)))
+    if folder in ('supervisors', 'controllers', 'robots'):
+        return folder
+    if folder in ('scripts', 'gui'):
+        return 'simulator'
+    return 'other'
+
+def attribute(stats):
+    """Split the time in the :class:`pstats.Stats` *stats* between
+       the user supervisors, controllers and robots, the simulator
+       and other code (the standard library, numpy...).
+
+       The own time of every function counts for the folder of its
+       module. The time of built-in functions counts for the callers,
+       in proportion to the time spent in every caller.
+
+       Returns a dictionary of times in seconds, by :data:`CATEGORIES`.
+    """
+    totals = dict((category, 0.0) for category in CATEGORIES)
+
+    def split(func, time, depth = 0):
+        category = _category(func)
+        if category is not None:
+            totals[category] += time
+            return
+        callers = stats.stats[func][4]
+        weight = sum(edge[3] for edge in callers.values())
+        if not callers or weight <= 0 or depth > 10:
+            totals['other'] += time
+            return
+        for caller, edge in callers.iteritems():
+            split(caller, time*edge[3]/weight, depth + 1)
+
+    for func, (cc, nc, tt, ct, callers) in stats.stats.iteritems():
+        if tt > 0:
+            split(func, tt)
+    return totals
+
+def _label(func):
+    filename, line, name = func
+    if filename == '~':
+        return name
+    return "{}:{}({})".format(os.path.basename(filename), line, name)
+
+def collapsed_stacks(stats, max_depth = 64):
+    """Reconstruct the call stacks of the :class:`pstats.Stats` *stats*
+       in the collapsed format of flame graph tools, one
+       ``caller;callee;... microseconds`` line per stack.
+
+       A deterministic profiler records only the callers of every function,
+       so the time of a function with several callers is split between
+       them in proportion to the time spent on every call path.
+    """
+    callees = defaultdict(list)
+    for func, (cc, nc, tt, ct, callers) in stats.stats.iteritems():
+        for caller, edge in callers.iteritems():
+            callees[caller].append((func, edge[3]))
+
+    folded = defaultdict(float)
+
+    def walk(func, path, labels, share):
+        cc, nc, tt, ct, callers = stats.stats[func]
+        labels = labels + (_label(func),)
+        folded[labels] += tt*share
+        if len(labels) >= max_depth or ct*share < 1e-6:
+            return
+        path = path | set([func])
+        for callee, time in callees[func]:
+            callee_ct = stats.stats[callee][3]
+            if callee in path or callee_ct <= 0:
+                continue # recursion
+            walk(callee, path, labels, share*min(1.0, time/callee_ct))
+
+    for func, (cc, nc, tt, ct, callers) in stats.stats.iteritems():
+        if not callers:
+            walk(func, frozenset(), (), 1.0)
+
+    return ["{} {}".format(';'.join(labels), int(round(time*1e6)))
+            for labels, time in sorted(folded.items())
+            if time*1e6 >= 0.5]
+
+class StepProfiler(object):
+    """Profiles the next *steps* simulation steps with :mod:`cProfile`.
+
+       The simulator calls :meth:`enable` and :meth:`disable` around every
+       step, and :meth:`save` when :meth:`step_done` returns `True`. The
+       results are written to ``path.prof`` (:mod:`pstats` format) and
+       ``path.folded`` (collapsed stacks for flame graphs). If *path* is
+       `None`, a name with the current time in the folder ``profiles``
+       is used.
+    """
+
+    def __init__(self, steps, path = None):
+        if steps < 1:
+            raise ValueError("[StepProfiler] At least one step has to be profiled")
+        if path is None:
+            path = os.path.join('profiles', strftime('simiam-%Y%m%d-%H%M%S'))
+        self.__path = path
+        self.__remaining = steps
+        self.__steps = 0
+        self.__profile = cProfile.Profile()
+
+    def enable(self):
+        """Start collecting data"""
+        self.__profile.enable()
+
+    def disable(self):
+        """Stop collecting data"""
+        self.__profile.disable()
+
+    def step_done(self):
+        """Count a profiled step, returns `True` after the last one"""
+        self.__steps += 1
+        self.__remaining -= 1
+        return self.__remaining <= 0
+
+    def save(self):
+        """Write the results, and return a dictionary with the ``'path'``
+           without extension, the number of ``'steps'``, the ``'total'`` time
+           and the time by category (``'times'``, see :func:`attribute`).
+           If no step was profiled, nothing is written and `None` is returned."""
+        if self.__steps == 0:
+            return None
+        folder = os.path.dirname(self.__path)
+        if folder and not os.path.isdir(folder):
+            os.makedirs(folder)
+        stats = pstats.Stats(self.__profile)
+        stats.dump_stats(self.__path + '.prof')
+        with open(self.__path + '.folded', 'w') as f:
+            for line in collapsed_stacks(stats):
+                f.write(line + '\n')
+        return {'path': self.__path,
+                'steps': self.__steps,
+                'total': stats.total_tt,
+                'times': attribute(stats)}
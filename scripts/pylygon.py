@@ -9,51 +9,87 @@ polygon object
 from __future__ import division
 from operator import mul
 
-from numpy import array, cos, dot, fabs, lexsort, pi, sin, sqrt, vstack
+from numpy import (arange, arctan2, argmax, array, concatenate, cos, dot, einsum,
+                   fabs, fmax, fmin, lexsort, newaxis, nonzero, pi, sin, sqrt,
+                   zeros)
 ##from pygame import Rect
 
 ##from convexhull import convexhull
 # convex hull related functions 
 TURN_LEFT, TURN_RIGHT, TURN_NONE = (1, -1, 0)
-
-def _turn(i, j, k):
-    global P
-    _P = P
-    (p_x, p_y), (q_x, q_y), (r_x, r_y) = _P[i], _P[j], _P[k]
-    return cmp((q_x - p_x) * (r_y - p_y) - (r_x - p_x) * (q_y - p_y), 0)
-
-
-def _keep_left(hull, r):
-    while len(hull) > 1 and _turn(hull[-2], hull[-1], r) != TURN_LEFT: hull.pop()
-    if not len(hull) or not (hull[-1] == r).all(): hull.append(r)
+# below this number of points the plain monotone chain is faster than
+# checking for convexity with array operations
+_CONVEX_CHECK_MIN = 16
+
+def _half_hull(P, I):
+    # one half of the monotone chain; P is a list of (x, y) tuples, and
+    # I are the indices of P in the order of traversal
+    hull = []
+    for r in I:
+        r_x, r_y = P[r]
+        while len(hull) > 1:
+            (p_x, p_y), (q_x, q_y) = P[hull[-2]], P[hull[-1]]
+            # keep the point only if it is a left turn
+            if (q_x - p_x) * (r_y - p_y) - (r_x - p_x) * (q_y - p_y) > 0: break
+            hull.pop()
+        hull.append(r)
     return hull
 
 
-def convexhull(_P):
+def _convex_order(P, I):
+    # if P already is a strictly convex polygon in CW or CCW order, return
+    # the indices of P in CCW order starting from the lowest point I[0],
+    # else return None
+    n = len(P)
+    if n < 3: return None
+    E = _next(P) - P
+    E1 = _next(E)
+    turns = E[:, 0] * E1[:, 1] - E[:, 1] * E1[:, 0]
+    if (turns > 0).all(): order = arange(n)
+    elif (turns < 0).all(): order = arange(n)[::-1]
+    else: return None
+    # a simple convex polygon turns around exactly once
+    if fabs(arctan2(turns, (E * E1).sum(axis=1)).sum()) > 3 * pi: return None
+    i = nonzero(order == I[0])[0][0]
+    return concatenate((order[i:], order[:i]))
+
+
+def convexhull(P):
     """
-    Returns an array of the points in convex hull of P in CCW order.
+    Returns an array of the indices of the points in the convex hull of P in
+    CCW order, starting from the point with the smallest x (and y).
 
-    arguments: P -- a Polygon object or an numpy.array object of points
+    Large polygons that are already convex are detected with a few array
+    operations; other point sets are processed with the monotone chain
+    algorithm.  The function keeps no state and is safe to call from
+    several threads.
+
+    arguments: P -- a 2d numpy.array object of points
     """
-    global P
-    P = _P
-    I = lexsort((_P[:,1],_P[:,0]))
-    l = reduce(_keep_left, I, [])
-    u = reduce(_keep_left, reversed(I), [])
-    l.extend(u[i] for i in xrange(1, len(u) - 1))
+    I = lexsort((P[:, 1], P[:, 0]))
+    if len(P) >= _CONVEX_CHECK_MIN:
+        order = _convex_order(P, I)
+        if order is not None: return order
+    I = I.tolist()
+    points = P.tolist()
+    l = _half_hull(points, I)
+    u = _half_hull(points, I[::-1])
+    l.extend(u[1:-1])
     return array(l)
 
 
 # error tolerances
 _MACHEPS = pow(2, -24)
 _E = _MACHEPS * 10
+# iteration limit for GJK; degenerate configurations may not converge
+_MAX_ITERATIONS = 100
 
 # utility functions
 _clamp = lambda a, v, b: max(a, min(b, v))              # clamp v between a and b
 _perp = lambda (x, y): array([-y, x])                   # perpendicular
 _prod = lambda X: reduce(mul, X)                        # product
 _mag = lambda (x, y): sqrt(x * x + y * y)               # magnitude, or length
-_normalize = lambda V: array([i / _mag(V) for i in V])  # normalize a vector
+_normalize = lambda V: V / _mag(V)                      # normalize a vector
 _intersect = lambda A, B: (A[1] > B[0] and B[1] > A[0]) # intersection test
 _unzip = lambda zipped: zip(*zipped)                    # unzip a list of tuples
 
@@ -96,6 +132,89 @@ def _line_intersect(p1, q1, p2, q2):
     return None
 
 
+def _next(P):
+    # the array of points following each point of a closed polyline
+    return concatenate((P[1:], P[:1]))
+
+
+def _edges(P):
+    # an edge is the vector from p to q, where q is the next point
+    return P - _next(P)
+
+
+def _perp_rows(V):
+    # perpendiculars of every row of an array of vectors
+    return V[..., ::-1] * (-1, 1)
+
+
+def _segment_intersections(P, Q):
+    # vectorized _line_intersect for all pairs of closed polylines P and Q
+    # returns a list of intersection points in the same order as the loop
+    # over edges of P and then edges of Q
+    P1, P2 = P[:, newaxis, :], _next(P)[:, newaxis, :]
+    Q1, Q2 = Q[newaxis, :, :], _next(Q)[newaxis, :, :]
+    x1, y1, x2, y2 = P1[..., 0], P1[..., 1], P2[..., 0], P2[..., 1]
+    x3, y3, x4, y4 = Q1[..., 0], Q1[..., 1], Q2[..., 0], Q2[..., 1]
+
+    x12, y12 = x1 - x2, y1 - y2
+    x34, y34 = x3 - x4, y3 - y4
+    c = x12 * y34 - y12 * x34
+    valid = fabs(c) > 0.001
+    c = c + (~valid) # avoid division by zero, the result is masked anyway
+
+    a = x1 * y2 - y1 * x2
+    b = x3 * y4 - y3 * x4
+    x = (a * x34 - b * x12) / c
+    y = (a * y34 - b * y12) / c
+
+    # check boundaries
+    valid &= ((x - fmin(x1, x2) > -1e-8) & (x - fmin(x3, x4) > -1e-8) &
+              (fmax(x1, x2) - x > -1e-8) & (fmax(x3, x4) - x > -1e-8) &
+              (y - fmin(y1, y2) > -1e-8) & (y - fmin(y3, y4) > -1e-8) &
+              (fmax(y1, y2) - y > -1e-8) & (fmax(y3, y4) - y > -1e-8))
+    I, J = nonzero(valid)
+    return zip(x[I, J], y[I, J])
+
+
+class PolygonStack(object):
+    """
+    a stack of polygons padded to the same number of points, used to test
+    one polygon against many polygons at once.  see Polygon.collidepolys
+
+    arguments:
+    polygons -- a sequence of Polygon objects
+    """
+
+
+    def __init__(self, polygons):
+        polygons = list(polygons)
+        self.polygons = polygons
+        k = len(polygons)
+        m = max(p.n for p in polygons) if polygons else 0
+        P = zeros((k, m, 2))
+        axes = zeros((k, m, 2))
+        valid = zeros((k, m), dtype=bool)
+        for i, polygon in enumerate(polygons):
+            n = polygon.n
+            # repeating the last point doesn't change the projections
+            P[i, :n] = polygon.P
+            P[i, n:] = polygon.P[-1]
+            axes[i, :n] = _perp_rows(polygon.edges)
+            valid[i, :n] = True
+        self.P = P
+        self.axes = axes
+        self.valid = valid
+
+
+    def __len__(self): return len(self.polygons)
+
+
+    def __getitem__(self, i): return self.polygons[i]
+
+
+    def __iter__(self): return iter(self.polygons)
+
+
 class _Support(object):
     # the support mapping of P - Q; s_P-Q
     # s_P-Q is the generic support mapping for polygons
@@ -122,7 +241,13 @@ class _Support(object):
         # the support mapping is the p in C such that
         #   dot(r, p) == dot(r, _s(C)(r))
         # ie, the support mapping is the p in C most in the direction of r
-        return lambda r: max(dict((dot(r, p), p) for p in C).items())[1]
+        # C may be rotated in place, so the points are looked up on each call
+        def support(r):
+            P = C.P if isinstance(C, Polygon) else C
+            # the last point wins ties, as in a dict keyed by projections
+            i = argmax(dot(P[::-1], r))
+            return P[len(P) - 1 - i]
+        return support
 
 
     def add(self, r):
@@ -217,28 +342,27 @@ class Polygon(object):
           and P must be in CCW order.  conv will ensure that P is both convex
           and in CCW.  even if P is already convex, it is recommended to leave
           conv True, unless client code can be sure that P is also in CCW order.
-          CCW order is requried for certain operations.
+          CCW order is requried for certain operations.  rotating and moving
+          a convex CCW polygon keeps it convex and CCW, so the hull of a shape
+          can be found once and conv set to False for all its transformations.
 
           NOTE: the order must be with respect to a bottom left orgin; graphics
             applications typically use a topleft origin.  if your points are CCW
             with respect to a topleft origin they will be CW in a bottomleft
             origin
         """
-        P = array(list(P))
+        if isinstance(P, Polygon): P = P.P
+        P = array(P if hasattr(P, '__len__') else list(P), dtype=float)
         if conv: P = P[convexhull(P)]
         self.P = P
         n = len(P) # number of points
         self.n = n
         self.a = self._A() # area of polygon
 
-        edges = [] # an edge is the vector from p to q
-        for i, p in enumerate(P):
-            q = P[(i + 1) % n] # x, y of next point in series
-            edges.append(p - q)
-        self.edges = array(edges)
-        C = self.C
+        self.edges = _edges(P) # an edge is the vector from p to q
+        D = self.C - P
         # longest distance from C for all p in P
-        self.rmax = sqrt(max(dot(C - p, C - p) for p in P))
+        self.rmax = sqrt((D * D).sum(axis=1).max())
 
 
     def __len__(self): return self.n
@@ -266,7 +390,7 @@ class Polygon(object):
           minkowski difference. eg A + (-B)
         """
         P, Q = self.P, other.P
-        return array([p + q for p in P for q in Q])
+        return (P[:, newaxis, :] + Q[newaxis, :, :]).reshape(-1, 2)
 
 
     def __neg__(self): return Polygon(-self.P)
@@ -274,21 +398,21 @@ class Polygon(object):
 
     def get_rect(self):
         """return the AABB, as a pygame rect, of the polygon"""
-        X, Y = _unzip(self.P)
-        x, y = min(X), min(Y)
-        w, h = max(X) - x, max(Y) - y
+        x, y = self.P.min(axis=0)
+        w, h = self.P.max(axis=0) - (x, y)
         #return Rect(x, y, w, h)
         return (x, y, w, h)
 
 
     def move(self, x, y):
         """return a new polygon moved by x, y"""
-        return Polygon([(x + p_x, y + p_y) for (p_x, p_y) in self.P])
+        # translation keeps the points convex and in CCW order
+        return Polygon(self.P + (x, y), conv=False)
 
 
     def move_ip(self, x, y):
         """move the polygon by x, y"""
-        self.P = array([(x + p_x, y + p_y) for (p_x, p_y) in self.P])
+        self.P = self.P + (x, y)
 
 
     def collidepoint(self, (x, y)):
@@ -338,20 +462,59 @@ class Polygon(object):
         """
         # a projection is a vector representing the span of a polygon projected
         # onto an axis
-        projections = []
-        for edge in vstack((self.edges, other.edges)):
-            edge = _normalize(edge)
-            # the separating axis is the line perpendicular to the edge
-            axis = _perp(edge)
-            self_projection = self.project(axis)
-            other_projection = other.project(axis)
-            # if self and other do not intersect on any axis, they do not
-            # intersect in space
-            if not _intersect(self_projection, other_projection): return False
-            # find the overlapping portion of the projections
-            projection = self_projection[1] - other_projection[0]
-            projections.append((axis[0] * projection, axis[1] * projection))
-        return array(projections)
+        # the separating axes are the lines perpendicular to the edges
+        # the axes are normalized only if a projection has to be returned
+        axes = _perp_rows(concatenate((self.edges, other.edges)))
+        self_projections = dot(self.P, axes.T)
+        other_projections = dot(other.P, axes.T)
+        self_min, self_max = self_projections.min(0), self_projections.max(0)
+        other_min, other_max = other_projections.min(0), other_projections.max(0)
+        # if self and other do not intersect on any axis, they do not
+        # intersect in space
+        if not ((self_max > other_min) & (other_max > self_min)).all():
+            return False
+        # find the overlapping portion of the projections
+        mag2 = (axes * axes).sum(axis=1)
+        return axes * ((self_max - other_min) / mag2)[:, newaxis]
+
+
+    def collidepolys(self, others):
+        """
+        test if self collides with each of the other polygons using the
+        seperating axis theorem.  all the tests are done at once
+
+        arguments:
+        others -- a PolygonStack object or a sequence of polygon objects
+
+        returns:
+        a boolean array, True for every polygon in others that collides with
+        self
+        """
+        if not isinstance(others, PolygonStack): others = PolygonStack(others)
+        if not len(others): return zeros(0, dtype=bool)
+        P, Q = self.P, others.P
+
+        # separating axes from the edges of self
+        axes = _perp_rows(self.edges)
+        self_projections = dot(P, axes.T)                 # n
+        other_projections = einsum('kmd,nd->kmn', Q, axes) # k x m x n
+        self_min, self_max = self_projections.min(0), self_projections.max(0)
+        other_min = other_projections.min(1)
+        other_max = other_projections.max(1)
+        separated = ((self_max <= other_min) |
+                     (other_max <= self_min)).any(axis=1)
+
+        # separating axes from the edges of the others
+        axes = others.axes
+        self_projections = einsum('nd,kmd->knm', P, axes)  # k x n x m
+        other_projections = einsum('kid,kmd->kim', Q, axes) # k x m x m
+        self_min, self_max = self_projections.min(1), self_projections.max(1)
+        other_min = other_projections.min(1)
+        other_max = other_projections.max(1)
+        separated |= (((self_max <= other_min) | (other_max <= self_min)) &
+                      others.valid).any(axis=1)
+
+        return ~separated
 
 
     def distance(self, other, r=array([0, 0])):
@@ -373,7 +536,10 @@ class Polygon(object):
         support = _Support(P, Q) # support mapping function s_P-Q(r)
         v = support.get(r)       # initial support point
         w = support.add(-v)
+        i = 0
         while dot(v, v) - dot(w, v) > _MACHEPS: # while w is closer to origin
+            i += 1
+            if i > _MAX_ITERATIONS: break # return the best estimate
             v = support.v() # closest point to origin in support points
             if len(support) == 3: return v # the origin is inside W; intersection
             w = support.add(-v)
@@ -427,7 +593,8 @@ class Polygon(object):
         theta -- angular velocity in radians
 
         returns:
-        if r does not intersect other, returns False
+        if r does not intersect other, or the search does not converge,
+        returns False
         else, returns the hit scalar, hit vector, and hit normal
         hit scalar -- the scalar where r intersects other
         hit vector -- the vector where self intersects other
@@ -451,7 +618,10 @@ class Polygon(object):
         v = support.get(r) - q   # vector from q to s_P-Q
         p = support.add(-v)      # support returns a v opposite of r
         w = p - q
+        i = 0
         while dot(v, v) > _E * max(dot(p - q, p - q) for p in support):
+            i += 1
+            if i > _MAX_ITERATIONS: return False
             if dot(v, w) > 0:
                 if (dot(v, r) <= 0) and (dot(v, v) >  (L * L)): return False
                 n = -v
@@ -473,11 +643,10 @@ class Polygon(object):
 
     def _A(self):
         # the area of polygon
-        n = self.n
         P = self.P
         X, Y = P[:, 0], P[:, 1]
-        return 0.5 * sum(X[i] * Y[(i + 1) % n] - X[(i + 1) % n] * Y[i]
-                         for i in xrange(n))
+        X1, Y1 = _next(X), _next(Y)
+        return 0.5 * (X * Y1 - X1 * Y).sum()
 
 
     @property
@@ -485,27 +654,22 @@ class Polygon(object):
         """returns the centroid of the polygon"""
         a, n = self.a, self.n
         P = self.P
-        X, Y = _unzip(P)
+        X, Y = P[:, 0], P[:, 1]
 
         if n == 1: return P[0]
         if n == 2: return array([X[0] + X[1] / 2, Y[0] + Y[1] / 2])
 
-        c_x, c_y = 0, 0
-        for i in xrange(n):
-            a_i = X[i] * Y[(i + 1) % n] - X[(i + 1) % n] * Y[i]
-            c_x += (X[i] + X[(i + 1) % n]) * a_i
-            c_y += (Y[i] + Y[(i + 1) % n]) * a_i
+        X1, Y1 = _next(X), _next(Y)
+        a_i = X * Y1 - X1 * Y
         b = 1 / (6 * a)
-        c_x *= b
-        c_y *= b
-        return array([c_x, c_y])
+        return array([((X + X1) * a_i).sum() * b, ((Y + Y1) * a_i).sum() * b])
 
 
     @C.setter
     def C(self, (x, y)):
         c_x, c_y = self.C
         x, y = x - c_x, y - c_y
-        self.P = array([(p_x + x, p_y + y) for (p_x, p_y) in self.P])
+        self.P = self.P + (x, y)
 
 
     def _rotate(self, x0, theta, origin=None):
@@ -521,22 +685,23 @@ class Polygon(object):
         return (dot(A, x0) + origin).ravel()
 
 
+    def _rotate_rows(self, X, theta, origin):
+        A = array([[cos(theta), -sin(theta)], # rotation matrix
+                   [sin(theta), cos(theta)]])
+        return dot(X - origin, A.T) + origin
+
+
     def rotopoints(self, theta):
         """
         returns an array of points rotated theta radians around the centroid
         """
-        P = self.P
-        rotate = self._rotate
-        return array([rotate(p, theta) for p in P])
+        return self._rotate_rows(self.P, theta, self.C)
 
 
     def rotoedges(self, theta):
         """return an array of vectors of edges rotated theta radians"""
-        edges = self.edges
-        rotate = self._rotate
         # edges, essentially angles, are always rotated around (0, 0)
-        return array([rotate(edge, theta, origin=array([0, 0]))
-                      for edge in edges])
+        return self._rotate_rows(self.edges, theta, array([0, 0]))
 
 
     def rotate(self, theta): return Polygon(self.rotopoints(theta))
@@ -550,10 +715,9 @@ class Polygon(object):
 
     def project(self, axis):
         """project self onto axis"""
-        P = self.P
-        projected_points = [dot(p, axis) for p in P]
+        projected_points = dot(self.P, axis)
         # return the span of the projection
-        return min(projected_points), max(projected_points)
+        return projected_points.min(), projected_points.max()
 
     def intersection_points(self, other):
         """
@@ -563,11 +727,4 @@ class Polygon(object):
         returns Empty list if no collisions found
         returns List of intersection points
         """
-        points = []
-        for i, p in enumerate(self.P):
-            q = self.P[(i + 1) % len(self.P)]
-            for j, r in enumerate(other.P):
-                s = other.P[(j + 1) % len(other.P)]
-                ipt = _line_intersect(p, q, r, s)
-                if ipt: points.append(ipt)
-        return points
+        return _segment_intersections(self.P, other.P)
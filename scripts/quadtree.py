@@ -1,4 +1,15 @@
+import heapq
+from itertools import count
+from math import sqrt
 from rect import Rect
+from counters import registry
+
+def rect_distance(a, b):
+    """Get the distance between the closest points of the Rects *a* and *b*,
+    0 if they overlap"""
+    dx = max(0.0, a.left - b.right, b.left - a.right)
+    dy = max(0.0, a.bottom - b.top, b.bottom - a.top)
+    return sqrt(dx*dx + dy*dy)
 
 
 class QuadTree(object):
@@ -115,7 +126,13 @@ class QuadTree(object):
         @param xywh:
             The bounding rectangle being tested against the quad-tree.
         """
-        rect = Rect(xywh)
+        hits = set(self.__find(Rect(xywh)))
+        registry.add('quadtree_queries')
+        registry.add('quadtree_candidates', len(hits))
+        return hits
+
+    def __find(self, rect):
+        """Returns the list of items that overlap *rect*, with duplicates"""
         
         def overlaps(other):
             return rect.right >= other.left and rect.left <= other.right and \
@@ -128,15 +145,64 @@ class QuadTree(object):
         # Recursively check the lower quadrants.
         cx, cy = self.rect.center
         if self.nw and rect.left <= cx and rect.top >= cy:
-            hits += self.nw.find_items(rect)
+            hits += self.nw.__find(rect)
         if self.sw and rect.left <= cx and rect.bottom <= cy:
-            hits += self.sw.find_items(rect)
+            hits += self.sw.__find(rect)
         if self.ne and rect.right >= cx and rect.top >= cy:
-            hits += self.ne.find_items(rect)
+            hits += self.ne.__find(rect)
         if self.se and rect.right >= cx and rect.bottom <= cy:
-            hits += self.se.find_items(rect)
+            hits += self.se.__find(rect)
  
-        return set(hits)
+        return hits
+
+    def iter_nearest(self, xywh):
+        """Iterates over the items by the distance of their bounding
+        rectangles to a bounding rectangle.
+        
+        Yields (distance, item) tuples, nearest first, see :func:`rect_distance`.
+        The distance is a lower bound of the distance between the objects,
+        so that a search for the nearest object can stop as soon as the
+        distance is larger than the nearest object found so far.
+        The quadrants are visited only as far as the items are requested.
+        
+        @param xywh:
+            The bounding rectangle of the query.
+        """
+        rect = Rect(xywh)
+        registry.add('quadtree_nearest_queries')
+        # Every item overlaps the quadrants that contain it, and the point
+        # of the item closest to *rect* lies in one of them, so a quadrant
+        # is never farther than its items.
+        order = count()
+        heap = [(rect_distance(rect, self.rect), next(order), self, None)]
+        seen = set()
+        while heap:
+            distance, _, node, item = heapq.heappop(heap)
+            if node is None:
+                registry.add('quadtree_nearest_candidates')
+                yield distance, item
+                continue
+            for item, item_rect in node.items:
+                if id(item) not in seen:
+                    seen.add(id(item))
+                    heapq.heappush(heap, (rect_distance(rect, item_rect),
+                                          next(order), None, item))
+            for child in (node.nw, node.ne, node.se, node.sw):
+                if child is not None:
+                    heapq.heappush(heap, (rect_distance(rect, child.rect),
+                                          next(order), child, None))
+
+    def find_nearest(self, xywh, k=1):
+        """Returns the *k* items with the bounding rectangles nearest to
+        a bounding rectangle, as a list of (distance, item) tuples, nearest
+        first. See :meth:`iter_nearest`.
+        """
+        nearest = []
+        for hit in self.iter_nearest(xywh):
+            if len(nearest) >= k:
+                break
+            nearest.append(hit)
+        return nearest
      
     def __repr__(self):
         return "<%s %s>" % (self.__class__.__name__, self.rect)
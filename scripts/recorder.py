@@ -0,0 +1,244 @@
+import os
+import json
+import shutil
+import threading
+import Queue as queue
+import numpy as np
+
+FORMAT_VERSION = 1
+
+def _columns(robots, sensors):
+    """The columns of a recording with *robots* robots that have at most
+       *sensors* external sensors: name -> (dtype, shape of one step)"""
+    return {'time': ('<f8', ()),
+            'pose': ('<f8', (robots, 3)),
+            'wheel_speeds': ('<f8', (robots, 2)),
+            'sensor_distances': ('<f8', (robots, sensors)),
+            'sensor_readings': ('<f8', (robots, sensors)),
+            'controller': ('<i4', (robots,)),
+            'pose_est': ('<f8', (robots, 3))}
+
+def _write_header(path, header):
+    """Replace the header of the recording in *path*"""
+    filename = os.path.join(path, 'header.json')
+    with open(filename + '.tmp', 'w') as f:
+        json.dump(header, f)
+    os.rename(filename + '.tmp', filename)
+
+class _ColumnWriter(threading.Thread):
+    """Appends the steps of a recording to the column files, in the background"""
+
+    def __init__(self, path, names, size):
+        super(_ColumnWriter, self).__init__()
+        self.daemon = True
+        self.__files = [open(os.path.join(path, name + '.bin'), 'ab')
+                        for name in names]
+        self.__queue = queue.Queue(size)
+
+    def write(self, step):
+        """Queue *step*, a list of arrays in the order of the column names.
+           Waits only if the writer is *size* steps behind."""
+        self.__queue.put(step)
+
+    def close(self):
+        """Write the queued steps and close the files"""
+        self.__queue.put(None)
+        self.join()
+
+    def run(self):
+        while True:
+            step = self.__queue.get()
+            if step is None:
+                break
+            for f, values in zip(self.__files, step):
+                f.write(values.tostring())
+            if self.__queue.empty():
+                for f in self.__files:
+                    f.flush()
+        for f in self.__files:
+            f.close()
+
+class RunRecorder(object):
+    """Records the state of the robots at every simulation step.
+
+       The recording is a directory *path* with a copy of the *world*
+       XML file, a ``header.json`` and one append-only file per column.
+       Every step is a fixed-size row in every column, so that step *i*
+       starts at ``i`` times the row size. The columns are:
+
+       * ``'time'`` - the simulation time of the step
+       * ``'pose'`` - the (x, y, theta) of every robot
+       * ``'wheel_speeds'`` - the :meth:`~robot.Robot.get_wheel_speeds`
+       * ``'sensor_distances'`` and ``'sensor_readings'`` - the distance
+         and the reading of every external sensor
+       * ``'controller'`` - the index of the current controller of the
+         supervisor in the ``'controllers'`` list of the header, or -1
+       * ``'pose_est'`` - the pose estimated by the supervisor
+
+       Missing values are NaN. The rows are written by a background thread.
+       Use :class:`Recording` to read them.
+
+       :param path: The directory of the recording, created if necessary.
+                    It has to be empty or contain an older recording,
+                    which is replaced.
+       :param world: The world XML file of the simulation
+       :param robots: The robots of the simulation
+       :param size: The number of steps that can wait for the writer
+    """
+
+    def __init__(self, path, world, robots, size = 10000):
+        if os.path.exists(path) and not os.path.isdir(path):
+            raise ValueError("[RunRecorder] {} is not a directory".format(path))
+        if not os.path.isdir(path):
+            os.makedirs(path)
+        elif os.listdir(path) and \
+             not os.path.exists(os.path.join(path, 'header.json')):
+            raise ValueError("[RunRecorder] {} is not empty and not a recording".format(path))
+
+        sensors = max(len(robot.get_external_sensors()) for robot in robots)
+        self.__columns = _columns(len(robots), sensors)
+        # replace an old recording
+        for name in self.__columns:
+            filename = os.path.join(path, name + '.bin')
+            if os.path.exists(filename):
+                os.remove(filename)
+        shutil.copyfile(world, os.path.join(path, 'world.xml'))
+
+        self.__path = path
+        self.__names = sorted(self.__columns)
+        self.__controllers = [{} for robot in robots]
+        self.__steps = 0
+        _write_header(path, self.__get_header())
+        self.__writer = _ColumnWriter(path, self.__names, size)
+        self.__writer.start()
+
+    def __get_header(self):
+        return {'version': FORMAT_VERSION,
+                'columns': dict((name, [dtype, list(shape)])
+                                for name, (dtype, shape) in self.__columns.items()),
+                'controllers': [[name for name, index in sorted(names.values(),
+                                                                key=lambda c: c[1])]
+                                for names in self.__controllers],
+                'steps': self.__steps}
+
+    def add_step(self, time, robots, controllers, estimates = None):
+        """Record the state of *robots* at *time*.
+
+           *controllers* is a list of (controller, name) tuples, where the
+           controller identifies the current controller of each supervisor.
+           *estimates* is a list of estimated poses, or `None` if they are
+           not known.
+        """
+        row = dict((name, np.empty(shape, dtype))
+                   for name, (dtype, shape) in self.__columns.iteritems())
+        row['time'][()] = time
+        row['sensor_distances'].fill(np.nan)
+        row['sensor_readings'].fill(np.nan)
+        row['pose_est'].fill(np.nan)
+        for i, robot in enumerate(robots):
+            row['pose'][i] = tuple(robot.get_pose())
+            speeds = robot.get_wheel_speeds()
+            row['wheel_speeds'][i] = np.nan if speeds is None else speeds
+            for j, sensor in enumerate(robot.get_external_sensors()):
+                row['sensor_distances'][i,j] = sensor.distance()
+                row['sensor_readings'][i,j] = sensor.reading()
+            controller, name = controllers[i]
+            if controller is None:
+                row['controller'][i] = -1
+            else:
+                if controller not in self.__controllers[i]:
+                    self.__controllers[i][controller] = (name, len(self.__controllers[i]))
+                row['controller'][i] = self.__controllers[i][controller][1]
+            if estimates is not None:
+                row['pose_est'][i] = tuple(estimates[i])
+        self.__writer.write([row[name] for name in self.__names])
+        self.__steps += 1
+
+    def get_steps(self):
+        """Get the number of recorded steps"""
+        return self.__steps
+
+    def close(self):
+        """Write the remaining steps and the final header"""
+        if self.__writer is None:
+            return
+        writer, self.__writer = self.__writer, None
+        writer.close()
+        _write_header(self.__path, self.__get_header())
+
+class Recording(object):
+    """A recording of a run made by :class:`RunRecorder`.
+
+       The columns are memory-mapped, and available as arrays with the
+       step as the first index, e.g. ``recording['pose'][i]``. A recording
+       that was not closed, e.g. because the simulator crashed, can be
+       read up to the last complete step.
+    """
+
+    def __init__(self, path):
+        self.__path = path
+        with open(os.path.join(path, 'header.json')) as f:
+            header = json.load(f)
+        if header['version'] != FORMAT_VERSION:
+            raise ValueError("[Recording] Unknown format version {}".format(header['version']))
+        self.__controllers = header['controllers']
+
+        self.__steps = None
+        columns = {}
+        for name, (dtype, shape) in header['columns'].iteritems():
+            dtype, shape = np.dtype(str(dtype)), tuple(shape)
+            filename = os.path.join(path, name + '.bin')
+            steps = os.path.getsize(filename)//(dtype.itemsize*int(np.prod(shape)))
+            if self.__steps is None or steps < self.__steps:
+                self.__steps = steps
+            columns[name] = (filename, dtype, shape)
+
+        self.__columns = {}
+        for name, (filename, dtype, shape) in columns.iteritems():
+            if self.__steps == 0:
+                self.__columns[name] = np.zeros((0,) + shape, dtype)
+            else:
+                self.__columns[name] = np.memmap(filename, dtype, 'r',
+                                                 shape = (self.__steps,) + shape)
+
+    def __len__(self):
+        return self.__steps
+
+    def __getitem__(self, name):
+        return self.__columns[name]
+
+    def get_world(self):
+        """Get the path of the world XML file of the recording"""
+        return os.path.join(self.__path, 'world.xml')
+
+    def get_duration(self):
+        """Get the simulation time of the last step"""
+        if self.__steps == 0:
+            return 0.0
+        return float(self.__columns['time'][-1])
+
+    def find_step(self, time):
+        """Get the last step at or before *time*, or 0.
+
+           The steps of a run with a fixed period are found directly from
+           the time. If the step there does not match, e.g. because the
+           period changed during the run, the time column is searched.
+        """
+        times = self.__columns['time']
+        last = max(self.__steps - 1, 0)
+        if last > 0:
+            period = (times[last] - times[0])/last
+            if period > 0:
+                step = min(max(int(np.floor((time - times[0])/period)), 0), last)
+                if (step == 0 or times[step] <= time) and \
+                   (step == last or time < times[step + 1]):
+                    return step
+        step = int(np.searchsorted(times, time, 'right')) - 1
+        return min(max(step, 0), last)
+
+    def get_controller_name(self, robot, index):
+        """Get the class name of controller *index* of the robot with
+           index *robot*, or `None` if it is not known"""
+        if 0 <= index < len(self.__controllers[robot]):
+            return self.__controllers[robot][index]
+        return None
@@ -278,6 +278,16 @@ class Renderer:
         """
         raise NotImplementedError("Renderer.draw_line")
     
+    def draw_lines(self, lines):
+        """Draw many lines using the current pen at once.
+        
+        Expects a sequence of (x1, y1, x2, y2) tuples or an array of such rows.
+        The default implementation calls :meth:`draw_line` for every line,
+        subclasses can draw them in one call.
+        """
+        for x1, y1, x2, y2 in lines:
+            self.draw_line(x1, y1, x2, y2)
+    
     def draw_arrow(self, x1, y1, x2, y2, angle=0.3, ratio=0.1, close=False):
         """Draw an arrow from (x1, y1) to (x2, y2).
            You can also specify the arrowhead angle (in radians), the ratio
@@ -328,3 +338,35 @@ class Renderer:
         #"""Draws a text string at the defined position using the current brush
         #"""
         #raise NotImplementedError("Renderer.draw_text")
+
+class DrawingRecorder(object):
+    """A stand-in for a :class:`Renderer` that records all calls made to it,
+       so that they can be replayed on a real renderer later, e.g.
+       in another process.
+       
+       The recorded calls are pickleable if their arguments are.
+       
+       :param size: The value of the :attr:`size` attribute, that is the size
+                    of the canvas of the real renderer
+    """
+    def __init__(self, size = None):
+        self.size = size
+        self.calls = []
+
+    def __getattr__(self, name):
+        if name.startswith('__'):
+            raise AttributeError(name)
+        def record(*args, **kwargs):
+            self.calls.append((name, args, kwargs))
+        return record
+
+    def flush(self):
+        """Return the recorded calls and start a new recording"""
+        calls, self.calls = self.calls, []
+        return calls
+
+    @staticmethod
+    def replay(calls, renderer):
+        """Replay the recorded *calls* on *renderer*"""
+        for name, args, kwargs in calls:
+            getattr(renderer, name)(*args, **kwargs)
@@ -14,12 +14,31 @@ class Robot(SimObject):
        
        If your robot has sensors that can be drawn in the view, implement
        :meth:`~robot.Robot.draw_sensors`.
+       
+       The simulator measures the distance from the robot to the nearest
+       obstacle (see :meth:`get_clearance`). Robots can pass it to their
+       supervisors as ground truth in :meth:`get_info`.
        """
+
+    def __init__(self, pose, color = 0):
+        SimObject.__init__(self, pose, color)
+        self.__clearance = float('inf')
        
     def move(self,dt):
         """Move the robot for a time interval `dt`."""
         pass
     
+    def get_odometry(self):
+        """Return the state that :meth:`move` changes besides the pose,
+        e.g. the wheel encoders, so that the simulator can take a move
+        back (see :meth:`set_odometry`). The default implementation
+        returns `None`."""
+        return None
+
+    def set_odometry(self, odometry):
+        """Restore a state returned by :meth:`get_odometry`"""
+        pass
+    
     def get_info(self):
         """Return the robot information structure, including sensor readings and
         shape information"""
@@ -29,6 +48,34 @@ class Robot(SimObject):
         """Set drive inputs in the format needed by this robot"""
         pass
 
+    def get_max_speed(self):
+        """Return an upper bound on the speed of any point of the robot
+           with the current inputs, or `None` if it is not known.
+           
+           The simulator uses this bound to choose the physics step in the
+           adaptive stepping mode."""
+        return None
+
+    def get_wheel_speeds(self):
+        """Return the angular velocities of the (left, right) wheels,
+           or `None` if the robot has no such wheels."""
+        return None
+
+    def set_clearance(self, distance):
+        """Set the distance to the nearest obstacle. Called by the simulator."""
+        self.__clearance = distance
+
+    def get_clearance(self):
+        """Return the distance to the nearest obstacle at the last step,
+           or infinity if there are no obstacles."""
+        return self.__clearance
+
+    def set_noise(self, noise):
+        """Set the noise of the sensors and the actuators until the next
+           call, drawn by a :class:`~noise.NoiseModel` for this robot, or
+           `None` for no noise. The default implementation ignores it."""
+        pass
+
     def draw_sensors(self,renderer):
         """Draw the sensors that this robot has"""
         pass
@@ -0,0 +1,146 @@
+from time import sleep
+from time import time as wall_time
+
+class Scheduler(object):
+    """The scheduler keeps the periods of the stages of a simulation step
+       and decides which of them are due.
+
+       A stage is identified by its name, and runs every *period* seconds.
+       The deadlines of a stage are multiples of its period, counted from
+       the first time the stage was queried after the period was set or
+       the scheduler was reset, so that rounding errors do not accumulate
+       as drift. A stage without a period is due every time it is checked.
+
+       The scheduler does not know where the time comes from. The simulator
+       uses the simulation time for most stages and the wall clock time
+       for rendering.
+
+       Example::
+
+            s = Scheduler()
+            s.set_period('supervisors', 0.02)
+            s.set_period('sensors', 0.05)
+            t = s.next_time(['supervisors', 'sensors'], 0.0)  # 0.02
+            s.due('supervisors', t)  # True
+            s.due('sensors', t)      # False
+    """
+
+    def __init__(self):
+        self.__periods = {}
+        self.__deadlines = {}
+
+    def set_period(self, stage, period):
+        """Set the *period* of *stage* in seconds.
+           If *period* is `None`, the stage becomes due every time."""
+        if period is None:
+            self.__periods.pop(stage, None)
+        elif period <= 0:
+            raise ValueError("[Scheduler.set_period] The period of '{}' must be positive".format(stage))
+        else:
+            self.__periods[stage] = float(period)
+        self.__deadlines.pop(stage, None)
+
+    def get_period(self, stage):
+        """Get the period of *stage*, or `None` if it has none."""
+        return self.__periods.get(stage)
+
+    def get_stages(self):
+        """Get the list of stages that have a period."""
+        return self.__periods.keys()
+
+    def reset(self):
+        """Restart the deadlines of all stages from the next query."""
+        self.__deadlines = {}
+
+    def __deadline(self, stage, time):
+        if stage not in self.__deadlines:
+            self.__deadlines[stage] = (time, 1)
+        start, k = self.__deadlines[stage]
+        return start + k*self.__periods[stage]
+
+    def next_time(self, stages, time):
+        """Get the earliest deadline of *stages* after *time*.
+           Stages without a period are ignored.
+           Returns `None` if none of the stages has a period."""
+        deadlines = [self.__deadline(stage, time)
+                     for stage in stages if stage in self.__periods]
+        if not deadlines:
+            return None
+        return min(deadlines)
+
+    def due(self, stage, time):
+        """Return `True` if *stage* is due at *time* and schedule its next
+           deadline. Deadlines that were missed completely are skipped."""
+        if stage not in self.__periods:
+            return True
+        period = self.__periods[stage]
+        if time < self.__deadline(stage, time) - 1e-9*period:
+            return False
+        start, k = self.__deadlines[stage]
+        k = max(k + 1, int((time - start)/period + 1e-9) + 1)
+        self.__deadlines[stage] = (start, k)
+        return True
+
+class Pacer(object):
+    """The pacer keeps the simulation time in step with the wall clock.
+
+       The simulation time *t* is due at the wall clock time
+       ``start + (t - t_start)/multiplier``. :meth:`wait` sleeps only for
+       the time that remains until this deadline, so that the time spent
+       on computations does not make the simulation drift behind.
+
+       If a deadline has already passed, it is counted as an overrun. If the
+       simulation falls behind by more than *max_lag* seconds of wall clock
+       time, it does not try to catch up, and the deadlines are counted anew
+       from the current time.
+
+       The achieved real-time factor, the simulation time that passes in
+       one second of wall clock time, is measured from the last :meth:`reset`.
+    """
+
+    def __init__(self, max_lag = 0.25):
+        self.__max_lag = max_lag
+        self.__multiplier = 1.0
+        self.reset(0.0)
+
+    def reset(self, sim_time, multiplier = None):
+        """Count the deadlines and the real-time factor from *sim_time* now.
+           If *multiplier* is not `None`, it becomes the requested real-time
+           factor."""
+        if multiplier is not None:
+            self.__multiplier = float(multiplier)
+        self.__start = (wall_time(), sim_time)
+        self.__anchor = self.__start
+        self.__last = self.__start
+        self.__overruns = 0
+        self.__ticks = 0
+
+    def wait(self, sim_time):
+        """Sleep until the wall clock deadline of *sim_time*"""
+        wall_anchor, sim_anchor = self.__anchor
+        delay = wall_anchor + (sim_time - sim_anchor)/self.__multiplier - wall_time()
+        self.__ticks += 1
+        if delay > 0:
+            sleep(delay)
+        else:
+            self.__overruns += 1
+            if -delay > self.__max_lag:
+                self.__anchor = (wall_time(), sim_time)
+        self.__last = (wall_time(), sim_time)
+
+    def get_multiplier(self):
+        """Get the requested real-time factor"""
+        return self.__multiplier
+
+    def get_real_time_factor(self):
+        """Get the achieved real-time factor, or `None` if it is not known yet"""
+        wall, sim_time = self.__last
+        wall_start, sim_start = self.__start
+        if wall <= wall_start:
+            return None
+        return (sim_time - sim_start)/(wall - wall_start)
+
+    def get_overruns(self):
+        """Get the number of missed deadlines and the number of all deadlines
+           since the last reset, as a tuple."""
+        return self.__overruns, self.__ticks
@@ -6,19 +6,22 @@
 #
 
 import random
+import numpy as np
 from simobject import SimObject
+from counters import registry
 from pose import Pose
-from math import sin, cos, sqrt
+from math import sin, cos, sqrt, pi
 
 from robot import Robot
 
 class Sensor:
     """Base superclass for sensor objects"""
-    @classmethod
+    @staticmethod
     def add_gauss_noise(value, sigma):
         """Returns the value with an added normal noise
         
-        The return value is normally distributed around value with a standard deviation sigma
+        The return value is normally distributed around value with a standard deviation sigma.
+        The simulator adds the noise of all robots at once, see :class:`~noise.NoiseModel`.
         """
         return random.gauss(value,sigma)
   
@@ -27,19 +30,32 @@ class MountedSensor(SimObject, Sensor):
     
        The sensor is assumed to be attached to *parent* at *pose* in local
        coordinates.
+       
+       The world pose of the sensor is cached against the pose versions
+       of both the sensor and its parent.
     """
     def __init__(self,pose,parent):
-        SimObject.__init__(self,pose)
         self.__frame = parent
+        self.__world_pose = None
+        SimObject.__init__(self,pose)
 
     def get_internal_pose(self):
         """Get the pose of the sensor in the parent (robot) coordinates."""
         return SimObject.get_pose(self)
        
+    def get_pose_version(self):
+        """Get the combined pose version of the sensor and its parent."""
+        return (SimObject.get_pose_version(self), self.__frame.get_pose_version())
+
     def get_pose(self):
-        x, y, t = SimObject.get_pose(self)
-        rx, ry, rt = self.__frame.get_pose()
-        return Pose(rx+x*cos(rt)-y*sin(rt),ry+x*sin(rt)+y*cos(rt),t+rt)
+        """Get the pose of the sensor in world coordinates"""
+        version = self.get_pose_version()
+        if self.__world_pose is None or self.__world_pose[0] != version:
+            x, y, t = SimObject.get_pose(self)
+            wx, wy, _ = np.dot(self.__frame.get_transformation(), (x, y, 1.0))
+            self.__world_pose = (version,
+                                 Pose(wx, wy, t + self.__frame.get_pose().theta))
+        return self.__world_pose[1]
     
 class ProximitySensor(MountedSensor):
     """Create a proximity sensor mounted on robot at *pose*. The geometry
@@ -102,6 +118,16 @@ class ProximitySensor(MountedSensor):
                     return True
         return False
 
+    def set_distance(self, distance):
+        """Set the distance reading directly, e.g. from a recording.
+           A distance beyond *rmax* means that nothing is detected."""
+        if distance > self.rmax:
+            self.update_distance()
+        else:
+            self.set_color(0xCCFF5566)
+            self.pts = self.get_cone(distance)
+            self.__distance = distance
+
     def draw(self, r):
         """draws the sensor simobject"""
         r.set_pose(self.get_pose())
@@ -114,6 +140,7 @@ class ProximitySensor(MountedSensor):
         returns distance in meters or None if not in contact"""
         ox, oy, ot = self.get_pose()
         min_distance = None
+        registry.add('sensor_intersections')
         for px, py in self.get_contact_points(sim_object):
             distance = sqrt((px-ox)*(px-ox)+(py-oy)*(py-oy))
             if min_distance is not None:
@@ -121,3 +148,236 @@ class ProximitySensor(MountedSensor):
                     min_distance = distance
             else: min_distance = distance
         return min_distance
+
+class LidarSensor(MountedSensor):
+    """A scanning range finder mounted on *robot* at *pose*, with *beams*
+       beams spread evenly over *angle* radians around the direction of
+       the sensor, that reach up to *rmax* meters.
+       
+       The beams of all lidars are cast at once by the simulator, see
+       :meth:`cast`. A beam that does not hit anything has an infinite
+       distance.
+
+       The envelope of the lidar is only its housing. The objects that
+       the beams can reach are in :meth:`get_range_rect`.
+    """
+    def __init__(self, pose, robot, beams = 360, angle = 2*pi, rmax = 4.0):
+        MountedSensor.__init__(self, pose, robot)
+        self.beams, self.angle, self.rmax = beams, angle, rmax
+        if angle >= 2*pi:
+            self.__angles = np.linspace(-pi, pi, beams, endpoint = False)
+        else:
+            self.__angles = np.linspace(-angle/2, angle/2, beams)
+        self.__directions = np.column_stack((np.cos(self.__angles),
+                                             np.sin(self.__angles)))
+        self.__distances = np.empty(beams)
+        self.__distances.fill(np.inf)
+        self.__recorded = None
+        self.set_color(0x80FF5566)
+
+    def get_envelope(self):
+        """Return the housing of the sensor, a 2 cm square"""
+        return [(-0.01, -0.01), (0.01, -0.01), (0.01, 0.01), (-0.01, 0.01)]
+
+    def get_range_rect(self):
+        """Get the rectangle that contains all beams as a tuple
+           (x, y, width, height)"""
+        x, y, theta = self.get_pose()
+        return (x - self.rmax, y - self.rmax, 2*self.rmax, 2*self.rmax)
+
+    def get_beam_angles(self):
+        """Get the angles of the beams relative to the sensor, as an array"""
+        return self.__angles
+
+    def get_distances(self):
+        """Get the distances measured by the beams, as an array"""
+        return self.__distances
+
+    def set_distances(self, distances):
+        """Set the distances of all beams"""
+        self.__distances = distances
+        self.__recorded = None
+
+    def distance(self):
+        """Returns the shortest distance of all beams"""
+        if self.__recorded is not None:
+            return self.__recorded
+        return self.__distances.min()
+
+    def reading(self):
+        """Returns the shortest distance of all beams"""
+        return self.distance()
+
+    def set_distance(self, distance):
+        """Set the shortest distance, e.g. from a recording. It is returned
+           by :meth:`distance` until the beams are cast again. The beam
+           directions are not recorded, so all beams are cleared."""
+        self.__distances = np.empty(self.beams)
+        self.__distances.fill(np.inf)
+        self.__recorded = distance
+
+    def draw(self, r):
+        """Draw the beams up to their hits, in one call"""
+        r.set_pose(self.get_pose())
+        r.set_pen(self.get_color())
+        hits = np.isfinite(self.__distances)
+        ends = self.__directions[hits]*self.__distances[hits,None]
+        r.draw_lines(np.column_stack((np.zeros_like(ends), ends)))
+
+    @staticmethod
+    def cast(lidars, candidates):
+        """Cast all beams of *lidars* against the edges of their candidates
+           at once, and set their distances.
+
+           *candidates* is a list with the objects that can be hit by every
+           lidar (e.g. from a :class:`~quadtree.QuadTree`). The edges are
+           those of the world polygons of the objects, like in the collision
+           checks. The intersections of every beam with the edges of the
+           candidates of its lidar are computed in one vectorized step, on
+           arrays padded to the largest number of beams and edges.
+        """
+        polygons = {}
+        edges = []
+        for objects in candidates:
+            starts = [polygons.setdefault(id(obj), obj.get_world_polygon().P)
+                      for obj in objects]
+            if starts:
+                ends = [np.roll(P, -1, axis=0) for P in starts]
+                edges.append((np.concatenate(starts), np.concatenate(ends)))
+            else:
+                edges.append((np.zeros((0, 2)), np.zeros((0, 2))))
+
+        n_beams = max(lidar.beams for lidar in lidars)
+        n_edges = max(len(starts) for starts, ends in edges)
+        # beam directions, edge starts relative to the lidar, edge vectors
+        D = np.zeros((len(lidars), n_beams, 2))
+        W = np.zeros((len(lidars), n_edges, 2))
+        E = np.zeros((len(lidars), n_edges, 2))
+        R = np.empty((len(lidars), 1, 1))
+        for k, (lidar, (starts, ends)) in enumerate(zip(lidars, edges)):
+            x, y, theta = lidar.get_pose()
+            c, s = cos(theta), sin(theta)
+            d = lidar.__directions
+            D[k,:lidar.beams,0] = c*d[:,0] - s*d[:,1]
+            D[k,:lidar.beams,1] = s*d[:,0] + c*d[:,1]
+            W[k,:len(starts)] = starts - (x, y)
+            E[k,:len(starts)] = ends - starts
+            R[k] = lidar.rmax
+
+        # beam: o + t*d, edge: a + u*e, with w = a - o
+        denominator = D[:,:,None,0]*E[:,None,:,1] - D[:,:,None,1]*E[:,None,:,0]
+        with np.errstate(divide = 'ignore', invalid = 'ignore'):
+            t = (W[...,0]*E[...,1] - W[...,1]*E[...,0])[:,None,:]/denominator
+            u = (W[:,None,:,0]*D[:,:,None,1] - W[:,None,:,1]*D[:,:,None,0])/denominator
+            hit = (np.abs(denominator) > 1e-12) & (t >= 0) & (t <= R) & (u >= 0) & (u <= 1)
+        registry.add('lidar_intersections', t.size)
+        distances = np.where(hit, t, np.inf).min(axis=2) if n_edges else \
+                    np.full((len(lidars), n_beams), np.inf)
+
+        for k, lidar in enumerate(lidars):
+            lidar.set_distances(distances[k,:lidar.beams].copy())
+
+class MarkerSensor(MountedSensor):
+    """A landmark sensor mounted on *robot* at *pose*, that detects the
+       markers of the world within *fov* radians around the direction of
+       the sensor and closer than *rmax* meters, if the line of sight to
+       them is not blocked by an obstacle.
+
+       A marker is detected at the center of its points. The detections
+       are (marker, bearing, range) tuples sorted by range, where the
+       marker is its index in the world and the bearing is relative to
+       the direction of the sensor.
+    """
+    def __init__(self, pose, robot, fov = pi/2, rmax = 2.0):
+        MountedSensor.__init__(self, pose, robot)
+        self.fov, self.rmax = fov, rmax
+        # a fan that contains the arc of the field of view
+        steps = 8
+        half = min(fov, 2*pi)/2
+        r = rmax/cos(half/steps)
+        self.__envelope = [(0,0)] + \
+            [(r*cos(a), r*sin(a)) for a in np.linspace(-half, half, steps + 1)]
+        self.__detections = []
+        self.__recorded = None
+        self.set_color(0x8000AA00)
+
+    def get_envelope(self):
+        """Return a polygon that contains the field of view"""
+        return self.__envelope
+
+    def get_detections(self):
+        """Get the list of (marker, bearing, range) detections"""
+        return self.__detections
+
+    def distance(self):
+        """Returns the range of the nearest marker, or `numpy.inf`"""
+        if self.__recorded is not None:
+            return self.__recorded
+        if self.__detections:
+            return self.__detections[0][2]
+        return np.inf
+
+    def reading(self):
+        """Returns the range of the nearest marker"""
+        return self.distance()
+
+    def set_distance(self, distance):
+        """Set the range of the nearest marker, e.g. from a recording. It is
+           returned by :meth:`distance` until the markers are detected again.
+           The markers are not recorded, so the detections are cleared."""
+        self.__detections = []
+        self.__recorded = distance
+
+    def update_markers(self, markers, occluders = None):
+        """Detect *markers*, a list of (marker, (x, y)) candidates.
+
+           The line of sight to the markers in the field of view is checked
+           against the obstacles that *occluders* (a
+           :class:`~quadtree.QuadTree`, or `None` for no occlusion) finds
+           around the lines, with all lines and edges tested at once.
+        """
+        self.__detections = []
+        self.__recorded = None
+        if not markers:
+            return
+        registry.add('marker_candidates', len(markers))
+        x, y, theta = self.get_pose()
+        ids = [marker for marker, position in markers]
+        points = np.array([position for marker, position in markers], dtype=float)
+        offsets = points - (x, y)
+        ranges = np.sqrt((offsets**2).sum(axis=1))
+        bearings = (np.arctan2(offsets[:,1], offsets[:,0]) - theta + pi)%(2*pi) - pi
+        visible = np.nonzero((ranges <= self.rmax) & (np.abs(bearings) <= self.fov/2))[0]
+        if not len(visible):
+            return
+
+        if occluders is not None:
+            low = np.minimum(points[visible].min(axis=0), (x, y))
+            high = np.maximum(points[visible].max(axis=0), (x, y))
+            polygons = [obstacle.get_world_polygon().P for obstacle in
+                        occluders.find_items(tuple(low) + tuple(high - low))]
+            if polygons:
+                starts = np.concatenate(polygons)
+                E = np.concatenate([np.roll(P, -1, axis=0) for P in polygons]) - starts
+                W = starts - (x, y)
+                D = offsets[visible]
+                # sight line: o + t*d, edge: a + u*e, with w = a - o
+                denominator = D[:,None,0]*E[None,:,1] - D[:,None,1]*E[None,:,0]
+                with np.errstate(divide = 'ignore', invalid = 'ignore'):
+                    t = (W[:,0]*E[:,1] - W[:,1]*E[:,0])[None,:]/denominator
+                    u = (W[None,:,0]*D[:,None,1] - W[None,:,1]*D[:,None,0])/denominator
+                    blocked = (np.abs(denominator) > 1e-12) & \
+                              (t >= 0) & (t <= 1) & (u >= 0) & (u <= 1)
+                registry.add('marker_occlusion_tests', t.size)
+                visible = visible[~blocked.any(axis=1)]
+
+        self.__detections = sorted(((ids[i], float(bearings[i]), float(ranges[i]))
+                                    for i in visible),
+                                   key = lambda detection: detection[2])
+
+    def draw(self, r):
+        """Draw the lines of sight to the detected markers"""
+        r.set_pose(self.get_pose())
+        r.set_pen(self.get_color())
+        r.draw_lines([(0, 0, distance*cos(bearing), distance*sin(bearing))
+                      for marker, bearing, distance in self.__detections])
@@ -1,11 +1,18 @@
-from math import sin, cos
+import numpy as np
 import pylygon
+from counters import registry
 from pose import Pose
 
 class SimObject:
     """The base class for all objects that can be drawn in the simulator. 
        Every SimObject has a pose, an envelope and a color.
 
+       Every call to :meth:`set_pose` increments the pose version of the object
+       (see :meth:`get_pose_version`). The world transformation, the world
+       envelope and the bounds are cached against this version, so that they
+       are calculated at most once per pose change. The same holds for the
+       :class:`pylygon.Polygon` used in collision checks.
+
        :param pose: The position of the object.
        :type pose: :class:`~pose.Pose`
        :param color: The internal color of the object (`0xAARRGGBB` or `0xRRGGBB`).
@@ -16,6 +23,10 @@ class SimObject:
     def __init__(self, pose, color = 0):
         """Create an object at *pose* with *color*
         """
+        self.__pose_version = 0
+        self.__local_envelope = None
+        self.__local_points = None
+        self.__local_hull = None
         self.set_color(color)
         self.set_pose(pose)
 
@@ -34,7 +45,30 @@ class SimObject:
     def set_pose(self,pose):
         """Set the pose of the object in world coordinates"""
         self.__world_envelope = None
+        self.__world_polygon = None
+        self.__transformation = None
+        self.__bounds = None
         self.__pose = pose
+        self.__pose_version += 1
+
+    def get_pose_version(self):
+        """Get the pose version of the object.
+        
+           The version changes every time the pose of the object changes.
+           Cached values that depend on the pose should be stored together
+           with the version they were calculated for.
+        """
+        return self.__pose_version
+
+    def get_transformation(self):
+        """Get the 3x3 transformation matrix of the object's pose.
+
+           The matrix is cached until the pose version changes.
+        """
+        version = self.get_pose_version()
+        if self.__transformation is None or self.__transformation[0] != version:
+            self.__transformation = (version, self.get_pose().get_transformation())
+        return self.__transformation[1]
 
     def draw(self, renderer):
         """Draws the object using *renderer* (see :class:`~renderer.Renderer`).
@@ -56,15 +90,31 @@ class SimObject:
         """Get the envelope of the object in world coordinates.
            Used for checking collision.
            
-           The envelope is cached, and will be recalculated if *recalculate*
-           is `True`.
+           The envelope is returned as a numpy array of *xy* rows. It is cached
+           against the pose version, and will also be recalculated if
+           *recalculate* is `True`.
         """
-        if self.__world_envelope is None or recalculate:
-            x,y,t = self.get_pose()
-            self.__world_envelope = [(x+p[0]*cos(t)-p[1]*sin(t),
-                                      y+p[0]*sin(t)+p[1]*cos(t))
-                                     for p in self.get_envelope()]
-        return self.__world_envelope
+        version = self.get_pose_version()
+        if self.__world_envelope is None or recalculate \
+           or self.__world_envelope[0] != version:
+            T = self.get_transformation()
+            self.__world_envelope = (version,
+                np.dot(self.__get_local_points(), T[:2,:2].T) + T[:2,2])
+        return self.__world_envelope[1]
+
+    def __get_local_points(self):
+        """Get the local envelope as a numpy array of *xy* rows.
+        
+           The conversion and the convex hull of the envelope are recalculated
+           only if :meth:`get_envelope` returns a different object.
+        """
+        envelope = self.get_envelope()
+        if envelope is not self.__local_envelope:
+            self.__local_envelope = envelope
+            self.__local_points = np.array(
+                [(p[0], p[1]) for p in envelope], dtype=float)
+            self.__local_hull = pylygon.convexhull(self.__local_points)
+        return self.__local_points
     
     def get_bounding_rect(self):
         """Get the smallest rectangle that contains the object
@@ -72,16 +122,33 @@ class SimObject:
         xmin, ymin, xmax, ymax = self.get_bounds()
         return (xmin,ymin,xmax-xmin,ymax-ymin)
     
+    def get_world_polygon(self):
+        """Get the world envelope as a :class:`pylygon.Polygon`.
+           
+           The polygon is cached against the pose version.
+        """
+        version = self.get_pose_version()
+        if self.__world_polygon is None or self.__world_polygon[0] != version:
+            # The hull of the local envelope is rotated and moved,
+            # so it is still convex and CCW
+            self.__get_local_points()
+            self.__world_polygon = (version,
+                pylygon.Polygon(self.get_world_envelope()[self.__local_hull],
+                                conv=False))
+            registry.add('polygons')
+        return self.__world_polygon[1]
+
     def has_collision(self, other):
         """Check if the object has collided with *other*.
         Return True or False"""
-        self_poly = pylygon.Polygon(self.get_world_envelope())
-        other_poly = pylygon.Polygon(other.get_world_envelope())
+        self_poly = self.get_world_polygon()
+        other_poly = other.get_world_polygon()
         
         # TODO: use distance() for performance
         #print "Dist:", self_poly.distance(other_poly)
         
         collision = self_poly.collidepoly(other_poly)
+        registry.add('sat_tests')
         if isinstance(collision, bool):
             if not collision: return False
         
@@ -90,19 +157,60 @@ class SimObject:
         # end of test code
         
         return True
+
+    def get_collisions(self, others):
+        """Check the collisions with all of *others* at once.
+        Return the list of objects from *others* that collide with the object"""
+        others = list(others)
+        if not others:
+            return []
+        collisions = self.get_world_polygon().collidepolys(
+                        [other.get_world_polygon() for other in others])
+        registry.add('sat_tests', len(others))
+        return [other for other, collision in zip(others, collisions) if collision]
     
+    def get_distance(self, other):
+        """Get the distance between the object and *other*, 0 if they
+        collide. The distance is measured between the convex hulls of the
+        envelopes, like in the collision checks."""
+        v = self.get_world_polygon().distance(other.get_world_polygon())
+        registry.add('gjk_tests')
+        return float(np.sqrt(np.dot(v, v)))
+
+    def get_nearest(self, qtree):
+        """Find the nearest object to this one in the :class:`~quadtree.QuadTree`
+        *qtree*. Return a (distance, object) tuple, or (`None`, `None`) if
+        the tree is empty.
+        
+        The candidates are refined with :meth:`get_distance` in the order
+        of their bounding rectangles, until the rectangles are farther away
+        than the nearest object found."""
+        nearest, distance = None, None
+        for bound, other in qtree.iter_nearest(self.get_bounding_rect()):
+            if distance is not None and bound >= distance:
+                break
+            d = self.get_distance(other)
+            if distance is None or d < distance:
+                nearest, distance = other, d
+        return distance, nearest
+
     def get_contact_points(self, other):
         """Get a list of contact points with other object.
            Returns a list of (x, y)"""
-        self_poly = pylygon.Polygon(self.get_world_envelope())
-        other_poly = pylygon.Polygon(other.get_world_envelope())
+        self_poly = self.get_world_polygon()
+        other_poly = other.get_world_polygon()
         return self_poly.intersection_points(other_poly)
 
     def get_bounds(self):
         """Get the smallest rectangle that contains the object
            as a tuple (xmin, ymin, xmax, ymax)"""
-        xs, ys = zip(*self.get_world_envelope())
-        return (min(xs), min(ys), max(xs), max(ys))
+        version = self.get_pose_version()
+        if self.__bounds is None or self.__bounds[0] != version:
+            envelope = self.get_world_envelope()
+            xmin, ymin = envelope.min(axis=0)
+            xmax, ymax = envelope.max(axis=0)
+            self.__bounds = (version, (xmin, ymin, xmax, ymax))
+        return self.__bounds[1]
             
 
 class Polygon(SimObject):
@@ -0,0 +1,202 @@
+import multiprocessing as mp
+import threading
+import Queue as queue
+import sys
+import cPickle as pickle
+from traceback import print_exception
+
+from renderer import DrawingRecorder
+from simulator import Simulator
+
+def _forward_commands(conn, in_queue, renderer, robots):
+    """Pass the commands from the UI process to the simulator"""
+    while True:
+        try:
+            name, args = conn.recv()
+        except EOFError:
+            name, args = 'stop', ()
+        if name == 'renderer_size':
+            renderer.size = args[0]
+            continue
+        if name == 'apply_parameters':
+            # the simulator logs the robots that are not found
+            robot_id, parameters = args
+            args = (robots.get(robot_id), parameters)
+        in_queue.put((name, args))
+        if name == 'stop':
+            break
+
+def _run_simulator(conn, renderer_size, sim_time, sim_running, sim_pacing, frames):
+    """Run a simulator in this process, and talk to the UI through *conn*.
+
+       The draw calls are recorded, and sent to the UI before every
+       ``update_view`` event. The robots are sent to the UI as integer ids.
+    """
+    renderer = DrawingRecorder(renderer_size)
+    in_queue = queue.Queue()
+    simulator = Simulator(renderer, in_queue)
+    robots, new_robots = {}, {}
+    next_id = 0
+
+    receiver = threading.Thread(target=_forward_commands,
+                                args=(conn, in_queue, renderer, robots))
+    receiver.daemon = True
+    simulator.start()
+    receiver.start()
+
+    out_queue = simulator._out_queue
+    while simulator.is_alive() or not out_queue.empty():
+        try:
+            name, args = out_queue.get(timeout=0.1)
+        except queue.Empty:
+            continue
+
+        sim_time.value = simulator.get_time()
+        sim_running.value = simulator.is_running()
+        real_time_factor = simulator.get_real_time_factor()
+        sim_pacing[0] = -1 if real_time_factor is None else real_time_factor
+        sim_pacing[1], sim_pacing[2] = simulator.get_overruns()
+
+        if name == 'make_param_window':
+            robot, window_name, parameters = args
+            new_robots[next_id] = robot
+            args = (next_id, window_name, parameters)
+            next_id += 1
+        elif name == 'reset':
+            robots.clear()
+            robots.update(new_robots)
+            new_robots.clear()
+        elif name == 'exception':
+            e_type, e_value, e_traceback = args
+            print_exception(e_type, e_value, e_traceback)
+            try:
+                pickle.dumps((e_type, e_value), -1)
+            except Exception:
+                e_type, e_value = Exception, Exception(str(e_value))
+            args = (e_type, e_value, None)
+        elif name == 'update_view':
+            # Let the UI show the previous frame before sending the next one
+            frames.acquire()
+            conn.send(('draw', (renderer.flush(),)))
+
+        try:
+            conn.send((name, args))
+        finally:
+            out_queue.task_done()
+
+    conn.close()
+
+class SimulatorProcess(object):
+    """A replacement for :class:`~simulator.Simulator` that runs the
+       simulator in a separate process, so that it does not compete with the
+       UI for the interpreter lock.
+
+       The commands and events are the same ``(name, args)`` tuples as for
+       the simulator thread (see :ref:`ui-sim-queue`), passed through a
+       `multiprocessing` pipe. The only difference for the UI is that
+       robots are identified by integer ids. The draw calls of the simulator
+       are recorded with a :class:`~renderer.DrawingRecorder` and replayed
+       on *renderer* in the UI process, before ``update_view`` is passed on.
+       The simulation time and state are shared through
+       `multiprocessing.Value`.
+
+       The UI can use :meth:`start`, :meth:`is_alive`, :meth:`join`,
+       :meth:`get_time`, :meth:`is_running`, :meth:`get_real_time_factor`,
+       :meth:`get_overruns` and *_out_queue* like with the simulator thread.
+
+       :param renderer: The renderer that will show the world.
+       :type renderer: :class:`~renderer.Renderer`
+       :param in_queue: The queue that is used to send events to the simulator.
+       :type in_queue: :class:`Queue.Queue`
+    """
+
+    def __init__(self, renderer, in_queue):
+        self.__renderer = renderer
+        self.__renderer_size = renderer.size
+        self.__in_queue = in_queue
+        self._out_queue = queue.Queue()
+
+        self.__time = mp.Value('d', 0.0, lock=False)
+        self.__running = mp.Value('b', False, lock=False)
+        # real-time factor, overruns, steps
+        self.__pacing = mp.Array('d', [-1, 0, 0], lock=False)
+        self.__frames = mp.Semaphore(1)
+
+        self.__conn, child_conn = mp.Pipe()
+        self.__process = mp.Process(target=_run_simulator,
+                                    args=(child_conn, renderer.size,
+                                          self.__time, self.__running,
+                                          self.__pacing, self.__frames))
+        self.__process.daemon = True
+
+        self.__sender = threading.Thread(target=self.__send_commands)
+        self.__sender.daemon = True
+        self.__receiver = threading.Thread(target=self.__receive_events)
+        self.__receiver.daemon = True
+
+    def start(self):
+        """Start the simulator process"""
+        self.__process.start()
+        self.__sender.start()
+        self.__receiver.start()
+
+    def is_alive(self):
+        """Return `True` until the simulator has stopped"""
+        return self.__receiver.is_alive()
+
+    isAlive = is_alive
+
+    def join(self, timeout = None):
+        """Wait until the simulator has stopped"""
+        self.__receiver.join(timeout)
+        if not self.__receiver.is_alive():
+            self.__process.join(timeout)
+
+    def get_time(self):
+        """Get the simulation time"""
+        return self.__time.value
+
+    def is_running(self):
+        """Get the simulation state as a `bool`"""
+        return bool(self.__running.value)
+
+    def get_real_time_factor(self):
+        """Get the achieved real-time factor,
+           see :meth:`simulator.Simulator.get_real_time_factor`"""
+        if self.__pacing[0] < 0:
+            return None
+        return self.__pacing[0]
+
+    def get_overruns(self):
+        """Get the late and all steps, see :meth:`simulator.Simulator.get_overruns`"""
+        return int(self.__pacing[1]), int(self.__pacing[2])
+
+    def __send_commands(self):
+        while True:
+            name, args = self.__in_queue.get()
+            try:
+                if self.__renderer.size != self.__renderer_size:
+                    self.__renderer_size = self.__renderer.size
+                    self.__conn.send(('renderer_size', (self.__renderer_size,)))
+                self.__conn.send((name, args))
+            except IOError:
+                break
+            finally:
+                self.__in_queue.task_done()
+            if name == 'stop':
+                break
+
+    def __receive_events(self):
+        while True:
+            try:
+                name, args = self.__conn.recv()
+            except EOFError:
+                break
+            if name == 'draw':
+                DrawingRecorder.replay(args[0], self.__renderer)
+            elif name == 'update_view':
+                self._out_queue.put((name, args))
+                self._out_queue.join() # wait until drawn
+                self.__frames.release()
+            else:
+                self._out_queue.put((name, args))
@@ -1,13 +1,28 @@
 import threading
 import Queue as queue
-from time import sleep, clock
+from time import sleep, clock, time
 from xmlreader import XMLReader
 import helpers
-from math import sqrt
+from math import sqrt, sin, cos, pi, ceil
 import sys
+import numpy as np
 
 import pose
+import pylygon
 import simobject
+from scheduler import Scheduler, Pacer
+from stats import StatsGroup, StepTimers, DecimatedHistory, timer
+from counters import registry
+from eventlog import EventLog, DEBUG, INFO, WARNING, ERROR
+from profiling import StepProfiler
+from recorder import RunRecorder, Recording
+from telemetry import TelemetryWriter
+from metrics import Metric, MetricsServer
+from analytics import RunAnalytics
+from distancefield import load_field
+from noise import NoiseModel
+from sensor import ProximitySensor, LidarSensor, MarkerSensor
+from supervisorpool import SupervisorPool
 from quadtree import QuadTree, Rect
 
 PAUSE = 0
@@ -49,13 +64,23 @@ class Simulator(threading.Thread):
         self.__show_sensors = True
         self.__draw_supervisors = False
         self.__show_tracks = True
+        self.__ccd = False
+        self.__ccd_tolerance = 0.001 # 1 millimeter
+        self.__sensor_tolerance = (0.0, 0.0) # reuse only if not moved
+        self.__clearance = True
+        self.__field_config = None
+        self.__noise = None
+        self.__sleep_delay = None # control periods, None if disabled
+        self.__supervisor_processes = 0
+        self.__adaptive = False
+        self.__min_step = 0.001
         
         self.__in_queue = in_queue
         self._out_queue = queue.Queue()
 
-        # Zoom on scene - Move to read_config later
-        self.__time_multiplier = 1.0
+        self.__pacer = Pacer()
         self.__time = 0.0
+        self.__time_limit = None
 
         # World objects
         self.__robots = []
@@ -63,23 +88,58 @@ class Simulator(threading.Thread):
         self.__obstacles = []
         self.__supervisors = []
         self.__background = []
+
+        # Zoom on scene - Move to read_config later
         self.__zoom_default = 1
 
         self.__world = None
+        self.__world_file = None
         
         # Internal objects
         self.__qtree = None
+        self.__markers = None
+        self.__field = None
+        self.__sensor_cache = {}
+        self.__sensor_cache_stats = {}
+        self.__clearance_versions = {}
+        self.__idle = {}
+        self.__sleeping = {}
+        self.__pool = None
+        self.__timers = StepTimers()
+        self.__robot_timers = {}
+        self.__step_counts = StatsGroup()
+        self.__total_counts = {}
+        self.__profiler = None
+        self.__log = EventLog()
+        self.__controllers = {}
+        self.__recorder = None
+        self.__telemetry = None
+        self.__telemetry_config = None
+        self.__metrics = None
+        self.__metrics_steps = 0
+        self.__steps = 0
+        self.__switches = {}
+        self.__signals = None
+        self.__signal_buckets = 1024
+        self.__analytics = None
+        self.__analytics_config = (0.1, 0.05)
+        self.__replay = None
+        self.__replay_step = 0
+        self.__scheduler = Scheduler()
+        self.__scheduler.set_period('supervisors', 0.02) # 20 milliseconds
 
     def read_config(self, filename):
         '''Load in the objects from the world XML file '''
 
-        print 'reading initial configuration'
+        self.__log.log(INFO, 'simulator', 'Reading ' + filename, self.__time)
         try:
             self.__world = XMLReader(filename, 'simulation').read()
         except Exception, e:
             raise Exception('[Simulator.read_config] Failed to parse ' + filename \
                 + ': ' + str(e))
         else:
+            self.__world_file = filename
+            self.__replay = None
             self.__supervisor_param_cache = None
             self.__center_on_robot = False
             self.__construct_world()
@@ -96,6 +156,9 @@ class Simulator(threading.Thread):
             return
 
         helpers.unload_user_modules()
+        self.__stop_pool()
+        self.__stop_recording()
+        self.__stop_telemetry()
 
         self.__state = DRAW_ONCE            
             
@@ -105,6 +168,20 @@ class Simulator(threading.Thread):
         self.__background = []
         self.__trackers = []
         self.__qtree = None
+        self.__markers = None
+        self.__field = None
+        self.__sensor_cache = {}
+        self.__sensor_cache_stats = {}
+        self.__clearance_versions = {}
+        self.__idle = {}
+        self.__sleeping = {}
+        self.__robot_timers = {}
+        self.__controllers = {}
+        self.__switches = {}
+        if self.__signals is not None:
+            self.__signals = {}
+        if self.__analytics is not None:
+            self.__analytics = {}
         
         for thing in self.__world:
             thing_type = thing[0]
@@ -119,29 +196,32 @@ class Simulator(threading.Thread):
                     elif len(self.__robots) < 8:
                         robot.set_color(self.__nice_colors[len(self.__robots)])
                         
-                    # Create supervisor
-                    sup_class = helpers.load_by_name(supervisor_type,'supervisors')
-                    
-                    info = robot.get_info()
-                    info.color = robot.get_color()
-                    supervisor = sup_class(robot.get_pose(), info)                    
-                    name = "Robot {}: {}".format(len(self.__robots)+1, sup_class.__name__)
-                    if self.__supervisor_param_cache is not None and \
-                       len(self.__supervisor_param_cache) > len(self.__supervisors):
-                        supervisor.set_parameters(self.__supervisor_param_cache[len(self.__supervisors)])
-                    self._out_queue.put(("make_param_window",
-                                            (robot, name,
-                                             supervisor.get_ui_description())))
-                    self.__supervisors.append(supervisor)
+                    # Create supervisor, unless the run is replayed
+                    if self.__replay is None:
+                        sup_class = helpers.load_by_name(supervisor_type,'supervisors')
+                        
+                        info = robot.get_info()
+                        info.color = robot.get_color()
+                        supervisor = sup_class(robot.get_pose(), info)                    
+                        name = "Robot {}: {}".format(len(self.__robots)+1, sup_class.__name__)
+                        if self.__supervisor_param_cache is not None and \
+                           len(self.__supervisor_param_cache) > len(self.__supervisors):
+                            supervisor.set_parameters(self.__supervisor_param_cache[len(self.__supervisors)])
+                        self._out_queue.put(("make_param_window",
+                                                (robot, name,
+                                                 supervisor.get_ui_description())))
+                        self.__supervisors.append(supervisor)
                     
                     # append robot after supervisor for the case of exceptions
                     self.__robots.append(robot)
+                    self.__robot_timers[robot] = StepTimers()
                     
                     # Create trackers
                     self.__trackers.append(simobject.Path(robot.get_pose(),robot))
                     self.__trackers[-1].set_color(robot.get_color())
                 except:
-                    print "[Simulator.construct_world] Robot creation failed!"
+                    self.__log.log(ERROR, 'simulator', 'Robot creation failed',
+                                   robot = len(self.__robots) + 1)
                     raise
                     #raise Exception('[Simulator.construct_world] Unknown robot type!')
             elif thing_type == 'obstacle':
@@ -165,6 +245,12 @@ class Simulator(threading.Thread):
                                 + str(thing_type))
                                 
         self.__time = 0.0
+        if self.__noise is not None:
+            self.__noise.reset()
+        self.__scheduler.reset()
+        self.__timers.reset()
+        self.__step_counts.reset()
+        self.__total_counts = {}
         if not self.__robots:
             raise Exception('[Simulator.construct_world] No robot specified!')
         else:
@@ -172,7 +258,12 @@ class Simulator(threading.Thread):
             if not self.__center_on_robot:
                 self.focus_on_world()
             self.__supervisor_param_cache = None
-            self.step_simulation()
+            if self.__replay is not None:
+                self.__show_replay(0)
+            else:
+                self.__start_pool()
+                self.__start_telemetry()
+                self.step_simulation()
             
         self._out_queue.put(('reset',()))
 
@@ -205,10 +296,8 @@ class Simulator(threading.Thread):
            The simulator will try to draw the world undependently of the
            simulation status, so that the commands from the UI get processed.
         """
-        print 'starting simulator thread'
+        self.__log.log(DEBUG, 'simulator', 'Simulator thread started')
 
-        time_constant = 0.02 # 20 milliseconds
-        
         self.__renderer.clear_screen() #create a white screen
         self.__update_view()
 
@@ -216,42 +305,102 @@ class Simulator(threading.Thread):
 
             try:
 
-                sleep(time_constant/self.__time_multiplier)
+                if self.__state == RUN:
+                    # wait for the wall clock time of the next step
+                    start = timer()
+                    self.__pacer.wait(self.__next_time())
+                    self.__timers.lap('pacing', start)
+                else:
+                    sleep(self.__scheduler.get_period('supervisors')/
+                          self.__pacer.get_multiplier())
 
                 self.__process_queue()
 
-                if self.__state == RUN or \
-                   self.__state == RUN_ONCE:
-
-                    self.__time += time_constant
-
-                    # First, move robots
-                    for i, robot in enumerate(self.__robots):
-                        robot.move(time_constant)
-                        self.__trackers[i].add_point(robot.get_pose())
+                supervised = False
+                step_start = timer()
+                stepped = self.__state == RUN or self.__state == RUN_ONCE
+                if stepped:
+                    counts = registry.snapshot()
+                profiled = stepped and self.__profiler is not None
+                if profiled:
+                    self.__profiler.enable()
+                if stepped and self.__replay is not None:
+                    # Show the next step of the recording
+                    supervised = True
+                    if self.__replay_step + 1 < len(self.__replay):
+                        self.__show_replay(self.__replay_step + 1)
+                    if self.__replay_step + 1 >= len(self.__replay) or \
+                       (self.__time_limit is not None and \
+                        self.__time >= self.__time_limit):
+                        self.__state = DRAW_ONCE
+                elif stepped:
 
-                    # Second, check for collisions and update sensors
-                    if self.__check_collisions():
-                        print "Collision detected!"
+                    # First, move robots and check for collisions
+                    t_end = self.__next_time()
+                    if self.__time_limit is not None:
+                        t_end = min(t_end, self.__time_limit)
+                    if self.__advance(t_end):
                         self.__state = DRAW_ONCE
+                    elif self.__time_limit is not None and \
+                         self.__time >= self.__time_limit:
+                        self.__state = DRAW_ONCE
+                    self.__wake_robots()
+
+                    # Second, update the clearances and the sensors that are due
+                    start = timer()
+                    if self.__clearance:
+                        self.__update_clearances()
+                        start = self.__timers.lap('clearance', start)
+                    supervised = self.__scheduler.due('supervisors', self.__time)
+                    self.__update_sensors(supervised)
+                    start = self.__timers.lap('sensors', start)
 
                     # Now calculate supervisor outputs for the new position
-                    for i, supervisor in enumerate(self.__supervisors):
-                        info = self.__robots[i].get_info()
-                        inputs = supervisor.execute( info, time_constant)
-                        self.__robots[i].set_inputs(inputs)
+                    if supervised:
+                        self.__execute_supervisors()
+                        start = self.__timers.lap('supervisors', start)
+                    
+                    if self.__recorder is not None:
+                        self.__record_step()
+                        start = self.__timers.lap('recording', start)
+                    
+                    if self.__telemetry is not None:
+                        self.__telemetry.publish(self.__time, self.__robots)
+                        start = self.__timers.lap('telemetry', start)
+
+                    if self.__analytics is not None:
+                        self.__update_analytics()
+                        self.__timers.lap('analytics', start)
 
                 # Draw to buffer-bitmap
                 # Note that if the robot moves immediately after calculation,
                 # the supervisor would draw the previous state.
-                if self.__state != PAUSE:
+                if self.__state == DRAW_ONCE or \
+                   (self.__state == RUN_ONCE and supervised) or \
+                   (self.__state == RUN and self.__scheduler.due('render', time())):
                     self.__draw()
+
+                if profiled:
+                    self.__profiler.disable()
+                    if self.__profiler.step_done():
+                        self.__save_profile()
+
+                if stepped:
+                    self.__timers.lap('step', step_start)
+                    self.__add_counts(registry.difference(counts))
+                    self.__steps += 1
+
+                if self.__metrics is not None and self.__metrics.due():
+                    self.__update_metrics()
                     
                 if self.__state == DRAW_ONCE or \
-                   self.__state == RUN_ONCE:
+                   (self.__state == RUN_ONCE and supervised):
                     self.pause_simulation()
             
             except Exception as e:
+                if self.__profiler is not None:
+                    self.__profiler.disable()
+                self.__log_exception()
                 self._out_queue.put(("exception",sys.exc_info()))
                 self.pause_simulation()
 
@@ -261,6 +410,7 @@ class Simulator(threading.Thread):
            This will draw the markers, the obstacles,
            the robots, their tracks and their sensors
         """
+        start = timer()
         
         if self.__robots and self.__center_on_robot:
             # Temporary fix - center onto first robot
@@ -287,8 +437,12 @@ class Simulator(threading.Thread):
                 robot.draw_sensors(self.__renderer)
 
         if self.__draw_supervisors:
-            for supervisor in self.__supervisors:
-                supervisor.draw(self.__renderer)
+            if self.__pool is not None:
+                self.__pool.draw(self.__renderer)
+            else:
+                for supervisor in self.__supervisors:
+                    supervisor.draw(self.__renderer)
+        self.__timers.lap('drawing', start)
 
         # update view
         self.__update_view()
@@ -297,8 +451,10 @@ class Simulator(threading.Thread):
         """Signal the UI that the drawing process is finished,
            and it is safe to access the renderer.
         """
+        start = timer()
         self._out_queue.put(('update_view',()))
         self._out_queue.join() # wait until drawn
+        self.__timers.lap('view', start)
 
     def __draw_once(self):
         if self.__state == PAUSE:
@@ -376,24 +532,42 @@ class Simulator(threading.Thread):
         The parameters have to correspond to the requirements of the supervisor,
         as specified in :meth:`supervisor.Supervisor.get_ui_description`
         """
-        index = self.__robots.index(robot)
-        if index < 0:
-            print "Robot not found"
+        if robot not in self.__robots:
+            self.__log.log(WARNING, 'parameters', 'Robot not found', self.__time)
         else:
+            index = self.__robots.index(robot)
             self.__supervisors[index].set_parameters(parameters)
+            self.__log.log(INFO, 'parameters', 'Parameters applied',
+                           self.__time, index + 1)
+            if self.__pool is not None:
+                self.__pool.set_parameters(index, parameters)
+            self.__wake(robot)
         self.__draw_once()
 
     # Stops the thread
     def stop(self):
         """Stop the simulator thread when the entire program is closed"""
-        print 'stopping simulator thread'
+        self.__log.log(DEBUG, 'simulator', 'Simulator thread stopped', self.__time)
         self.__stop = True
-        self._out_queue.put(('stopped',()))
+        # everything is closed and 'stopped' is sent, even after errors
+        try:
+            self.__stop_pool()
+            if self.__profiler is not None:
+                self.__save_profile()
+        finally:
+            try:
+                self.__stop_recording()
+                self.__stop_telemetry()
+                self.serve_metrics(None)
+            finally:
+                self.__log.close()
+                self._out_queue.put(('stopped',()))
 
     def start_simulation(self):
         """Start/continue the simulation"""
         if self.__robots:
             self.__state = RUN
+            self.__pacer.reset(self.__time)
             self._out_queue.put(('running',()))
 
     def pause_simulation(self):
@@ -412,12 +586,426 @@ class Simulator(threading.Thread):
         self.__state = DRAW_ONCE
         self.__reset_world()
 
+    def set_ccd(self, enabled = True, tolerance = None):
+        """Enable or disable continuous collision detection.
+        
+           With continuous collision detection the robots are stopped at the
+           exact time of impact with an obstacle, instead of being checked
+           for collisions only at the end of each step.
+           
+           The *tolerance* (in meters) limits the error that the rotation
+           of a robot can introduce in the time of impact.
+        """
+        self.__ccd = enabled
+        if tolerance is not None:
+            self.__ccd_tolerance = tolerance
+
+    def set_sensor_cache(self, enabled = True, distance = 0.0, angle = 0.0):
+        """Enable or disable the reuse of sensor readings.
+        
+           When enabled, the sensors of a robot are not updated as long as
+           the robot has moved less than *distance* (in meters) and turned
+           less than *angle* (in radians) since their last update, and no
+           other robot is in their range. By default the readings are
+           reused only if the robot did not move at all, which gives the
+           same readings as an update.
+        """
+        if enabled:
+            self.__sensor_tolerance = (distance, angle)
+        else:
+            self.__sensor_tolerance = None
+
+    def set_sensor_backend(self, backend = 'exact', resolution = 0.01, rays = 3,
+                                 max_distance = 1.0, cache_dir = None):
+        """Choose how the proximity sensors and the clearance are measured.
+
+           The ``'exact'`` backend intersects the sensor cones with the
+           obstacle polygons. The ``'field'`` backend rasterizes the
+           obstacles once into a :class:`~distancefield.DistanceField` with
+           grid points every *resolution* meters, and traces *rays* rays per
+           sensor cone through it, for all robots at once. The field is
+           cached in *cache_dir*, see :func:`distancefield.load_field`.
+           Other robots are still sensed exactly.
+
+           The field is faster, but its error is in the order of the
+           resolution, and the clearance is at most *max_distance*.
+        """
+        if backend == 'exact':
+            self.__field_config = None
+        elif backend == 'field':
+            self.__field_config = (resolution, rays, max_distance, cache_dir)
+        else:
+            raise ValueError("[Simulator.set_sensor_backend] Unknown backend '{}'".format(backend))
+        self.__field = None
+        self.__sensor_cache = {}
+        self.__clearance_versions = {}
+
+    def set_noise(self, seed = None, ir_sigma = 0.0, ir_quantum = 0.0,
+                        encoder_sigma = 0.0, speed_sigma = 0.0):
+        """Add noise to the sensor readings, the wheel encoders and the
+           wheel speeds of the robots, see :class:`~noise.NoiseModel`.
+
+           The noise of all robots is drawn at once whenever the
+           supervisors are called. The generator is seeded with *seed*
+           at the start of every run, so that the runs can be repeated
+           exactly. Without a *seed*, a random one is chosen and logged.
+           Without any noise, the noise is disabled.
+           
+           The noise does not wake up sleeping robots, and is only applied
+           to the robots that are awake.
+        """
+        if ir_sigma == ir_quantum == encoder_sigma == speed_sigma == 0:
+            self.__noise = None
+            for robot in self.__robots:
+                robot.set_noise(None)
+            return
+        if seed is None:
+            seed = np.random.randint(2**31)
+        self.__noise = NoiseModel(seed, ir_sigma, ir_quantum, encoder_sigma, speed_sigma)
+        self.__log.log(INFO, 'simulator', "Noise seed {}".format(seed), self.__time)
+
+    def set_clearance(self, enabled = True):
+        """Enable or disable the measurement of the distance from every
+           robot to the nearest obstacle at every step, see
+           :meth:`robot.Robot.get_clearance`. When disabled, the clearance
+           stays infinite.
+        """
+        self.__clearance = enabled
+        self.__clearance_versions = {}
+        for robot in self.__robots:
+            robot.set_clearance(float('inf'))
+
+    def set_sleeping(self, enabled = True, delay = 5):
+        """Enable or disable sleeping robots. Sleeping is disabled by default.
+        
+           A robot falls asleep when it has been standing still with the
+           same controller for *delay* control periods, its supervisor
+           :meth:`~supervisor.Supervisor.can_sleep`, and no other robot is
+           in the range of its sensors. A sleeping robot is not moved, its
+           sensors are not updated and its supervisor is not called.
+           
+           The robot wakes up when its parameters are changed, or when
+           another robot comes into the range of its sensors.
+        """
+        if enabled:
+            self.__sleep_delay = delay
+        else:
+            self.__sleep_delay = None
+            for robot in self.__sleeping.keys():
+                self.__wake(robot)
+
+    def set_supervisor_processes(self, processes = 0):
+        """Execute the supervisors in a pool of *processes* worker processes.
+        
+           The supervisors of different robots are independent, and can run
+           in parallel. The results are identical to the execution in the
+           simulator thread. If *processes* is 0, the supervisors are executed
+           in the simulator thread.
+           
+           See :class:`~supervisorpool.SupervisorPool` for the restrictions.
+        """
+        self.__supervisor_processes = processes
+        self.__stop_pool()
+        self.__start_pool()
+
+    def set_physics_step(self, step = None):
+        """Set a fixed physics step (in seconds) that is shorter than the
+           control period of the supervisors. The robots are then moved and
+           checked for collisions several times between two supervisor calls.
+           
+           If *step* is `None`, the robots are moved once per control period.
+        """
+        self.set_period('physics', step)
+
+    def set_period(self, stage, period):
+        """Set the *period* (in seconds) of a stage of the simulation step.
+        
+           The stages are:
+           
+           * ``'supervisors'`` - the control period of the supervisors
+             (0.02 by default). The sensors are updated before every
+             supervisor call, unless they have their own period.
+           * ``'physics'`` - the longest physics step, see
+             :meth:`~simulator.Simulator.set_physics_step`.
+           * ``'render'`` - the interval between two frames in wall clock
+             time. If it is `None`, every step is drawn.
+           * the class name of a sensor, e.g. ``'Khepera3_IRSensor'`` -
+             the refresh period of all sensors of this type. Between two
+             refreshes the sensors keep their last reading.
+             
+           Stages that are not due are skipped. A *period* of `None` resets
+           the stage to its default.
+        """
+        if stage == 'supervisors' and period is None:
+            period = 0.02
+        self.__scheduler.set_period(stage, period)
+
+    def set_adaptive_stepping(self, enabled = True, min_step = None):
+        """Enable or disable adaptive physics steps.
+           
+           In the adaptive mode the physics step is as long as the robots
+           cannot reach any obstacle or other robot within it, judging by the
+           distance between their bounding rectangles and
+           :meth:`~robot.Robot.get_max_speed`. Far from obstacles the robots
+           are moved once per control period, near obstacles the step shrinks
+           down to *min_step* (in seconds). The supervisors are still called
+           once per control period.
+           
+           Robots that do not know their maximum speed are moved with the
+           fixed physics step.
+        """
+        self.__adaptive = enabled
+        if min_step is not None:
+            self.__min_step = min_step
+
+    def set_time_limit(self, limit = None):
+        """Pause the simulation when the simulation time reaches *limit*
+           (in seconds). If *limit* is `None`, the simulation runs until
+           it is paused."""
+        self.__time_limit = limit
+
     def set_time_multiplier(self,multiplier):
         """Shorten the interval between evaluation cycles by *multiplier*,
-           speeding up the simulation"""
-        self.__time_multiplier = multiplier
+           speeding up the simulation.
+           
+           The simulation is paced to the wall clock, see
+           :class:`~scheduler.Pacer`. The achieved speed is available from
+           :meth:`get_real_time_factor`."""
+        self.__pacer.reset(self.__time, multiplier)
+
+    def profile_steps(self, steps, path = None):
+        """Profile the next *steps* simulation steps with :mod:`cProfile`.
+        
+           The results are saved in ``path.prof`` and ``path.folded``, see
+           :class:`~profiling.StepProfiler`, and summarized to the UI in a
+           ``('profile_saved', (summary,))`` event. If the simulation is
+           stopped before, the steps so far are saved.
+        """
+        if self.__profiler is not None:
+            self.__profiler.disable()
+        self.__profiler = StepProfiler(steps, path)
+
+    def record_run(self, path = None):
+        """Record the state of the robots at every step into the directory
+           *path*, see :class:`~recorder.RunRecorder`. The recording starts
+           with the current state, and ends when the world is reloaded or
+           reset. If *path* is `None`, the current recording is closed.
+        """
+        self.__stop_recording()
+        if path is None:
+            return
+        if self.__world_file is None or self.__replay is not None:
+            raise Exception('[Simulator.record_run] No simulation to record')
+        self.__recorder = RunRecorder(path, self.__world_file, self.__robots)
+        self.__log.log(INFO, 'recording', 'Recording to ' + path, self.__time)
+        self.__record_step()
+
+    def replay_run(self, path):
+        """Replay the recording in the directory *path* instead of
+           simulating. The world of the recording is loaded, but no
+           supervisors are created or executed. The replay can be run,
+           paused, stepped and reset like a simulation, and positioned
+           with :meth:`seek_replay`.
+           
+           The duration of the recording is sent to the UI as a
+           ``('replay_loaded', (duration,))`` event.
+        """
+        recording = Recording(path)
+        if len(recording) == 0:
+            raise Exception('[Simulator.replay_run] Empty recording ' + path)
+        try:
+            self.__world = XMLReader(recording.get_world(), 'simulation').read()
+        except Exception, e:
+            raise Exception('[Simulator.replay_run] Failed to parse ' +
+                            recording.get_world() + ': ' + str(e))
+        self.__log.log(INFO, 'replay', 'Replaying ' + path)
+        self.__world_file = None
+        self.__replay = recording
+        self.__supervisor_param_cache = None
+        self.__center_on_robot = False
+        self.__construct_world()
+        self._out_queue.put(('replay_loaded', (recording.get_duration(),)))
+
+    def seek_replay(self, time):
+        """Show the last recorded step at or before *time* in the replay"""
+        if self.__replay is not None:
+            self.__show_replay(self.__replay.find_step(time))
+            self.__draw_once()
+
+    def publish_telemetry(self, path = None, capacity = 1024):
+        """Publish the poses, wheel speeds and sensor readings of the
+           robots after every step in a shared ring buffer of *capacity*
+           steps in the file *path*, see :class:`~telemetry.TelemetryWriter`.
+           Other processes can read it with :class:`~telemetry.TelemetryReader`.
+           
+           A new file is created for every world that is loaded.
+           If *path* is `None`, the telemetry is not published anymore.
+        """
+        self.__stop_telemetry()
+        if path is None:
+            self.__telemetry_config = None
+        else:
+            self.__telemetry_config = (path, capacity)
+            if self.__robots and self.__replay is None:
+                self.__start_telemetry()
+
+    def serve_metrics(self, port = 9100, interval = 1.0):
+        """Serve the performance statistics of the simulation for
+           monitoring, in the Prometheus text format on
+           ``http://127.0.0.1:port/metrics`` (see :class:`~metrics.MetricsServer`).
+           The metrics are updated every *interval* seconds of wall clock time.
+           If *port* is `None`, the server is stopped.
+           
+           The metrics are the steps, the steps per second, the simulation
+           time, the real-time factor, the late steps, the phase timings
+           of :meth:`get_stats` (``pysimiam_phase_seconds``), the counted
+           events including the collisions, the controller switches and the
+           points of the robot trails per robot, and the length of the
+           command and event queues.
+        """
+        if self.__metrics is not None:
+            metrics, self.__metrics = self.__metrics, None
+            metrics.stop()
+        if port is not None:
+            self.__metrics = MetricsServer(port, interval)
+            self.__metrics_steps = self.__steps
+            self.__update_metrics()
+            self.__log.log(INFO, 'metrics',
+                "Serving metrics on http://127.0.0.1:{}/metrics".format(
+                    self.__metrics.get_port()), self.__time)
+
+    def set_event_log(self, level = INFO, filename = None, echo = None):
+        """Configure the event log of the simulator.
+        
+           The controller switches, collisions, parameter changes,
+           exceptions and other events are logged from *level* on
+           (see :mod:`eventlog`), with the simulation time and the robot.
+           If *filename* is not `None`, the events are also written to
+           this file as JSON lines by a background thread. If *echo* is
+           not `None`, the events from this level on are printed.
+        """
+        self.__log.set_level(level)
+        self.__log.set_echo(echo)
+        dropped = self.__log.close()
+        if dropped:
+            self.__log.log(WARNING, 'simulator',
+                "{} events were not written to the log file".format(dropped),
+                self.__time)
+        if filename is not None:
+            self.__log.open(filename)
+
+    def get_events(self, level = None):
+        """Send the events in the log to the UI as an
+           ``('events', (events,))`` event, where *events* is a list of
+           :class:`eventlog.Event`. If *level* is not `None`, only the events
+           from this level on are sent."""
+        self._out_queue.put(('events', (self.__log.get_events(level),)))
+
+    def track_signals(self, enabled = True, buckets = None):
+        """Keep the history of the signals of the supervisors
+           (see :meth:`supervisor.Supervisor.get_signals`) for plotting.
+           
+           The history is decimated into at most *buckets* time buckets
+           per robot, see :class:`~stats.DecimatedHistory`. The signals
+           are not available with supervisor processes.
+        """
+        if buckets is not None:
+            self.__signal_buckets = buckets
+        if enabled:
+            self.__signals = {}
+        else:
+            self.__signals = None
+
+    def get_signals(self, buckets = None):
+        """Send the history of the supervisor signals to the UI as a
+           ``('signals', (signals,))`` event, with at most *buckets* time
+           buckets (e.g. one per pixel of a plot).
+           
+           *signals* has an entry for every robot, `None` if there is no
+           history, and otherwise a dictionary with the ``'names'`` of the
+           signals with their lengths (0 for single values) in the order
+           of the channels, and the ``'times'``, ``'mins'`` and ``'maxs'``
+           arrays from :meth:`stats.DecimatedHistory.get`.
+        """
+        signals = []
+        for robot in self.__robots:
+            if self.__signals is None or robot not in self.__signals:
+                signals.append(None)
+                continue
+            names, history = self.__signals[robot]
+            times, mins, maxs = history.get(buckets)
+            signals.append({'names': names, 'times': times,
+                            'mins': mins, 'maxs': maxs})
+        self._out_queue.put(('signals', (signals,)))
+
+    def track_analytics(self, enabled = True, cell_size = None, goal_tolerance = None):
+        """Compute the metrics of the run of every robot at every step,
+           see :class:`~analytics.RunAnalytics`. The heatmap has cells of
+           *cell_size* meters, and a robot is at the goal of its supervisor
+           when it is closer than *goal_tolerance* meters.
+           
+           The clearance is the distance to the nearest obstacle, see
+           :meth:`robot.Robot.get_clearance`. The odometry drift and the
+           time to goal are not available with supervisor processes.
+        """
+        cell, tolerance = self.__analytics_config
+        if cell_size is not None:
+            cell = cell_size
+        if goal_tolerance is not None:
+            tolerance = goal_tolerance
+        self.__analytics_config = (cell, tolerance)
+        if enabled:
+            self.__analytics = {}
+        else:
+            self.__analytics = None
+
+    def get_analytics(self):
+        """Send the metrics of the run to the UI as an
+           ``('analytics', (analytics,))`` event, where *analytics* has an
+           entry for every robot, `None` if the robot has not been tracked,
+           or the dictionary from :meth:`analytics.RunAnalytics.get_summary`.
+        """
+        analytics = []
+        for robot in self.__robots:
+            if self.__analytics is None or robot not in self.__analytics:
+                analytics.append(None)
+            else:
+                analytics.append(self.__analytics[robot].get_summary())
+        self._out_queue.put(('analytics', (analytics,)))
+
+    def get_stats(self):
+        """Send the performance statistics of the simulation to the UI
+           as a ``('stats', (stats,))`` event.
+
+           *stats* is a dictionary with the simulation ``'time'``, the
+           ``'real_time_factor'``, the ``'overruns'``, and the time spent
+           in the phases of the recent steps (``'phases'``) and per robot
+           (``'robots'``, a list). Every phase is summarized by
+           :meth:`stats.RollingStats.get_summary`, in seconds.
+
+           The phases of a step are ``'kinematics'``, ``'collisions'``,
+           ``'sensors'``, ``'supervisors'``, ``'recording'``, ``'telemetry'``,
+           ``'drawing'`` and ``'view'``
+           (waiting for the UI to show a frame), and the whole ``'step'``.
+           ``'pacing'`` is the time spent waiting for the wall clock.
+           The robot phases are ``'kinematics'``, ``'sensors'`` and
+           ``'supervisor'`` (not available with supervisor processes).
 
-### FIXME Those two functions are not thread-safe
+           The events counted in the steps (see :class:`~counters.CounterRegistry`)
+           are summarized per step (``'counters'``) and summed up since the
+           start of the simulation (``'counter_totals'``).
+        """
+        stats = {'time': self.__time,
+                 'real_time_factor': self.__pacer.get_real_time_factor(),
+                 'overruns': self.__pacer.get_overruns(),
+                 'phases': self.__timers.get_summary(),
+                 'robots': [self.__robot_timers[robot].get_summary()
+                            for robot in self.__robots],
+                 'counters': self.__step_counts.get_summary(),
+                 'counter_totals': dict(self.__total_counts)}
+        self._out_queue.put(('stats', (stats,)))
+
+### FIXME Those functions are not thread-safe
     def get_time(self):
         """Get the internal simulator time."""
         return self.__time
@@ -425,10 +1013,618 @@ class Simulator(threading.Thread):
     def is_running(self):
         """Get the simulation state as a `bool`"""
         return self.__state == RUN
+
+    def get_real_time_factor(self):
+        """Get the simulation time that passed in one second of wall clock
+           time since the simulation was started or its speed was changed,
+           or `None` if it is not known yet."""
+        return self.__pacer.get_real_time_factor()
+
+    def get_overruns(self):
+        """Get the number of steps that were late, and the number of all
+           steps since the simulation was started or its speed was changed,
+           as a tuple."""
+        return self.__pacer.get_overruns()
+
+    def get_sleeping(self):
+        """Get a list of `bool`, `True` for every robot that is sleeping."""
+        return [robot in self.__sleeping for robot in self.__robots]
+
+    def get_sensor_cache_stats(self):
+        """Get the sensor cache hits and misses for every robot,
+           as a list of (hits, misses) tuples."""
+        return [tuple(self.__sensor_cache_stats.get(robot, (0, 0)))
+                for robot in self.__robots]
 ###------------------
 
+    def __move_continuous(self, robot, dt):
+        """Move *robot* for a time interval *dt*, stopping it at the first
+           contact with an obstacle.
+           
+           The swept motion of the robot is tested against the obstacles with
+           :meth:`pylygon.Polygon.raycast`, so that fast robots cannot pass
+           through thin obstacles between two steps. The motion is treated as
+           a translation of the robot's centroid and a rotation around it.
+           The rotation is split into pieces, so that no point of the robot
+           moves by more than ``ccd_tolerance`` because of rotation in one
+           piece, and each piece is cast as a pure translation.
+           
+           Returns `None` if there was no contact, and a tuple
+           (time of impact as a fraction of *dt*, obstacle, contact normal)
+           otherwise. The contact normal is a unit vector pointing from
+           the robot to the obstacle.
+        """
+        if self.__qtree is None:
+            self.__qtree = QuadTree(self.__obstacles)
+
+        old_pose = robot.get_pose()
+        old_poly = robot.get_world_polygon()
+        odometry = robot.get_odometry()
+        sweep = Rect(robot.get_bounding_rect())
+
+        robot.move(dt)
+
+        c0 = old_poly.C
+        r = robot.get_world_polygon().C - c0
+        dtheta = (robot.get_pose().theta - old_pose.theta + pi)%(2*pi) - pi
+        if dtheta == 0 and r[0] == 0 and r[1] == 0:
+            return None
+        sweep.add(Rect(robot.get_bounding_rect()))
+        obstacles = list(self.__qtree.find_items(sweep))
+        if not obstacles:
+            return None
+
+        pieces = max(1, int(ceil(abs(dtheta)*old_poly.rmax/self.__ccd_tolerance)))
+        dr = r/pieces
+        for j in range(pieces):
+            angle = j*dtheta/pieces
+            if j == 0:
+                poly = old_poly
+            else:
+                R = np.array([[cos(angle), -sin(angle)],
+                              [sin(angle), cos(angle)]])
+                poly = pylygon.Polygon(np.dot(old_poly.P - c0, R.T) + c0 + j*dr,
+                                       conv=False)
+                registry.add('polygons')
+            hit = None
+            for obstacle in obstacles:
+                result = poly.raycast(obstacle.get_world_polygon(), -dr)
+                if result is not False and (hit is None or result[0] < hit[0]):
+                    hit = (result[0], obstacle, result[2])
+            if hit is not None:
+                break
+        else:
+            return None
+
+        toi, obstacle, normal = hit
+        toi = (j + toi)/pieces
+
+        # Move the robot only until the contact, so that the odometry
+        # agrees with the contact pose
+        robot.set_pose(old_pose)
+        robot.set_odometry(odometry)
+        robot.move(toi*dt)
+
+        # Put the robot at the contact pose
+        c = c0 + toi*r
+        ox, oy = old_pose.x - c0[0], old_pose.y - c0[1]
+        a_c, a_s = cos(angle), sin(angle)
+        robot.set_pose(pose.Pose(c[0] + ox*a_c - oy*a_s,
+                                 c[1] + ox*a_s + oy*a_c,
+                                 (old_pose.theta + angle + pi)%(2*pi) - pi))
+
+        # The normal is not known if the robot touches the obstacle already
+        # at the start of a piece
+        if not normal.any():
+            normal = -poly.distance(obstacle.get_world_polygon())
+        if not normal.any():
+            normal = obstacle.get_world_polygon().C - c
+        length = sqrt(normal[0]**2 + normal[1]**2)
+        if length > 0:
+            normal = normal/length
+        return toi, obstacle, tuple(normal)
+
+    def __next_time(self):
+        """Get the simulation time when the next stage is due"""
+        if self.__replay is not None:
+            step = min(self.__replay_step + 1, len(self.__replay) - 1)
+            return float(self.__replay['time'][step])
+        stages = [stage for stage in self.__scheduler.get_stages()
+                  if stage not in ('physics', 'render')]
+        return self.__scheduler.next_time(stages, self.__time)
+
+    def __advance(self, t_end):
+        """Move the robots until the time *t_end* in one or more
+           physics steps and check for collisions after every step.
+           
+           The simulation time is advanced with the robots. If a collision
+           is detected, the robots are left at the colliding position and
+           the rest of the interval is skipped.
+           
+           Returns `True` if a collision was detected.
+        """
+        t_start = self.__time
+        dt = t_end - t_start
+        elapsed = 0.0
+        kinematics, collisions = 0.0, 0.0
+        collision, contacts = False, []
+        while elapsed < dt:
+            remaining = dt - elapsed
+            h = self.__next_step(remaining)
+            if h >= remaining - 1e-9*dt:
+                h = remaining
+                elapsed = dt
+                self.__time = t_end
+            else:
+                elapsed += h
+                self.__time = t_start + elapsed
+
+            contacts = []
+            start = timer()
+            for i, robot in enumerate(self.__robots):
+                if robot in self.__sleeping:
+                    continue
+                robot_start = timer()
+                if self.__ccd:
+                    contact = self.__move_continuous(robot, h)
+                    if contact is not None:
+                        contacts.append((robot,) + contact)
+                else:
+                    robot.move(h)
+                self.__trackers[i].add_point(robot.get_pose())
+                self.__robot_timers[robot].lap('kinematics', robot_start)
+            now = timer()
+            kinematics += now - start
+
+            collision = self.__check_collisions()
+            collisions += timer() - now
+            if collision or contacts:
+                for robot, toi, obstacle, normal in contacts:
+                    self.__log.log(WARNING, 'contact',
+                        "Contact with {}, normal ({:.3f}, {:.3f})".format(
+                            self.__describe(obstacle), *normal),
+                        self.__time - h*(1 - toi), self.__robots.index(robot) + 1)
+                break
+        self.__timers.add('kinematics', kinematics)
+        self.__timers.add('collisions', collisions)
+        return collision or bool(contacts)
+
+    def __next_step(self, remaining):
+        """Choose the length of the next physics step, at most *remaining*"""
+        step = remaining
+        if self.__scheduler.get_period('physics') is not None:
+            step = min(step, self.__scheduler.get_period('physics'))
+        if not self.__adaptive:
+            return step
+
+        speeds = [robot.get_max_speed() for robot in self.__robots]
+        if None in speeds:
+            return step
+
+        if self.__qtree is None:
+            self.__qtree = QuadTree(self.__obstacles)
+
+        def gap(a, b):
+            dx = max(a[0] - b[2], b[0] - a[2], 0)
+            dy = max(a[1] - b[3], b[1] - a[3], 0)
+            return sqrt(dx*dx + dy*dy)
+
+        step = remaining
+        bounds = [robot.get_bounds() for robot in self.__robots]
+        for i, speed in enumerate(speeds):
+            if speed > 0:
+                # only the obstacles within reach can limit the step
+                reach = speed*step
+                xmin, ymin, xmax, ymax = bounds[i]
+                rect = Rect((xmin - reach, ymin - reach,
+                             xmax - xmin + 2*reach, ymax - ymin + 2*reach))
+                for obstacle in self.__qtree.find_items(rect):
+                    step = min(step, gap(bounds[i], obstacle.get_bounds())/speed)
+            for j in range(i+1, len(speeds)):
+                if speed + speeds[j] > 0:
+                    step = min(step, gap(bounds[i], bounds[j])/(speed + speeds[j]))
+        return min(remaining, max(step, self.__min_step))
+
+    def __start_pool(self):
+        """Start the supervisor processes, if they are enabled"""
+        if self.__supervisor_processes and self.__robots:
+            self.__pool = SupervisorPool(self.__robots, self.__supervisors,
+                                         self.__supervisor_processes)
+
+    def __stop_pool(self):
+        """Stop the supervisor processes, if they are running"""
+        if self.__pool is not None:
+            pool, self.__pool = self.__pool, None
+            pool.stop()
+
+    def __execute_supervisors(self):
+        """Calculate the supervisor outputs of the robots that are awake"""
+        period = self.__scheduler.get_period('supervisors')
+        active = [i for i, robot in enumerate(self.__robots)
+                  if robot not in self.__sleeping]
+
+        if self.__noise is not None:
+            # draw for all robots, so that the noise does not depend on sleeping
+            sensors = max(len(robot.get_external_sensors()) for robot in self.__robots)
+            noise = self.__noise.draw(len(self.__robots), sensors)
+            for i in active:
+                self.__robots[i].set_noise(noise[i])
+        
+        if self.__pool is not None:
+            results = self.__pool.execute(active, period)
+        else:
+            results = []
+            for i in active:
+                start = timer()
+                supervisor = self.__supervisors[i]
+                inputs = supervisor.execute(self.__robots[i].get_info(), period)
+                results.append((inputs,
+                                getattr(supervisor, 'current', None),
+                                supervisor.can_sleep()))
+                self.__robot_timers[self.__robots[i]].lap('supervisor', start)
+        
+        for i, (inputs, controller, can_sleep) in zip(active, results):
+            robot = self.__robots[i]
+            robot.set_inputs(inputs)
+            if robot in self.__controllers and self.__controllers[robot] != controller:
+                self.__switches[robot] = self.__switches.get(robot, 0) + 1
+                self.__log.log(INFO, 'controller',
+                               "Switched to {}".format(self.__controller_name(i, controller)),
+                               self.__time, i + 1)
+            self.__controllers[robot] = controller
+            if self.__signals is not None and self.__pool is None:
+                self.__add_signals(robot, self.__supervisors[i])
+            self.__update_sleep(robot, controller, can_sleep)
+
+    def __controller_name(self, index, controller):
+        """Get the class name of *controller*, the current controller
+           of robot *index*"""
+        if self.__pool is not None:
+            return self.__pool.get_controller_name(index)
+        return controller.__class__.__name__
+
+    def __add_signals(self, robot, supervisor):
+        """Add the signals of *supervisor* to the history of *robot*"""
+        signals = supervisor.get_signals()
+        names, values = [], []
+        for name, value in sorted(signals.iteritems()):
+            if isinstance(value, (list, tuple)):
+                names.append((name, len(value)))
+                values.extend(value)
+            else:
+                names.append((name, 0))
+                values.append(value)
+        history = self.__signals.get(robot)
+        if history is None or history[0] != names:
+            history = (names, DecimatedHistory(len(values), self.__signal_buckets))
+            self.__signals[robot] = history
+        history[1].add(self.__time, values)
+
+    def __update_analytics(self):
+        """Add the current state of the robots to the run metrics"""
+        for i, robot in enumerate(self.__robots):
+            analytics = self.__analytics.get(robot)
+            if analytics is None:
+                analytics = RunAnalytics(*self.__analytics_config)
+                self.__analytics[robot] = analytics
+            clearance = robot.get_clearance()
+            if clearance == float('inf'):
+                clearance = None
+            controller = self.__controllers.get(robot)
+            if controller is not None:
+                controller = self.__controller_name(i, controller)
+            # the supervisors in the simulator thread are not used with the pool
+            pose_est, goal = None, None
+            if self.__pool is None:
+                supervisor = self.__supervisors[i]
+                pose_est, goal = supervisor.pose_est, supervisor.get_goal()
+            analytics.add_step(self.__time, robot.get_pose(), clearance,
+                               controller, pose_est, goal)
+
+    def __record_step(self):
+        """Add the current state of the robots to the recording"""
+        controllers = []
+        for i, robot in enumerate(self.__robots):
+            controller = self.__controllers.get(robot)
+            if controller is None:
+                controllers.append((None, None))
+            else:
+                controllers.append((controller, self.__controller_name(i, controller)))
+        # the supervisors in the simulator thread are not used with the pool
+        estimates = None
+        if self.__pool is None:
+            estimates = [supervisor.pose_est for supervisor in self.__supervisors]
+        self.__recorder.add_step(self.__time, self.__robots, controllers, estimates)
+
+    def __stop_recording(self):
+        """Close the current recording, if there is one"""
+        if self.__recorder is not None:
+            recorder, self.__recorder = self.__recorder, None
+            recorder.close()
+            self.__log.log(INFO, 'recording',
+                           "Recorded {} steps".format(recorder.get_steps()),
+                           self.__time)
+
+    def __start_telemetry(self):
+        """Create the telemetry buffer for the current robots, if enabled"""
+        if self.__telemetry_config is not None:
+            path, capacity = self.__telemetry_config
+            self.__telemetry = TelemetryWriter(path, self.__robots, capacity)
+
+    def __stop_telemetry(self):
+        """Stop writing to the telemetry buffer"""
+        if self.__telemetry is not None:
+            telemetry, self.__telemetry = self.__telemetry, None
+            telemetry.close()
+
+    def __show_replay(self, step):
+        """Put the robots in the state of *step* of the replayed recording"""
+        recording = self.__replay
+        poses = recording['pose']
+        distances = recording['sensor_distances'][step]
+        for i, robot in enumerate(self.__robots):
+            robot.set_pose(pose.Pose(*poses[step,i]))
+            for sensor, distance in zip(robot.get_external_sensors(), distances[i]):
+                if not np.isnan(distance):
+                    sensor.set_distance(distance)
+            if step == self.__replay_step + 1:
+                self.__trackers[i].add_point(robot.get_pose())
+            else:
+                self.__trackers[i].points = poses[:step+1,i,:2].tolist()
+        self.__replay_step = step
+        self.__time = float(recording['time'][step])
+
+    def __update_sleep(self, robot, controller, can_sleep):
+        """Count the control periods that *robot* has been idle with the
+           same *controller*, and put it to sleep after enough of them.
+           See :meth:`set_sleeping`."""
+        if self.__sleep_delay is None or \
+           robot.get_max_speed() != 0 or not can_sleep:
+            self.__idle.pop(robot, None)
+            return
+        
+        idle_controller, count = self.__idle.get(robot, (None, 0))
+        if count == 0 or controller != idle_controller:
+            count = 0
+        count += 1
+        self.__idle[robot] = (controller, count)
+        if count < self.__sleep_delay:
+            return
+        
+        # The robot has to notice anything coming into range of its sensors
+        watch = Rect(robot.get_bounding_rect())
+        for sensor in robot.get_external_sensors():
+            watch.add(self.__get_sensor_range(sensor))
+        for other in self.__robots:
+            if other is not robot and \
+               watch.intersects(Rect(other.get_bounding_rect())):
+                return
+        
+        del self.__idle[robot]
+        self.__sleeping[robot] = watch
+
+    def __wake(self, robot):
+        """Wake up *robot* if it is sleeping"""
+        self.__sleeping.pop(robot, None)
+        self.__idle.pop(robot, None)
+
+    def __wake_robots(self):
+        """Wake up the sleeping robots that have another robot in range"""
+        if not self.__sleeping:
+            return
+        awake = [Rect(robot.get_bounding_rect()) for robot in self.__robots
+                 if robot not in self.__sleeping]
+        for robot, watch in self.__sleeping.items():
+            if any(watch.intersects(rect) for rect in awake):
+                self.__wake(robot)
+
+    def __update_clearances(self):
+        """Measure the distance from every robot that has moved to the
+           nearest obstacle, see :meth:`robot.Robot.get_clearance`.
+           
+           The nearest obstacles are found in the spatial index by their
+           bounding rectangles, and measured exactly with GJK, see
+           :meth:`simobject.SimObject.get_nearest`. With the distance field,
+           the clearance is the smallest value of the field on the boundary
+           of the robot envelope, see
+           :meth:`distancefield.DistanceField.sample_boundary`.
+        """
+        if self.__qtree is None:
+            self.__qtree = QuadTree(self.__obstacles)
+        field = self.__get_field()
+        for robot in self.__robots:
+            version = robot.get_pose_version()
+            if self.__clearance_versions.get(robot) == version:
+                continue
+            self.__clearance_versions[robot] = version
+            if field is not None:
+                distance = max(0.0, float(field.sample_boundary(robot.get_world_polygon().P).min()))
+            else:
+                distance, obstacle = robot.get_nearest(self.__qtree)
+            robot.set_clearance(float('inf') if distance is None else distance)
+
+    def __get_field(self):
+        """Get the distance field of the obstacles, if it is enabled,
+           building or loading it if necessary"""
+        if self.__field_config is None or self.__world_file is None:
+            return None
+        if self.__field is None:
+            resolution, rays, max_distance, cache_dir = self.__field_config
+            start = timer()
+            self.__field, loaded = load_field(self.__world_file, self.__obstacles,
+                                              resolution, max_distance, cache_dir)
+            self.__log.log(INFO, 'simulator',
+                "{} the distance field in {:.2f} s".format(
+                    "Loaded" if loaded else "Built", timer() - start),
+                self.__time)
+        return self.__field
+
+    def __trace_sensors(self, traced, rqtree):
+        """Update the proximity sensors in the list of (robot, sensor)
+           tuples *traced* from the distance field, for all at once, and
+           then against the other robots"""
+        rays = self.__field_config[1]
+        origins, angles, ranges = [], [], []
+        for robot, sensor in traced:
+            x, y, theta = sensor.get_pose()
+            origins.append((x, y))
+            angles.append(theta)
+            ranges.append(sensor.rmax)
+        # the rays are spread evenly over every cone
+        offsets = np.linspace(-0.5, 0.5, rays) if rays > 1 else np.zeros(1)
+        phis = np.array([sensor.phi for robot, sensor in traced])
+        angles = (np.array(angles)[:,None] + phis[:,None]*offsets).ravel()
+        distances = self.__field.trace(np.repeat(origins, rays, axis=0), angles,
+                                       np.repeat(ranges, rays))
+        registry.add('field_rays', len(angles))
+        for (robot, sensor), distance in zip(traced, distances.reshape(-1, rays).min(axis=1)):
+            sensor.set_distance(distance)
+            if rqtree is None: continue
+            for other in rqtree.find_items(Rect(sensor.get_bounding_rect())):
+                if other is not robot:
+                    sensor.update_distance(other)
+
+    def __update_sensors(self, supervised = True):
+        """Update the proximity sensors of all robots that are due.
+           The beams of all lidars are cast at once, see
+           :meth:`sensor.LidarSensor.cast`. The marker sensors look up
+           the markers and the obstacles in the line of sight in quadtrees,
+           see :meth:`sensor.MarkerSensor.update_markers`.
+        
+           Sensors without their own period are due if the supervisors
+           are called in this step (*supervised*).
+        """
+        
+        if self.__qtree is None:
+            self.__qtree = QuadTree(self.__obstacles)
+            
+        rqtree = None
+        due = {}
+        field = self.__get_field()
+        traced = []
+        lidars, candidates = [], []
+        
+        for robot in self.__robots:
+            if robot in self.__sleeping:
+                continue
+            start = timer()
+            # group the sensors that are due by type
+            groups = {}
+            for sensor in robot.get_external_sensors():
+                kind = sensor.__class__.__name__
+                if kind not in due:
+                    if self.__scheduler.get_period(kind) is None:
+                        due[kind] = supervised
+                    else:
+                        due[kind] = self.__scheduler.due(kind, self.__time)
+                if due[kind]:
+                    groups.setdefault(kind, []).append(sensor)
+            if groups and rqtree is None and len(self.__robots) > 1:
+                rqtree = QuadTree(self.__robots)
+                
+            for kind, sensors in groups.iteritems():
+                if self.__sensors_cached(robot, kind, sensors, rqtree):
+                    continue
+                if isinstance(sensors[0], LidarSensor):
+                    # cast later together with the lidars of other robots
+                    for sensor in sensors:
+                        rect = Rect(sensor.get_range_rect())
+                        objects = list(self.__qtree.find_items(rect))
+                        if rqtree is not None:
+                            objects.extend(other for other in rqtree.find_items(rect)
+                                           if other is not robot)
+                        lidars.append(sensor)
+                        candidates.append(objects)
+                    continue
+                if isinstance(sensors[0], MarkerSensor):
+                    markers = self.__get_markers()
+                    for sensor in sensors:
+                        sensor.update_markers(
+                            [markers.positions[marker] for marker in
+                             markers.qtree.find_items(sensor.get_bounding_rect())],
+                            self.__qtree)
+                    continue
+                if field is not None and isinstance(sensors[0], ProximitySensor):
+                    traced.extend((robot, sensor) for sensor in sensors)
+                    continue
+                for sensor in sensors:
+                    rect = Rect(sensor.get_bounding_rect())
+                    sensor.update_distance()
+                    # distance to obstacles
+                    for obstacle in self.__qtree.find_items(rect):
+                        sensor.update_distance(obstacle)
+                    # distance to other robots
+                    if rqtree is None: continue
+                    for other in rqtree.find_items(rect):
+                        if other is not robot:
+                            sensor.update_distance(other)
+            if groups:
+                self.__robot_timers[robot].lap('sensors', start)
+
+        if traced:
+            self.__trace_sensors(traced, rqtree)
+        if lidars:
+            LidarSensor.cast(lidars, candidates)
+
+    def __get_markers(self):
+        """Get the index of the markers as a :class:`~helpers.Struct` with
+           the ``qtree`` of the markers and the (index, (x, y)) ``positions``
+           of every marker. The markers do not move, so the index is built
+           once for a world.
+        """
+        if self.__markers is None:
+            self.__markers = helpers.Struct()
+            self.__markers.qtree = QuadTree(self.__background)
+            self.__markers.positions = dict(
+                (marker, (i, tuple(marker.get_world_polygon().P.mean(axis=0))))
+                for i, marker in enumerate(self.__background))
+        return self.__markers
+
+    def __get_sensor_range(self, sensor):
+        """Get the rectangle in which *sensor* can see other objects. The
+           envelope of a lidar is only its housing, see
+           :meth:`sensor.LidarSensor.get_range_rect`."""
+        if isinstance(sensor, LidarSensor):
+            return Rect(sensor.get_range_rect())
+        return Rect(sensor.get_bounding_rect())
+
+    def __sensors_cached(self, robot, kind, sensors, rqtree):
+        """Check if the last readings of *sensors* (all of type *kind*)
+           on *robot* are still valid.
+        
+           The readings are valid if the robot has moved less than the
+           sensor cache tolerance since they were taken, and there was
+           no other robot in the range of the sensors then or now.
+           Otherwise, the current pose is stored for the update that follows.
+           
+           The hits and misses are counted for every robot.
+        """
+        pose = robot.get_pose()
+        stats = self.__sensor_cache_stats.setdefault(robot, [0, 0])
+        
+        others = False
+        if rqtree is not None:
+            rect = Rect.sum(self.__get_sensor_range(sensor) for sensor in sensors)
+            others = any(other is not robot for other in rqtree.find_items(rect))
+        
+        cached = self.__sensor_cache.get((robot, kind))
+        if cached is not None and not others and self.__sensor_tolerance is not None:
+            distance, angle = self.__sensor_tolerance
+            dx, dy = pose.x - cached.x, pose.y - cached.y
+            dtheta = (pose.theta - cached.theta + pi)%(2*pi) - pi
+            if dx*dx + dy*dy <= distance*distance and abs(dtheta) <= angle:
+                stats[0] += 1
+                return True
+
+        stats[1] += 1
+        if others:
+            self.__sensor_cache[(robot, kind)] = None
+        else:
+            self.__sensor_cache[(robot, kind)] = pose
+        return False
+
     def __check_collisions(self):
-        """Update proximity sensors and detect collisions between objects"""
+        """Detect collisions between objects"""
         
         collisions = []
         checked_robots = []
@@ -440,49 +1636,123 @@ class Simulator(threading.Thread):
             rqtree = QuadTree(self.__robots)
         else: rqtree = None
         
-        # check each robot
+        # check each robot, sleeping robots can only be hit by others
         for robot in self.__robots:
+            if robot in self.__sleeping:
+                continue
                 
-            # update proximity sensors
-            for sensor in robot.get_external_sensors():
-                sensor.get_world_envelope(True)
-                rect = Rect(sensor.get_bounding_rect())
-                sensor.update_distance()
-                # distance to obstacles
-                for obstacle in self.__qtree.find_items(rect):
-                    sensor.update_distance(obstacle)
-                # distance to other robots
-                if rqtree is None: continue
-                for other in rqtree.find_items(rect):
-                    if other is not robot:
-                        sensor.update_distance(other)
-            
             rect = Rect(robot.get_bounding_rect())
             
             # against nearest obstacles
-            for obstacle in self.__qtree.find_items(rect):
-                if robot.has_collision(obstacle):
-                    collisions.append((robot, obstacle))
+            for obstacle in robot.get_collisions(self.__qtree.find_items(rect)):
+                collisions.append((robot, obstacle))
             
             # against other robots
             if rqtree is not None:
-                for other in rqtree.find_items(rect):
-                    if other is robot: continue
-                    if other in checked_robots: continue
-                    if robot.has_collision(other):
-                        collisions.append((robot, other))
+                others = [other for other in rqtree.find_items(rect)
+                          if other is not robot and other not in checked_robots]
+                for other in robot.get_collisions(others):
+                    collisions.append((robot, other))
 
             checked_robots.append(robot)
             
+        registry.add('collisions', len(collisions))
         if len(collisions) > 0:
-            # Test code - print out collisions
             for (robot, obstacle) in collisions:
-                print "Collision between:\n", robot, "\n", obstacle
-            # end of test code
+                self.__log.log(WARNING, 'collision',
+                               "Collision with " + self.__describe(obstacle),
+                               self.__time, self.__robots.index(robot) + 1)
             return True
                 
         return False
 
+    def __describe(self, thing):
+        """Name a robot or an obstacle in the event log"""
+        if thing in self.__robots:
+            return "Robot {}".format(self.__robots.index(thing) + 1)
+        if thing in self.__obstacles:
+            return "obstacle {}".format(self.__obstacles.index(thing) + 1)
+        return str(thing)
+
+    def __log_exception(self):
+        """Log the exception that is being handled"""
+        e_type, e_value = sys.exc_info()[:2]
+        self.__log.log(ERROR, 'exception',
+                       "{}: {}".format(e_type.__name__, e_value), self.__time)
+
+    def __update_metrics(self):
+        """Give the metrics server a new snapshot of the statistics"""
+        elapsed = self.__metrics.get_elapsed()
+        steps_per_second = None
+        if elapsed:
+            steps_per_second = (self.__steps - self.__metrics_steps)/elapsed
+        self.__metrics_steps = self.__steps
+        late, steps = self.__pacer.get_overruns()
+
+        phases = Metric('pysimiam_phase_seconds', 'gauge',
+                        'Time spent in a phase of the recent steps')
+        for phase, summary in self.__timers.get_summary().iteritems():
+            if summary is not None:
+                for stat in ('mean', 'p95', 'max'):
+                    phases.add(summary[stat], phase = phase, stat = stat)
+        events = Metric('pysimiam_events_total', 'counter',
+                        'Events counted in the steps since the world was loaded')
+        for name, count in self.__total_counts.iteritems():
+            events.add(count, event = name)
+        switches = Metric('pysimiam_controller_switches_total', 'counter',
+                          'Controller switches since the world was loaded')
+        trails = Metric('pysimiam_trail_points', 'gauge',
+                        'Points in the trail of a robot')
+        for i, robot in enumerate(self.__robots):
+            switches.add(self.__switches.get(robot, 0), robot = i + 1)
+            trails.add(len(self.__trackers[i].points), robot = i + 1)
+
+        self.__metrics.update([
+            Metric('pysimiam_steps_total', 'counter',
+                   'Simulation steps').add(self.__steps),
+            Metric('pysimiam_steps_per_second', 'gauge',
+                   'Simulation steps per second of wall clock time').add(steps_per_second),
+            Metric('pysimiam_simulation_time_seconds', 'gauge',
+                   'Simulation time').add(self.__time),
+            Metric('pysimiam_real_time_factor', 'gauge',
+                   'Achieved simulation speed relative to the wall clock'
+                   ).add(self.__pacer.get_real_time_factor()),
+            Metric('pysimiam_late_steps', 'gauge',
+                   'Steps behind the wall clock since the speed was set').add(late),
+            Metric('pysimiam_paced_steps', 'gauge',
+                   'Steps since the speed was set').add(steps),
+            Metric('pysimiam_running', 'gauge',
+                   '1 if the simulation is running').add(self.__state == RUN),
+            Metric('pysimiam_robots', 'gauge', 'Robots in the world'
+                   ).add(len(self.__robots)),
+            Metric('pysimiam_sleeping_robots', 'gauge', 'Robots that are sleeping'
+                   ).add(len(self.__sleeping)),
+            Metric('pysimiam_collisions_total', 'counter',
+                   'Collisions since the world was loaded'
+                   ).add(self.__total_counts.get('collisions', 0)),
+            phases, events, switches, trails,
+            Metric('pysimiam_queue_depth', 'gauge',
+                   'Messages waiting in the simulator queues'
+                   ).add(self.__in_queue.qsize(), queue = 'commands'
+                   ).add(self._out_queue.qsize(), queue = 'events')])
+
+    def __add_counts(self, counts):
+        """Add the counter increments of a step to the statistics"""
+        for name, count in counts.iteritems():
+            self.__step_counts.add(name, count)
+            self.__total_counts[name] = self.__total_counts.get(name, 0) + count
+
+    def __save_profile(self):
+        """Save the results of the current profiler and remove it"""
+        profiler, self.__profiler = self.__profiler, None
+        summary = profiler.save()
+        if summary is None:
+            self.__log.log(INFO, 'profile', "No steps were profiled", self.__time)
+            return
+        self.__log.log(INFO, 'profile', "Profile of {} steps saved to {}.prof".format(
+                       summary['steps'], summary['path']), self.__time)
+        self._out_queue.put(('profile_saved', (summary,)))
+
     def __process_queue(self):
         """Process external calls
         """
@@ -494,14 +1764,19 @@ class Simulator(threading.Thread):
                     try:
                         self.__class__.__dict__[name](self,*args)
                     except TypeError:
-                        print "Wrong simulator event parameters {}{}".format(name,args)
+                        self.__log.log(ERROR, 'command',
+                            "Wrong simulator event parameters {}{}".format(name,args),
+                            self.__time)
                         self._out_queue.put(("exception",sys.exc_info()))
                     except Exception as e:
+                        self.__log_exception()
                         self._out_queue.put(("exception",sys.exc_info()))
                 else:
-                    print "Unknown simulator event '{}'".format(name)
+                    self.__log.log(WARNING, 'command',
+                        "Unknown simulator event '{}'".format(name), self.__time)
             else:
-                print "Wrong simulator event format '{}'".format(tpl)
+                self.__log.log(WARNING, 'command',
+                    "Wrong simulator event format '{}'".format(tpl), self.__time)
             self.__in_queue.task_done()
     
 #end class Simulator
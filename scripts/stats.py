@@ -0,0 +1,164 @@
+from timeit import default_timer as timer
+import numpy as np
+
+class RollingStats(object):
+    """Keeps the last *size* samples of a quantity, and calculates
+       their mean, 95th percentile and maximum on request.
+
+       Adding a sample is cheap, all calculations are done in
+       :meth:`get_summary`.
+    """
+
+    def __init__(self, size = 500):
+        self.__size = size
+        self.reset()
+
+    def reset(self):
+        """Forget all samples"""
+        self.__samples = []
+        self.__next = 0
+        self.__count = 0
+
+    def add(self, value):
+        """Add a sample, replacing the oldest one if the window is full"""
+        if len(self.__samples) < self.__size:
+            self.__samples.append(value)
+        else:
+            self.__samples[self.__next] = value
+            self.__next = (self.__next + 1) % self.__size
+        self.__count += 1
+
+    def get_count(self):
+        """Get the number of samples added since the last reset"""
+        return self.__count
+
+    def get_summary(self):
+        """Get a dictionary with the ``'mean'``, ``'p95'`` and ``'max'`` of
+           the samples in the window, and the ``'count'`` of all samples.
+           Returns `None` if there are no samples."""
+        if not self.__samples:
+            return None
+        samples = np.array(self.__samples)
+        return {'mean': float(samples.mean()),
+                'p95': float(np.percentile(samples, 95)),
+                'max': float(samples.max()),
+                'count': self.__count}
+
+class StatsGroup(object):
+    """A group of named :class:`RollingStats`, created when they
+       get their first sample."""
+
+    def __init__(self, size = 500):
+        self.__size = size
+        self.__stats = {}
+
+    def reset(self):
+        """Forget all statistics"""
+        self.__stats = {}
+
+    def add(self, name, value):
+        """Add a sample *value* to the statistics of *name*"""
+        stats = self.__stats.get(name)
+        if stats is None:
+            stats = self.__stats[name] = RollingStats(self.__size)
+        stats.add(value)
+
+    def get_summary(self):
+        """Get a dictionary of summaries by name,
+           see :meth:`RollingStats.get_summary`"""
+        return dict((name, stats.get_summary())
+                    for name, stats in self.__stats.iteritems())
+
+class StepTimers(StatsGroup):
+    """Rolling statistics of the time spent in the phases of a simulation step.
+
+       Phases are identified by name and created when they are first timed.
+       The time of a phase is measured from a time stamp::
+
+            timers = StepTimers()
+            t = timer()
+            do_this()
+            t = timers.lap('this', t)
+            do_that()
+            t = timers.lap('that', t)
+
+       Durations that are summed up in a loop can be added with :meth:`add`.
+    """
+
+    def lap(self, phase, start):
+        """Add the time since *start* to *phase*, and return the current time"""
+        now = timer()
+        self.add(phase, now - start)
+        return now
+
+class DecimatedHistory(object):
+    """The history of a few signals, kept as the minimum and maximum in
+       at most *buckets* time buckets, so that the memory and the time to
+       plot it do not grow with the length of the history.
+
+       Every bucket covers the same number of samples. When all buckets
+       are full, neighbouring buckets are merged and the buckets cover
+       twice as many samples. Adding a sample takes constant (amortized)
+       time. NaN values are ignored.
+    """
+
+    def __init__(self, channels, buckets = 1024):
+        self.__buckets = buckets - buckets % 2
+        self.__times = np.empty((self.__buckets, 2))
+        self.__mins = np.empty((self.__buckets, channels))
+        self.__maxs = np.empty((self.__buckets, channels))
+        self.reset()
+
+    def reset(self):
+        """Forget all samples"""
+        self.__span = 1   # samples per bucket
+        self.__count = 0  # samples in the last bucket
+        self.__used = 0   # buckets with samples
+
+    def get_span(self):
+        """Get the number of samples in a bucket"""
+        return self.__span
+
+    def add(self, time, values):
+        """Add a sample of all channels at *time*"""
+        if self.__count == self.__span or self.__used == 0:
+            if self.__used == self.__buckets:
+                self.__merge()
+            k = self.__used
+            self.__used += 1
+            self.__count = 0
+            self.__times[k] = time
+            self.__mins[k] = values
+            self.__maxs[k] = values
+        else:
+            k = self.__used - 1
+            self.__times[k,1] = time
+            np.fmin(self.__mins[k], values, self.__mins[k])
+            np.fmax(self.__maxs[k], values, self.__maxs[k])
+        self.__count += 1
+
+    def __merge(self):
+        """Merge the buckets pairwise, freeing half of them"""
+        half = self.__buckets//2
+        self.__times[:half,0] = self.__times[0::2,0]
+        self.__times[:half,1] = self.__times[1::2,1]
+        self.__mins[:half] = np.fmin(self.__mins[0::2], self.__mins[1::2])
+        self.__maxs[:half] = np.fmax(self.__maxs[0::2], self.__maxs[1::2])
+        self.__used = half
+        self.__span *= 2
+
+    def get(self, buckets = None):
+        """Get the (times, mins, maxs) arrays of the history, with at most
+           *buckets* buckets. *times* has the first and the last time of
+           every bucket in its rows, *mins* and *maxs* have a column for
+           every channel."""
+        n = self.__used
+        times, mins, maxs = self.__times[:n], self.__mins[:n], self.__maxs[:n]
+        if buckets is None or n <= buckets:
+            return times.copy(), mins.copy(), maxs.copy()
+        # bucket boundaries in the stored buckets
+        edges = (np.arange(buckets + 1)*n)//buckets
+        starts = edges[:-1]
+        return (np.column_stack((times[starts,0], times[edges[1:]-1,1])),
+                np.fmin.reduceat(mins, starts),
+                np.fmax.reduceat(maxs, starts))
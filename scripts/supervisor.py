@@ -207,12 +207,45 @@ class Supervisor:
                 if f():
                     c.restart()
                     self.current = c
-                    print "Switched to {}".format(c.__class__.__name__)
                     break
 
         #execute the current controller
         return self.current.execute(self.get_controller_state(),dt)
 
+    def get_signals(self):
+        """Return the signals of the supervisor that can be plotted in the UI,
+        as a dictionary of floats or lists of floats by name, e.g.
+        ``{'velocity': 0.2, 'ir_distances': [0.2, 0.1, 0.2]}``.
+        The names and the lengths of the lists should not change.
+        
+        The default implementation returns an empty dictionary.
+        """
+        return {}
+
+    def get_goal(self):
+        """Return the (x, y) position the supervisor is trying to reach,
+        for the run analytics, or `None` if there is no such position.
+        
+        The default implementation returns `None`.
+        """
+        return None
+
+    def can_sleep(self):
+        """Return `True` if neither the output of the current controller
+        nor the conditions to leave it can change while the robot information
+        and the parameters stay the same.
+        
+        If sleeping is enabled (see :meth:`simulator.Simulator.set_sleeping`),
+        the simulator stops calling :meth:`execute` for a robot that stands
+        still with the same controller for a few steps, until the robot
+        information or the parameters can change. Supervisors whose output
+        changes on its own, e.g. after a timeout or through an integrator,
+        must not sleep.
+        
+        The default implementation returns `False`.
+        """
+        return False
+
     def draw(self, renderer):
         """Draw anything in the view.
         
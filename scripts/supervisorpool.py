@@ -0,0 +1,230 @@
+import multiprocessing as mp
+import multiprocessing.sharedctypes as sharedctypes
+import traceback
+import numpy as np
+
+from helpers import Struct
+from renderer import DrawingRecorder
+
+# Room for the robot inputs in a row of the output array
+MAX_INPUTS = 8
+# Output row: container type, number of inputs, controller id, can_sleep, inputs
+_OUT_HEADER = 4
+
+def _is_number(value):
+    return isinstance(value, (int, long, float)) and not isinstance(value, bool)
+
+def _info_layout(info, path = ()):
+    """Find the numeric fields of the robot information structure *info*.
+
+       Returns a list of (path, container type, length) tuples.
+       The container type is `None` for a single number. Lists and tuples
+       of numbers and one-dimensional float arrays are supported.
+    """
+    layout = []
+    for name, value in sorted(vars(info).items()):
+        if isinstance(value, Struct):
+            layout.extend(_info_layout(value, path + (name,)))
+        elif _is_number(value):
+            layout.append((path + (name,), None, 1))
+        elif isinstance(value, (list, tuple)) and value and \
+             all(_is_number(v) for v in value):
+            layout.append((path + (name,), type(value), len(value)))
+        elif isinstance(value, np.ndarray) and value.ndim == 1 and \
+             value.dtype.kind == 'f':
+            layout.append((path + (name,), np.ndarray, len(value)))
+    return layout
+
+def _layout_size(layout):
+    return sum(length for path, container, length in layout)
+
+def _pack_info(info, layout, values, integers):
+    """Write the numeric fields of *info* to *values*, and mark
+       the integers in *integers*"""
+    k = 0
+    for path, container, length in layout:
+        value = info
+        for name in path:
+            value = getattr(value, name)
+        if container is None:
+            value = (value,)
+        elif len(value) != length:
+            raise ValueError("[SupervisorPool] The length of robot info field '{}' has changed".format('.'.join(path)))
+        values[k:k+length] = value
+        integers[k:k+length] = [isinstance(v, (int, long)) for v in value]
+        k += length
+
+def _unpack_info(info, layout, values, integers):
+    """Set the numeric fields of *info* from *values* and *integers*"""
+    k = 0
+    for path, container, length in layout:
+        parent = info
+        for name in path[:-1]:
+            parent = getattr(parent, name)
+        value = [int(v) if i else float(v)
+                 for v, i in zip(values[k:k+length], integers[k:k+length])]
+        if container is None:
+            value = value[0]
+        elif container is np.ndarray:
+            value = np.array(value)
+        else:
+            value = container(value)
+        setattr(parent, path[-1], value)
+        k += length
+
+def _worker(conn, robots, supervisors, indices, layout, info_array, out_array):
+    """Execute the supervisors with *indices* on request"""
+    infos = np.frombuffer(info_array).reshape(len(supervisors), -1)
+    width = infos.shape[1]//2
+    outputs = np.frombuffer(out_array).reshape(len(supervisors), -1)
+    controllers = {}
+    while True:
+        name, args = conn.recv()
+        try:
+            if name == 'execute':
+                active, dt = args
+                switched = {}
+                for i in active:
+                    if i not in indices: continue
+                    info = robots[i].get_info()
+                    _unpack_info(info, layout, infos[i,:width], infos[i,width:])
+                    supervisor = supervisors[i]
+                    inputs = supervisor.execute(info, dt)
+                    if len(inputs) > MAX_INPUTS:
+                        raise ValueError("[SupervisorPool] Too many robot inputs")
+                    outputs[i,0] = isinstance(inputs, list)
+                    outputs[i,1] = len(inputs)
+                    controller = getattr(supervisor, 'current', None)
+                    if controllers.get(i) is not controller:
+                        controllers[i] = controller
+                        switched[i] = controller.__class__.__name__
+                    outputs[i,2] = id(controller)
+                    outputs[i,3] = supervisor.can_sleep()
+                    outputs[i,_OUT_HEADER:_OUT_HEADER+len(inputs)] = inputs
+                result = switched
+            elif name == 'set_parameters':
+                i, parameters = args
+                supervisors[i].set_parameters(parameters)
+                result = None
+            elif name == 'draw':
+                recorder = DrawingRecorder()
+                for i in indices:
+                    supervisors[i].draw(recorder)
+                result = recorder.flush()
+            elif name == 'stop':
+                conn.send(('done', None))
+                break
+            conn.send(('done', result))
+        except Exception:
+            conn.send(('exception', traceback.format_exc()))
+
+class SupervisorPool(object):
+    """Runs the supervisors of the robots in a pool of worker processes.
+
+       The workers are forked after the supervisors have been created,
+       so that every worker has a copy of all robots and supervisors, and
+       uses the supervisors of a fixed subset of robots. The numeric fields
+       of the robot information and the robot inputs are exchanged through
+       shared memory. All other fields of the robot information are
+       assumed to be constant.
+
+       Because every supervisor is executed with the same information as
+       in the simulator thread, the results are identical to serial
+       execution. The workers need the `fork` start method (POSIX).
+
+       :param robots: The robots of the simulation
+       :param supervisors: The supervisors of the robots
+       :param processes: The number of worker processes
+    """
+    def __init__(self, robots, supervisors, processes):
+        self.__robots = robots
+        self.__layout = _info_layout(robots[0].get_info())
+        for robot in robots[1:]:
+            if _info_layout(robot.get_info()) != self.__layout:
+                raise ValueError("[SupervisorPool] All robots must have the same information structure")
+        n = len(robots)
+        width = max(1, _layout_size(self.__layout))
+        self.__width = width
+        # values and integer flags
+        self.__info_array = sharedctypes.RawArray('d', 2*n*width)
+        self.__out_array = sharedctypes.RawArray('d', n*(_OUT_HEADER + MAX_INPUTS))
+        self.__infos = np.frombuffer(self.__info_array).reshape(n, -1)
+        self.__outputs = np.frombuffer(self.__out_array).reshape(n, -1)
+        self.__controller_names = {}
+
+        self.__connections = []
+        self.__workers = []
+        processes = max(1, min(processes, n))
+        for k in range(processes):
+            conn, child_conn = mp.Pipe()
+            worker = mp.Process(target=_worker,
+                                args=(child_conn, robots, supervisors,
+                                      set(range(k, n, processes)), self.__layout,
+                                      self.__info_array, self.__out_array))
+            worker.daemon = True
+            worker.start()
+            self.__connections.append(conn)
+            self.__workers.append(worker)
+
+    def __call_all(self, name, args = ()):
+        """Send a request to all workers and collect the results"""
+        for conn in self.__connections:
+            conn.send((name, args))
+        results = []
+        errors = []
+        for conn in self.__connections:
+            status, result = conn.recv()
+            if status == 'exception':
+                errors.append(result)
+            results.append(result)
+        if errors:
+            raise Exception("[SupervisorPool] Supervisor failed:\n" + errors[0])
+        return results
+
+    def execute(self, active, dt):
+        """Execute the supervisors of the robots with indices *active*.
+
+           Returns a list of (inputs, controller id, can_sleep) tuples,
+           one for every active robot.
+        """
+        for i in active:
+            _pack_info(self.__robots[i].get_info(), self.__layout,
+                       self.__infos[i,:self.__width], self.__infos[i,self.__width:])
+        for switched in self.__call_all('execute', (active, dt)):
+            self.__controller_names.update(switched)
+        results = []
+        for i in active:
+            row = self.__outputs[i]
+            inputs = [float(v) for v in row[_OUT_HEADER:_OUT_HEADER+int(row[1])]]
+            if not row[0]:
+                inputs = tuple(inputs)
+            results.append((inputs, int(row[2]), bool(row[3])))
+        return results
+
+    def get_controller_name(self, index):
+        """Get the class name of the current controller of robot *index*,
+           as of the last :meth:`execute`"""
+        return self.__controller_names.get(index)
+
+    def set_parameters(self, index, parameters):
+        """Set the *parameters* of the supervisor of robot *index*"""
+        self.__connections[index % len(self.__connections)].send(
+            ('set_parameters', (index, parameters)))
+        status, result = self.__connections[index % len(self.__connections)].recv()
+        if status == 'exception':
+            raise Exception("[SupervisorPool] Supervisor failed:\n" + result)
+
+    def draw(self, renderer):
+        """Draw all supervisors with *renderer*"""
+        for calls in self.__call_all('draw'):
+            DrawingRecorder.replay(calls, renderer)
+
+    def stop(self):
+        """Stop the worker processes"""
+        try:
+            self.__call_all('stop')
+        finally:
+            for worker in self.__workers:
+                worker.join(1)
+                if worker.is_alive():
+                    worker.terminate()
@@ -0,0 +1,153 @@
+import os
+import mmap
+import tempfile
+import numpy as np
+
+MAGIC = 'SIMTELE1'
+FORMAT_VERSION = 1
+
+# magic, then version, robots, sensors, capacity, last sequence number
+_HEADER = np.dtype([('magic', 'S8'), ('version', '<i8'), ('robots', '<i8'),
+                    ('sensors', '<i8'), ('capacity', '<i8'), ('sequence', '<i8')])
+
+def slot_dtype(robots, sensors):
+    """The layout of one slot of the ring buffer for *robots* robots with
+       at most *sensors* external sensors. Missing values are NaN."""
+    return np.dtype([('sequence', '<i8'),
+                     ('time', '<f8'),
+                     ('pose', '<f8', (robots, 3)),
+                     ('wheel_speeds', '<f8', (robots, 2)),
+                     ('sensor_readings', '<f8', (robots, sensors))])
+
+def _map(f, size, access):
+    """Map the header and the slots of the file *f*"""
+    buf = mmap.mmap(f.fileno(), size, access = access)
+    header = np.ndarray((), _HEADER, buf, 0)
+    return buf, header
+
+class TelemetryWriter(object):
+    """Publishes the state of the robots at every step in a memory-mapped
+       ring buffer of *capacity* slots in the file *path*.
+
+       The file starts with a fixed header (see :data:`MAGIC`), followed by
+       the slots (see :func:`slot_dtype`). Step number *n* (counting from 0)
+       is written to slot ``n % capacity``. The sequence number of a slot is
+       set to -1 while it is written, and to *n* afterwards. The sequence
+       number in the header is the last step that was completely written.
+       This way, the readers need no locks, see :class:`TelemetryReader`.
+
+       The file is created anew with a temporary name and renamed to
+       *path*, so that the readers of a previous file are not disturbed.
+    """
+
+    def __init__(self, path, robots, capacity = 1024):
+        self.__sensors = max(len(robot.get_external_sensors()) for robot in robots)
+        dtype = slot_dtype(len(robots), self.__sensors)
+        size = _HEADER.itemsize + capacity*dtype.itemsize
+
+        handle, filename = tempfile.mkstemp(dir = os.path.dirname(os.path.abspath(path)))
+        with os.fdopen(handle, 'w+b') as f:
+            f.truncate(size)
+            self.__buffer, self.__header = _map(f, size, mmap.ACCESS_WRITE)
+        self.__slots = np.ndarray((capacity,), dtype, self.__buffer, _HEADER.itemsize)
+        self.__slots['sequence'] = -1
+        self.__header[()] = (MAGIC, FORMAT_VERSION, len(robots),
+                             self.__sensors, capacity, -1)
+        os.rename(filename, path)
+        self.__next = 0
+
+    def publish(self, time, robots):
+        """Write the state of *robots* at *time* to the next slot"""
+        k = self.__next % len(self.__slots)
+        self.__slots['sequence'][k] = -1
+        self.__slots['time'][k] = time
+        poses = self.__slots['pose'][k]
+        speeds = self.__slots['wheel_speeds'][k]
+        readings = self.__slots['sensor_readings'][k]
+        readings.fill(np.nan)
+        for i, robot in enumerate(robots):
+            poses[i] = tuple(robot.get_pose())
+            wheels = robot.get_wheel_speeds()
+            speeds[i] = np.nan if wheels is None else wheels
+            for j, sensor in enumerate(robot.get_external_sensors()):
+                readings[i,j] = sensor.reading()
+        self.__slots['sequence'][k] = self.__next
+        self.__header['sequence'] = self.__next
+        self.__next += 1
+
+    def close(self):
+        """Unmap the file. The file stays, so that it can still be read."""
+        if self.__buffer is not None:
+            self.__slots = None
+            self.__header = None
+            self.__buffer.close()
+            self.__buffer = None
+
+class TelemetryReader(object):
+    """Attaches to the ring buffer of a :class:`TelemetryWriter` in the
+       file *path*, in any process.
+
+       The slots are mapped read-only and never locked. A slot can be
+       overwritten while it is read, so :meth:`read` copies it and checks
+       its sequence number before and after the copy. A reader that is
+       more than *capacity* steps behind loses the oldest steps.
+    """
+
+    def __init__(self, path):
+        self.__path = path
+        with open(path, 'rb') as f:
+            self.__inode = os.fstat(f.fileno()).st_ino
+            size = os.fstat(f.fileno()).st_size
+            self.__buffer, self.__header = _map(f, size, mmap.ACCESS_READ)
+        if self.__header['magic'] != MAGIC or \
+           self.__header['version'] != FORMAT_VERSION:
+            raise ValueError("[TelemetryReader] {} is not a telemetry file".format(path))
+        self.robots = int(self.__header['robots'])
+        self.sensors = int(self.__header['sensors'])
+        self.capacity = int(self.__header['capacity'])
+        self.__slots = np.ndarray((self.capacity,),
+                                  slot_dtype(self.robots, self.sensors),
+                                  self.__buffer, _HEADER.itemsize)
+
+    def get_sequence(self):
+        """Get the number of the last step that was published, or -1"""
+        return int(self.__header['sequence'])
+
+    def read(self, sequence = None):
+        """Get a copy of step *sequence* (by default the last one) as a
+           `numpy.void` with the fields of :func:`slot_dtype`, or `None` if
+           the step is not published yet, or was overwritten."""
+        if sequence is None:
+            sequence = self.get_sequence()
+        if sequence < 0:
+            return None
+        k = sequence % self.capacity
+        sequences = self.__slots['sequence']
+        if sequences[k] != sequence:
+            return None
+        copy = self.__slots[k:k+1].copy()[0]
+        if sequences[k] != sequence or copy['sequence'] != sequence:
+            return None
+        return copy
+
+    def read_since(self, sequence):
+        """Get a list of copies of the steps after *sequence* that are
+           still in the buffer"""
+        last = self.get_sequence()
+        first = max(sequence + 1, last - self.capacity + 1, 0)
+        steps = (self.read(n) for n in xrange(first, last + 1))
+        return [step for step in steps if step is not None]
+
+    def is_stale(self):
+        """Return `True` if the simulator has created a new file,
+           e.g. for a new world. A new reader has to be attached then."""
+        try:
+            return os.stat(self.__path).st_ino != self.__inode
+        except OSError:
+            return True
+
+    def close(self):
+        """Unmap the file"""
+        self.__slots = None
+        self.__header = None
+        self.__buffer.close()
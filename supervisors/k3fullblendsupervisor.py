@@ -52,6 +52,7 @@ class K3BlendingSupervisor(K3Supervisor):
         v = v_gtg*(1-weight_avo) + v_avo*weight_avo
         w = w_gtg*(1-weight_avo) + w_avo*weight_avo
        
+        self.uni_output = (v,w)
         vl, vr = self.uni2diff((v,w))
         return (vl, vr) 
 
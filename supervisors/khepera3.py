@@ -9,8 +9,9 @@
 from supervisor import Supervisor
 from helpers import Struct
 from pose import Pose
-from math import pi, sin, cos, log1p
+from math import pi, sin, cos, log1p, sqrt
 from simobject import Path
+from controllers.hold import Hold
 
 class K3Supervisor(Supervisor):
     """The K3Supervisor inherits from the superclass 'supervisor.Supervisor' to implement detailed calculations for any inheriting Khepera3 supervisor. Students are intended to inherit from this class when making their own supervisors. An example of implementation is the :class:`~k3defaultsupervisor.K3DefaultSupervisor` class in which this class is used to reduce noisy code interactions.
@@ -29,6 +30,9 @@ The UI may use the get_parameters function interface to create docker windows fo
         # Let's say the robot is that big:
         self.robot_size = robot_info.wheels.base_length
         
+        # The last unicycle model output
+        self.uni_output = (0.0, 0.0)
+        
     def init_default_parameters(self):
         """Sets the default PID parameters, goal, and velocity"""
         p = Struct()
@@ -126,8 +130,37 @@ The UI may use the get_parameters function interface to create docker windows fo
     def execute(self, robot_info, dt):
         """Inherit default supervisor procedures and return unicycle model output (x, y, theta)"""
         output = Supervisor.execute(self, robot_info, dt)
+        self.uni_output = output
         return self.uni2diff(output)
 
+    def get_signals(self):
+        """Return the IR distances, the heading error and the integral
+        error of the current controller, the velocity, the distance
+        to the goal and the true distance to the nearest obstacle for plotting"""
+        nan = float('nan')
+        goal = self.parameters.goal
+        signals = {'velocity': self.uni_output[0],
+                   'goal_distance': sqrt((self.pose_est.x - goal.x)**2 +
+                                         (self.pose_est.y - goal.y)**2),
+                   'heading_error': getattr(self.current, 'heading_angle', nan),
+                   'integral_error': getattr(self.current, 'E', nan)}
+        clearance = getattr(self.robot, 'clearance', nan)
+        signals['clearance'] = nan if clearance == float('inf') else clearance
+        if self.robot.ir_sensors.readings is not None:
+            signals['ir_distances'] = self.get_ir_distances()
+        else:
+            signals['ir_distances'] = [nan]*len(self.robot.ir_sensors.poses)
+        return signals
+
+    def can_sleep(self):
+        """The robot can sleep while it holds, the output is zero and the
+           transitions only depend on the robot information"""
+        return isinstance(self.current, Hold)
+
+    def get_goal(self):
+        """Return the goal from the parameters"""
+        return (self.parameters.goal.x, self.parameters.goal.y)
+
     def draw(self, renderer):
         """Draw a circular goal"""
         renderer.set_pose(Pose(self.parameters.goal.x, self.parameters.goal.y))
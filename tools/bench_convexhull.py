@@ -0,0 +1,94 @@
+#!/usr/bin/python2
+import sys
+sys.path.insert(0, './scripts')
+sys.path.insert(0, '.')
+from timeit import timeit
+
+import numpy as np
+
+import pylygon
+from pose import Pose
+from xmlreader import XMLReader
+from robots.khepera3 import Khepera3
+
+"""
+This tool compares the convex hull of pylygon with the implementation
+it replaced (kept below as legacy_convexhull).
+
+The shapes are the Khepera3 body and IR sensor cones, and the walls of
+a world file (labyrinth.big.xml by default). Every shape is also tested
+after a random rotation and as a shuffled point cloud, which are the
+cases that need the full monotone chain.
+
+Run from the root folder:
+
+    python tools/bench_convexhull.py [worlds/labyrinth.big.xml]
+"""
+
+def legacy_convexhull(P):
+    """The original reduce/cmp based hull, using a module-level global"""
+    global _P
+    _P = P
+    def turn(i, j, k):
+        (p_x, p_y), (q_x, q_y), (r_x, r_y) = _P[i], _P[j], _P[k]
+        return cmp((q_x - p_x) * (r_y - p_y) - (r_x - p_x) * (q_y - p_y), 0)
+    def keep_left(hull, r):
+        while len(hull) > 1 and turn(hull[-2], hull[-1], r) != 1: hull.pop()
+        if not len(hull) or not (hull[-1] == r).all(): hull.append(r)
+        return hull
+    I = np.lexsort((P[:,1],P[:,0]))
+    l = reduce(keep_left, I, [])
+    u = reduce(keep_left, reversed(I), [])
+    l.extend(u[i] for i in xrange(1, len(u) - 1))
+    return np.array(l)
+
+def robot_shapes():
+    robot = Khepera3(Pose())
+    shapes = [robot._p1[:,:2], robot._p2[:,:2]]
+    shapes += [np.array(sensor.get_envelope(), dtype=float)
+               for sensor in robot.get_external_sensors()]
+    return shapes
+
+def wall_shapes(filename):
+    return [np.array(thing[2], dtype=float)
+            for thing in XMLReader(filename, 'simulation').read()
+            if thing[0] == 'obstacle']
+
+def variants(shapes, rng):
+    rotated, shuffled = [], []
+    for shape in shapes:
+        t = rng.uniform(-np.pi, np.pi)
+        R = np.array([[np.cos(t), -np.sin(t)], [np.sin(t), np.cos(t)]])
+        rotated.append(np.dot(shape, R.T))
+        shuffled.append(shape[rng.permutation(len(shape))])
+    return rotated, shuffled
+
+def bench(name, shapes, repeat):
+    for shape in shapes:
+        if not np.array_equal(legacy_convexhull(shape), pylygon.convexhull(shape)):
+            raise AssertionError("Different hulls for {}: {}".format(name, shape))
+    t_old = timeit(lambda: [legacy_convexhull(s) for s in shapes], number=repeat)
+    t_new = timeit(lambda: [pylygon.convexhull(s) for s in shapes], number=repeat)
+    n = float(len(shapes)*repeat)
+    print "{:<28} {:>6} {:>10.1f} us {:>10.1f} us {:>7.1f}x".format(
+        name, len(shapes), t_old/n*1e6, t_new/n*1e6, t_old/t_new)
+
+if __name__ == "__main__":
+    world = 'worlds/labyrinth.big.xml'
+    if len(sys.argv) > 1:
+        world = sys.argv[1]
+
+    rng = np.random.RandomState(0)
+    robots = robot_shapes()
+    walls = wall_shapes(world)
+    robots_rot, robots_shuffled = variants(robots, rng)
+    walls_rot, walls_shuffled = variants(walls, rng)
+
+    print "{:<28} {:>6} {:>13} {:>13} {:>8}".format(
+        "shapes", "count", "legacy", "current", "speedup")
+    bench("robot shapes", robots, 200)
+    bench("robot shapes, rotated", robots_rot, 200)
+    bench("robot shapes, shuffled", robots_shuffled, 200)
+    bench("walls", walls, 5)
+    bench("walls, rotated", walls_rot, 5)
+    bench("walls, shuffled", walls_shuffled, 5)
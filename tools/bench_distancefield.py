@@ -0,0 +1,135 @@
+#!/usr/bin/python2
+import sys
+sys.path.insert(0, './scripts')
+sys.path.insert(0, '.')
+import random
+from math import pi, sqrt
+from timeit import default_timer as timer
+
+import numpy as np
+
+import headless
+from pose import Pose
+from simobject import Polygon
+from quadtree import QuadTree
+from xmlreader import XMLReader
+from distancefield import DistanceField
+from robots.khepera3 import Khepera3
+
+"""
+This tool compares the distance field sensor backend with the exact
+polygon intersection, for the IR sensors and the clearance.
+
+The robot is put at random poses in the free space of the world. The
+sensor distances (clamped to the sensor range) and the clearances from
+fields of several resolutions are compared to the exact values. Then the
+world is simulated with every backend, and the final poses are compared.
+
+Run from the root folder:
+
+    python tools/bench_distancefield.py [world] [samples] [rays]
+"""
+
+def exact_readings(robot, qtree):
+    distances = []
+    for sensor in robot.ir_sensors:
+        sensor.update_distance()
+        for obstacle in qtree.find_items(sensor.get_bounding_rect()):
+            sensor.update_distance(obstacle)
+        distances.append(min(sensor.distance(), sensor.rmax))
+    return distances, robot.get_nearest(qtree)[0]
+
+def field_readings(robot, field, rays):
+    sensors = robot.ir_sensors
+    poses = [sensor.get_pose() for sensor in sensors]
+    offsets = np.linspace(-0.5, 0.5, rays) if rays > 1 else np.zeros(1)
+    angles = np.array([[p.theta + s.phi*o for o in offsets]
+                       for p, s in zip(poses, sensors)]).ravel()
+    origins = np.repeat([(p.x, p.y) for p in poses], rays, axis=0)
+    distances = field.trace(origins, angles, sensors[0].rmax)
+    distances = np.minimum(distances.reshape(-1, rays).min(axis=1), sensors[0].rmax)
+    clearance = max(0.0, field.sample_boundary(robot.get_world_polygon().P).min())
+    return distances, clearance
+
+def random_poses(robot, obstacles, qtree, samples):
+    points = np.concatenate([o.get_world_polygon().P for o in obstacles])
+    (xmin, ymin), (xmax, ymax) = points.min(axis=0), points.max(axis=0)
+    poses = []
+    while len(poses) < samples:
+        robot.set_pose(Pose(random.uniform(xmin, xmax), random.uniform(ymin, ymax),
+                            random.uniform(-pi, pi)))
+        if not robot.get_collisions(qtree.find_items(robot.get_bounding_rect())):
+            poses.append(robot.get_pose())
+    return poses
+
+def bench_sensors(world, samples, rays):
+    obstacles = [Polygon(Pose(thing[1]), thing[2], 0)
+                 for thing in XMLReader(world, 'simulation').read()
+                 if thing[0] == 'obstacle']
+    qtree = QuadTree(obstacles)
+    robot = Khepera3(Pose())
+    random.seed(1)
+    poses = random_poses(robot, obstacles, qtree, samples)
+
+    start = timer()
+    exact = []
+    for pose in poses:
+        robot.set_pose(pose)
+        exact.append(exact_readings(robot, qtree))
+    exact_time = (timer() - start)/samples
+
+    print world
+    print "  {:<16} {:>9} {:>12} {:>12} {:>12} {:>12}".format(
+        "backend", "build, s", "per pose, ms", "IR mean, mm", "IR max, mm", "clear. max, mm")
+    print "  {:<16} {:>9} {:>12.3f}".format("exact", "", 1000*exact_time)
+    for resolution in (0.02, 0.01, 0.005):
+        start = timer()
+        field = DistanceField(obstacles, resolution)
+        build_time = timer() - start
+        ir_errors, clearance_errors = [], []
+        start = timer()
+        for pose, (distances, clearance) in zip(poses, exact):
+            robot.set_pose(pose)
+            field_distances, field_clearance = field_readings(robot, field, rays)
+            ir_errors.extend(np.abs(field_distances - distances))
+            if clearance < field.max_distance:
+                clearance_errors.append(abs(field_clearance - clearance))
+        field_time = (timer() - start)/samples
+        print "  {:<16} {:>9.2f} {:>12.3f} {:>12.2f} {:>12.2f} {:>12.2f}".format(
+            "field {:g} m".format(resolution), build_time, 1000*field_time,
+            1000*np.mean(ir_errors), 1000*np.max(ir_errors),
+            1000*max(clearance_errors) if clearance_errors else 0.0)
+
+def bench_runs(world, duration, rays):
+    modes = [("exact", [])] + \
+            [("field {:g} m".format(resolution),
+              [('set_sensor_backend', ('field', resolution, rays))])
+             for resolution in (0.02, 0.01, 0.005)]
+    print "  {:<16} {:>9} {:>12} {:>12}".format(
+        "run", "sim time", "wall time", "pose error")
+    reference = None
+    for name, commands in modes:
+        # the first run of a field builds it, the second one is measured
+        if commands:
+            headless.run(world, 0.1, commands)
+        report = headless.run(world, duration, commands)
+        if reference is None:
+            reference = report
+        error = max(sqrt((p.x - r.x)**2 + (p.y - r.y)**2)
+                    for p, r in zip(report['poses'], reference['poses']))
+        print "  {:<16} {:>8.2f}s {:>11.2f}s {:>10.4f} m".format(
+            name, report['time'], report['wall_time'], error)
+
+if __name__ == "__main__":
+    world = 'worlds/labyrinth.small.xml'
+    samples = 500
+    rays = 3
+    if len(sys.argv) > 1:
+        world = sys.argv[1]
+    if len(sys.argv) > 2:
+        samples = int(sys.argv[2])
+    if len(sys.argv) > 3:
+        rays = int(sys.argv[3])
+
+    bench_sensors(world, samples, rays)
+    bench_runs(world, 20.0, rays)
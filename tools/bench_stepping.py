@@ -0,0 +1,58 @@
+#!/usr/bin/python2
+import sys
+sys.path.insert(0, './scripts')
+sys.path.insert(0, '.')
+from math import sqrt
+
+import headless
+
+"""
+This tool compares fixed and adaptive physics stepping.
+
+Every world is simulated with one physics step per control period
+(the default), with a fixed fine step, and with adaptive steps that are
+long far from obstacles and shrink to the fine step near them. The
+poses are compared to a reference run with a very fine fixed step.
+
+Run from the root folder:
+
+    python tools/bench_stepping.py [duration] [fine step]
+"""
+
+def modes(fine_step):
+    return [("fixed, control period", []),
+            ("fixed, {:g} s".format(fine_step),
+                [('set_physics_step', (fine_step,))]),
+            ("adaptive, min {:g} s".format(fine_step),
+                [('set_adaptive_stepping', (True, fine_step))])]
+
+def pose_error(poses, reference):
+    return max(sqrt((p.x - r.x)**2 + (p.y - r.y)**2)
+               for p, r in zip(poses, reference))
+
+def bench(world, duration, fine_step):
+    reference = headless.run(world, duration,
+                             [('set_physics_step', (fine_step/4,))])
+    print world
+    for name, commands in modes(fine_step):
+        report = headless.run(world, duration, commands)
+        print "  {:<24} {:>8.2f} s {:>8.2f} s {:>10} {:>12.6f} m".format(
+            name, report['time'], report['wall_time'],
+            "collision" if report['collision'] else "-",
+            pose_error(report['poses'], reference['poses']))
+    print "  {:<24} {:>8.2f} s {:>10} {:>10}".format(
+        "reference", reference['time'], "",
+        "collision" if reference['collision'] else "-")
+
+if __name__ == "__main__":
+    duration = 20.0
+    fine_step = 0.002
+    if len(sys.argv) > 1:
+        duration = float(sys.argv[1])
+    if len(sys.argv) > 2:
+        fine_step = float(sys.argv[2])
+
+    print "  {:<24} {:>10} {:>10} {:>10} {:>14}".format(
+        "stepping", "sim time", "wall time", "", "pose error")
+    for world in ['worlds/slalom.xml', 'worlds/labyrinth.xml']:
+        bench(world, duration, fine_step)
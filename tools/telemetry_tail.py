@@ -0,0 +1,40 @@
+#!/usr/bin/python2
+import sys
+sys.path.insert(0, './scripts')
+from time import sleep
+
+from telemetry import TelemetryReader
+
+"""
+This tool prints the robot poses published by a simulator with
+telemetry enabled (see Simulator.publish_telemetry), e.g. as a
+starting point for analysis and plotting tools.
+
+Run from the root folder:
+
+    python tools/telemetry_tail.py telemetry_file [interval]
+"""
+
+if __name__ == "__main__":
+    if len(sys.argv) not in (2, 3):
+        print "Usage: python tools/telemetry_tail.py telemetry_file [interval]"
+        sys.exit(1)
+    interval = 0.5
+    if len(sys.argv) > 2:
+        interval = float(sys.argv[2])
+
+    reader = TelemetryReader(sys.argv[1])
+    sequence = -1
+    while True:
+        if reader.is_stale():
+            reader.close()
+            reader = TelemetryReader(sys.argv[1])
+            sequence = -1
+        steps = reader.read_since(sequence)
+        if steps:
+            step = steps[-1]
+            sequence = step['sequence']
+            poses = ", ".join("({:.3f}, {:.3f}, {:.3f})".format(*pose)
+                              for pose in step['pose'])
+            print "{:9.3f} s, {} new steps: {}".format(step['time'], len(steps), poses)
+        sleep(interval)
@@ -0,0 +1,62 @@
+import unittest
+from pose import Pose
+from analytics import RunAnalytics, summary_to_json
+
+class TestRunAnalytics(unittest.TestCase):
+
+    def test_empty(self):
+        summary = RunAnalytics().get_summary()
+        self.assertEqual(summary['path_length'], 0.0)
+        self.assertEqual(summary['clearance']['min'], None)
+        self.assertEqual(summary['heatmap'], None)
+
+    def test_path(self):
+        analytics = RunAnalytics(cell_size = 1.0)
+        for i in range(11):
+            analytics.add_step(0.1*i, Pose(0.3*i, 0.4*i, 0.0))
+        summary = analytics.get_summary()
+        self.assertAlmostEqual(summary['path_length'], 5.0)
+        self.assertAlmostEqual(summary['duration'], 1.0)
+        origin, grid = analytics.get_heatmap()
+        self.assertEqual(origin, (0.0, 0.0))
+        self.assertEqual(grid.shape, (5, 4))
+        self.assertAlmostEqual(grid.sum(), 1.0)
+
+    def test_clearance(self):
+        analytics = RunAnalytics()
+        analytics.add_step(0.0, Pose(0, 0, 0), clearance = 0.5)
+        analytics.add_step(1.0, Pose(0, 0, 0), clearance = 0.1)
+        analytics.add_step(4.0, Pose(0, 0, 0), clearance = 0.2)
+        summary = analytics.get_summary()
+        self.assertAlmostEqual(summary['clearance']['min'], 0.1)
+        self.assertAlmostEqual(summary['clearance']['mean'], (0.1 + 3*0.2)/4)
+
+    def test_controllers(self):
+        analytics = RunAnalytics()
+        for t, controller in enumerate(['GoToGoal', 'GoToGoal', 'FollowWall',
+                                        'FollowWall', 'GoToGoal']):
+            analytics.add_step(float(t), Pose(0, 0, 0), controller = controller)
+        summary = analytics.get_summary()
+        self.assertEqual(summary['switches'], 2)
+        self.assertEqual(summary['controller_time'],
+                         {'GoToGoal': 2.0, 'FollowWall': 2.0})
+
+    def test_goal_and_drift(self):
+        analytics = RunAnalytics(goal_tolerance = 0.1)
+        for i in range(5):
+            analytics.add_step(1.0 + i, Pose(0.2*i, 0, 0),
+                               pose_est = Pose(0.2*i, 0.01*i, 0), goal = (0.6, 0.0))
+        summary = analytics.get_summary()
+        self.assertAlmostEqual(summary['time_to_goal'], 3.0)
+        self.assertAlmostEqual(summary['drift']['max'], 0.04)
+        self.assertAlmostEqual(summary['drift']['final'], 0.04)
+        self.assertAlmostEqual(summary['drift']['mean'], 0.02)
+
+    def test_json(self):
+        analytics = RunAnalytics()
+        analytics.add_step(0.0, Pose(0, 0, 0))
+        summary = summary_to_json(analytics.get_summary())
+        self.assertEqual(summary['heatmap']['time'], [[0.0]])
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,48 @@
+import unittest
+import Queue as queue
+from math import pi
+from headless import NullRenderer
+from pose import Pose
+from simobject import Polygon
+from simulator import Simulator
+from robots.khepera3 import Khepera3
+
+class TestContinuousCollisions(unittest.TestCase):
+
+    def setUp(self):
+        # a 6 cm wall, like in labyrinth.big.xml
+        self.wall = Polygon(Pose(1.0, -0.5, 0.0),
+                            [(0.0, 0.0), (0.06, 0.0), (0.06, 1.0), (0.0, 1.0)],
+                            0xFF0000)
+        self.simulator = Simulator(NullRenderer(), queue.Queue())
+        self.simulator._Simulator__obstacles = [self.wall]
+        self.robot = Khepera3(Pose(0.0, 0.0, 0.0))
+        # the fastest robot, 2 m in one step, through the wall without CCD
+        self.robot.set_wheel_speeds(1e3, 1e3)
+        self.speed = self.robot.get_wheel_speeds()[0]
+        self.step = 2.0/(self.speed*self.robot.info.wheels.radius)
+
+    def test_thin_wall(self):
+        front = self.robot.get_world_polygon().P[:,0].max()
+        toi, obstacle, normal = self.simulator._Simulator__move_continuous(self.robot, self.step)
+        self.assertTrue(obstacle is self.wall)
+        self.assertAlmostEqual(toi, (1.0 - front)/2.0, 4)
+        self.assertAlmostEqual(normal[0], 1.0, 4)
+        self.assertAlmostEqual(normal[1], 0.0, 4)
+        # stopped on the near side of the wall
+        self.assertAlmostEqual(self.robot.get_world_polygon().P[:,0].max(), 1.0, 4)
+        self.assertAlmostEqual(self.robot.get_pose().y, 0.0)
+
+    def test_odometry(self):
+        toi, obstacle, normal = self.simulator._Simulator__move_continuous(self.robot, self.step)
+        wheels = self.robot.get_info().wheels
+        self.assertEqual(wheels.left_ticks, int(toi*self.step*self.speed/2/pi*wheels.ticks_per_rev))
+        self.assertEqual(wheels.right_ticks, wheels.left_ticks)
+
+    def test_free(self):
+        self.robot.set_wheel_speeds(-self.speed, -self.speed)
+        self.assertEqual(self.simulator._Simulator__move_continuous(self.robot, self.step), None)
+        self.assertAlmostEqual(self.robot.get_pose().x, -2.0)
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,38 @@
+import unittest
+from pose import Pose
+from simobject import Polygon
+from quadtree import QuadTree
+from counters import CounterRegistry, registry
+
+def square(x, y):
+    return Polygon(Pose(x, y, 0.0),
+                   [(0.0, 0.0), (1.0, 0.0), (1.0, 1.0), (0.0, 1.0)],
+                   0xFF0000)
+
+class TestCounters(unittest.TestCase):
+
+    def test_difference(self):
+        counters = CounterRegistry()
+        counters.add('a')
+        snapshot = counters.snapshot()
+        counters.add('a', 2)
+        counters.add('b')
+        self.assertEqual(counters.difference(snapshot), {'a': 2, 'b': 1})
+        self.assertEqual(counters.get('a'), 3)
+        self.assertEqual(counters.get('c'), 0)
+
+    def test_hot_paths(self):
+        squares = [square(0.0, 0.0), square(0.5, 0.5), square(5.0, 5.0)]
+        tree = QuadTree(squares)
+        snapshot = registry.snapshot()
+        found = tree.find_items(squares[0].get_bounding_rect())
+        collisions = squares[0].get_collisions(o for o in found if o is not squares[0])
+        counts = registry.difference(snapshot)
+        self.assertEqual(collisions, [squares[1]])
+        self.assertEqual(counts['quadtree_queries'], 1)
+        self.assertEqual(counts['quadtree_candidates'], 2)
+        self.assertEqual(counts['sat_tests'], 1)
+        self.assertEqual(counts['polygons'], 2)
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,55 @@
+import unittest
+import os
+import shutil
+import tempfile
+import numpy as np
+from pose import Pose
+from simobject import Polygon
+from distancefield import DistanceField, load_field
+
+class TestDistanceField(unittest.TestCase):
+
+    def setUp(self):
+        self.square = Polygon(Pose(0.0, 0.0, 0.0),
+                              [(0.0, 0.0), (1.0, 0.0), (1.0, 1.0), (0.0, 1.0)],
+                              0xFF0000)
+        self.field = DistanceField([self.square], 0.01, 0.5)
+
+    def test_sample(self):
+        values = self.field.sample([(1.2, 0.5), (0.5, 0.5), (-0.3, -0.4), (5.0, 5.0)])
+        for value, expected in zip(values, (0.2, -0.5, 0.5, 0.5)):
+            self.assertAlmostEqual(value, expected, 2)
+
+    def test_trace(self):
+        hits = self.field.trace([(1.3, 0.5), (1.3, 0.5), (-0.3, -0.3)],
+                                [np.pi, 0.0, np.pi/4], [1.0, 1.0, 1.0])
+        self.assertAlmostEqual(hits[0], 0.3, 2)
+        self.assertEqual(hits[1], np.inf)
+        self.assertAlmostEqual(hits[2], 0.3*2**0.5, 2)
+
+    def test_sample_boundary(self):
+        # the corner (1, 1) of the square faces the middle of an edge
+        polygon = [(1.3, 0.9), (0.9, 1.3), (1.5, 1.5)]
+        self.assertTrue(self.field.sample(polygon).min() > 0.25)
+        self.assertAlmostEqual(self.field.sample_boundary(polygon).min(), 0.2/2**0.5, 2)
+
+    def test_cache(self):
+        directory = tempfile.mkdtemp()
+        try:
+            world = os.path.join(directory, 'world.xml')
+            with open(world, 'w') as f:
+                f.write('<simulation/>')
+            cache = os.path.join(directory, 'cache')
+            field, loaded = load_field(world, [self.square], 0.05, 0.5, cache)
+            self.assertFalse(loaded)
+            cached, loaded = load_field(world, [self.square], 0.05, 0.5, cache)
+            self.assertTrue(loaded)
+            self.assertTrue(np.array_equal(field.grid, cached.grid))
+            # another resolution is another field
+            field, loaded = load_field(world, [self.square], 0.1, 0.5, cache)
+            self.assertFalse(loaded)
+        finally:
+            shutil.rmtree(directory)
+
+if __name__ == "__main__":
+    unittest.main()
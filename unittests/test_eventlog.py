@@ -0,0 +1,58 @@
+import unittest
+import json
+import os
+import tempfile
+from eventlog import EventLog, Event, format_event, DEBUG, INFO, WARNING, ERROR
+
+class TestEventLog(unittest.TestCase):
+
+    def test_ring_buffer(self):
+        log = EventLog(size = 3)
+        for i in range(5):
+            log.log(INFO, 'controller', "Switched to {}".format(i), 0.1*i, 1)
+        events = log.get_events()
+        self.assertEqual([e.message for e in events],
+                         ["Switched to 2", "Switched to 3", "Switched to 4"])
+        log.clear()
+        self.assertEqual(log.get_events(), [])
+
+    def test_levels(self):
+        log = EventLog(level = INFO)
+        log.log(DEBUG, 'simulator', "ignored")
+        log.log(INFO, 'parameters', "Parameters applied", 1.0, 2)
+        log.log(WARNING, 'collision', "Collision with obstacle 1", 2.0, 1)
+        log.log(ERROR, 'exception', "ValueError: x", 3.0)
+        self.assertEqual(len(log.get_events()), 3)
+        self.assertEqual([e.kind for e in log.get_events(WARNING)],
+                         ['collision', 'exception'])
+        self.assertEqual(log.get_events(kind = 'parameters'),
+                         [Event(1.0, INFO, 'parameters', 2, "Parameters applied")])
+        log.set_level(ERROR)
+        log.log(WARNING, 'collision', "ignored")
+        self.assertEqual(len(log.get_events()), 3)
+
+    def test_file(self):
+        handle, filename = tempfile.mkstemp()
+        os.close(handle)
+        try:
+            log = EventLog()
+            log.open(filename)
+            log.log(WARNING, 'collision', "Collision with obstacle 1", 2.0, 1)
+            log.log(INFO, 'simulator', "Done")
+            self.assertEqual(log.close(), 0)
+            with open(filename) as f:
+                lines = [json.loads(line) for line in f]
+            self.assertEqual(lines[0], {'time': 2.0, 'level': WARNING,
+                                        'kind': 'collision', 'robot': 1,
+                                        'message': "Collision with obstacle 1"})
+            self.assertEqual(lines[1]['robot'], None)
+        finally:
+            os.remove(filename)
+
+    def test_format(self):
+        event = Event(1.5, WARNING, 'collision', 2, "Collision with Robot 1")
+        self.assertEqual(format_event(event),
+            "    1.500 [warning] collision (Robot 2): Collision with Robot 1")
+
+if __name__ == "__main__":
+    unittest.main()
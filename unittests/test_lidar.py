@@ -0,0 +1,59 @@
+import unittest
+from math import pi, sqrt
+import numpy as np
+from pose import Pose
+from simobject import Polygon, SimObject
+from sensor import LidarSensor
+
+class TestLidar(unittest.TestCase):
+
+    def setUp(self):
+        self.square = Polygon(Pose(0.0, 0.0, 0.0),
+                              [(0.0, 0.0), (1.0, 0.0), (1.0, 1.0), (0.0, 1.0)],
+                              0xFF0000)
+        self.frame = SimObject(Pose(1.5, 0.5, pi))
+
+    def test_cast(self):
+        lidar = LidarSensor(Pose(0.0, 0.0, 0.0), self.frame, 8, 2*pi, 1.0)
+        LidarSensor.cast([lidar], [[self.square]])
+        distances = lidar.get_distances()
+        # the beams start at -pi relative to the sensor, that looks at -x
+        self.assertAlmostEqual(distances[0], float('inf'))
+        self.assertAlmostEqual(distances[4], 0.5)
+        self.assertAlmostEqual(distances[3], 0.5*sqrt(2))
+        self.assertAlmostEqual(distances[5], 0.5*sqrt(2))
+        self.assertEqual(distances[2], float('inf'))
+        self.assertAlmostEqual(lidar.distance(), 0.5)
+
+    def test_cast_several(self):
+        near = LidarSensor(Pose(0.0, 0.0, 0.0), self.frame, 4, 2*pi, 1.0)
+        far = LidarSensor(Pose(-2.0, 0.0, 0.0), self.frame, 3, pi/2, 5.0)
+        alone = LidarSensor(Pose(0.0, 0.0, 0.0), self.frame, 2, pi, 1.0)
+        LidarSensor.cast([near, far, alone], [[self.square], [self.square], []])
+        self.assertAlmostEqual(near.get_distances()[2], 0.5)
+        self.assertEqual(len(far.get_distances()), 3)
+        self.assertAlmostEqual(far.get_distances()[1], 2.5)
+        self.assertTrue(np.isinf(alone.get_distances()).all())
+
+    def test_out_of_range(self):
+        lidar = LidarSensor(Pose(0.0, 0.0, 0.0), self.frame, 8, 2*pi, 0.4)
+        LidarSensor.cast([lidar], [[self.square]])
+        self.assertTrue(np.isinf(lidar.get_distances()).all())
+
+    def test_recorded_distance(self):
+        lidar = LidarSensor(Pose(0.0, 0.0, 0.0), self.frame, 8, 2*pi, 1.0)
+        lidar.set_distance(0.7)
+        self.assertEqual(lidar.distance(), 0.7)
+        self.assertTrue(np.isinf(lidar.get_distances()).all())
+        LidarSensor.cast([lidar], [[self.square]])
+        self.assertAlmostEqual(lidar.distance(), 0.5)
+
+    def test_rects(self):
+        lidar = LidarSensor(Pose(0.0, 0.0, 0.0), self.frame, 8, 2*pi, 1.0)
+        x, y, w, h = lidar.get_bounding_rect()
+        self.assertTrue(w < 0.1 and h < 0.1)
+        for value, expected in zip(lidar.get_range_rect(), (0.5, -0.5, 2.0, 2.0)):
+            self.assertAlmostEqual(value, expected)
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,58 @@
+import unittest
+from math import pi, atan2
+from pose import Pose
+from simobject import Polygon, SimObject
+from quadtree import QuadTree
+from sensor import MarkerSensor
+
+class TestMarkerSensor(unittest.TestCase):
+
+    def setUp(self):
+        # a wall from (1, -0.5) to (1.2, 0.5)
+        wall = Polygon(Pose(1.0, -0.5, 0.0),
+                       [(0.0, 0.0), (0.2, 0.0), (0.2, 1.0), (0.0, 1.0)],
+                       0xFF0000)
+        self.qtree = QuadTree([wall])
+        self.frame = SimObject(Pose(0.0, 0.0, 0.0))
+        self.sensor = MarkerSensor(Pose(0.0, 0.0, 0.0), self.frame, pi/2, 2.0)
+
+    def test_detect(self):
+        self.sensor.update_markers([(0, (0.5, 0.0)), (1, (0.8, 0.4)),
+                                    (2, (1.5, 0.0)), # behind the wall
+                                    (3, (-0.5, 0.0)), # behind the sensor
+                                    (4, (0.0, 0.9)), # outside the field of view
+                                    (5, (1.0, 1.9))], # out of range
+                                   self.qtree)
+        detections = self.sensor.get_detections()
+        self.assertEqual([marker for marker, bearing, distance in detections], [0, 1])
+        marker, bearing, distance = detections[1]
+        self.assertAlmostEqual(bearing, atan2(0.4, 0.8))
+        self.assertAlmostEqual(distance, (0.8**2 + 0.4**2)**0.5)
+        self.assertAlmostEqual(self.sensor.distance(), 0.5)
+
+    def test_no_occlusion(self):
+        self.sensor.update_markers([(2, (1.5, 0.0))])
+        self.assertEqual([marker for marker, bearing, distance
+                          in self.sensor.get_detections()], [2])
+
+    def test_rotated(self):
+        self.frame.set_pose(Pose(0.0, 0.0, pi/2))
+        self.sensor.update_markers([(0, (0.5, 0.0)), (4, (0.1, 0.9))], self.qtree)
+        detections = self.sensor.get_detections()
+        self.assertEqual([marker for marker, bearing, distance in detections], [4])
+        self.assertAlmostEqual(detections[0][1], atan2(-0.1, 0.9))
+
+    def test_recorded_distance(self):
+        self.sensor.set_distance(0.7)
+        self.assertEqual(self.sensor.distance(), 0.7)
+        self.assertEqual(self.sensor.get_detections(), [])
+        self.sensor.update_markers([(0, (0.5, 0.0))], self.qtree)
+        self.assertAlmostEqual(self.sensor.distance(), 0.5)
+
+    def test_envelope(self):
+        x, y, w, h = self.sensor.get_bounding_rect()
+        self.assertTrue(x <= 0.0 and x + w >= 2.0)
+        self.assertTrue(y <= -2.0*0.7071 and y + h >= 2.0*0.7071)
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,39 @@
+import unittest
+import urllib2
+from metrics import Metric, MetricsServer, format_metrics
+
+class TestMetrics(unittest.TestCase):
+
+    def test_format(self):
+        text = format_metrics([
+            Metric('steps_total', 'counter', 'Steps').add(3),
+            Metric('phase_seconds', 'gauge', 'Phases'
+                   ).add(0.5, phase = 'step', stat = 'max'
+                   ).add(None, phase = 'view'
+                   ).add(float('nan'), phase = 'a "b"')])
+        self.assertEqual(text.split('\n'), [
+            '# HELP steps_total Steps',
+            '# TYPE steps_total counter',
+            'steps_total 3.0',
+            '# HELP phase_seconds Phases',
+            '# TYPE phase_seconds gauge',
+            'phase_seconds{phase="step",stat="max"} 0.5',
+            'phase_seconds{phase="a \\"b\\""} NaN',
+            ''])
+
+    def test_server(self):
+        server = MetricsServer(0, 10.0)
+        try:
+            self.assertTrue(server.due())
+            server.update([Metric('robots', 'gauge', 'Robots').add(2)])
+            self.assertFalse(server.due())
+            url = 'http://127.0.0.1:{}'.format(server.get_port())
+            text = urllib2.urlopen(url + '/metrics').read()
+            self.assertTrue(text.endswith('robots 2.0\n'))
+            with self.assertRaises(urllib2.HTTPError):
+                urllib2.urlopen(url + '/other')
+        finally:
+            server.stop()
+
+if __name__ == "__main__":
+    unittest.main()
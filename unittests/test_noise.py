@@ -0,0 +1,56 @@
+import unittest
+import numpy as np
+from noise import NoiseModel, quantize
+from pose import Pose
+from robots.khepera3 import Khepera3
+
+class TestNoiseModel(unittest.TestCase):
+
+    def test_quantize(self):
+        self.assertTrue(np.allclose(quantize([0.2, 1.4, -2.6], 0.5), [0.0, 1.5, -2.5]))
+        self.assertEqual(quantize([0.2], 0.0), [0.2])
+
+    def test_draw(self):
+        model = NoiseModel(1, ir_sigma = 10.0, ir_quantum = 1.0, encoder_sigma = 2.0)
+        noise = model.draw(3, 5)
+        self.assertEqual(len(noise), 3)
+        for robot in noise:
+            self.assertEqual(robot.readings.shape, (5,))
+            self.assertEqual(robot.ticks.shape, (2,))
+            self.assertTrue(np.all(robot.speeds == 0.0))
+            self.assertEqual(robot.ir_quantum, 1.0)
+
+    def test_seed(self):
+        model = NoiseModel(7, ir_sigma = 1.0, encoder_sigma = 1.0, speed_sigma = 0.1)
+        first = [model.draw(2, 9) for step in range(3)]
+        model.reset()
+        second = [model.draw(2, 9) for step in range(3)]
+        for a, b in zip(first, second):
+            for ra, rb in zip(a, b):
+                self.assertTrue(np.array_equal(ra.readings, rb.readings))
+                self.assertTrue(np.array_equal(ra.ticks, rb.ticks))
+                self.assertTrue(np.array_equal(ra.speeds, rb.speeds))
+        other = NoiseModel(8, ir_sigma = 1.0).draw(2, 9)
+        self.assertFalse(np.array_equal(first[0][0].readings, other[0].readings))
+
+    def test_sigma(self):
+        noise = NoiseModel(3, ir_sigma = 5.0).draw(2000, 9)
+        readings = np.array([robot.readings for robot in noise])
+        self.assertAlmostEqual(readings.std(), 5.0, 1)
+        self.assertAlmostEqual(readings.mean(), 0.0, 0)
+
+    def test_standing_wheels(self):
+        robot = Khepera3(Pose(0.0, 0.0, 0.0))
+        model = NoiseModel(4, encoder_sigma = 50.0)
+        robot.set_wheel_speeds(0.0, 0.0)
+        for step in range(10):
+            robot.set_noise(model.draw(1, 9)[0])
+        self.assertEqual(robot.get_info().wheels.left_ticks, 0)
+        self.assertEqual(robot.get_info().wheels.right_ticks, 0)
+        robot.set_wheel_speeds(0.0, 1.0)
+        robot.set_noise(model.draw(1, 9)[0])
+        self.assertEqual(robot.get_info().wheels.left_ticks, 0)
+        self.assertNotEqual(robot.get_info().wheels.right_ticks, 0)
+
+if __name__ == "__main__":
+    unittest.main()
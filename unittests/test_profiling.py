@@ -0,0 +1,44 @@
+import unittest
+import cProfile
+import pstats
+import os
+import tempfile
+from profiling import attribute, collapsed_stacks, CATEGORIES, StepProfiler
+
+def leaf(n):
+    return sum(i*i for i in range(n))
+
+def branch():
+    return leaf(20000) + leaf(10000)
+
+class TestProfiling(unittest.TestCase):
+
+    def setUp(self):
+        profile = cProfile.Profile()
+        profile.enable()
+        branch()
+        profile.disable()
+        self.stats = pstats.Stats(profile)
+
+    def test_attribute(self):
+        times = attribute(self.stats)
+        self.assertEqual(sorted(times.keys()), sorted(CATEGORIES))
+        # this file is in neither of the user folders
+        self.assertAlmostEqual(sum(times.values()), self.stats.total_tt)
+        self.assertAlmostEqual(times['other'], self.stats.total_tt)
+
+    def test_collapsed_stacks(self):
+        lines = collapsed_stacks(self.stats)
+        stacks = [line.rsplit(' ', 1) for line in lines]
+        self.assertTrue(any(stack.endswith('(branch);test_profiling.py:8(leaf)')
+                            for stack, time in stacks))
+        total = sum(int(time) for stack, time in stacks)
+        self.assertAlmostEqual(total*1e-6, self.stats.total_tt, 3)
+
+    def test_no_steps(self):
+        path = os.path.join(tempfile.mkdtemp(), 'empty')
+        self.assertEqual(StepProfiler(10, path).save(), None)
+        self.assertFalse(os.path.exists(path + '.prof'))
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,56 @@
+import unittest
+import numpy as np
+from pylygon import Polygon, PolygonStack, convexhull
+
+def square(x, y, size=1.0):
+    return Polygon([(x, y), (x + size, y), (x + size, y + size), (x, y + size)])
+
+class TestPolygon(unittest.TestCase):
+
+    def test_properties(self):
+        p = square(0.0, 0.0, 2.0)
+        self.assertAlmostEqual(p.a, 4.0)
+        self.assertTrue(np.allclose(p.C, (1.0, 1.0)))
+        self.assertAlmostEqual(p.rmax, np.sqrt(2.0))
+        self.assertTrue(np.allclose(p.edges.sum(axis=0), (0.0, 0.0)))
+
+    def test_collidepoly(self):
+        a = square(0.0, 0.0)
+        self.assertIs(a.collidepoly(square(1.5, 0.0)), False)
+        projections = a.collidepoly(square(0.5, 0.25))
+        self.assertIsNot(projections, False)
+        self.assertEqual(projections.shape, (8, 2))
+
+    def test_collidepolys(self):
+        a = square(0.0, 0.0)
+        others = [square(0.5, 0.5),
+                  square(2.0, 2.0),
+                  Polygon([(0.9, -1.0), (3.0, -1.0), (0.9, 2.0)]),
+                  Polygon([(-0.5, -0.5), (0.0, -2.0), (1.0, -1.0),
+                           (2.0, -0.8), (1.5, -0.1)])]
+        expected = [a.collidepoly(other) is not False for other in others]
+        self.assertEqual(list(a.collidepolys(others)), expected)
+        self.assertEqual(list(a.collidepolys(PolygonStack(others))), expected)
+        self.assertEqual(len(a.collidepolys([])), 0)
+
+    def test_intersection_points(self):
+        points = square(0.0, 0.0).intersection_points(square(0.5, 0.5))
+        self.assertEqual(sorted((round(x, 6), round(y, 6)) for x, y in points),
+                         [(0.5, 1.0), (1.0, 0.5)])
+        self.assertEqual(square(0.0, 0.0).intersection_points(square(3.0, 3.0)), [])
+
+class TestConvexHull(unittest.TestCase):
+
+    def test_point_cloud(self):
+        P = np.array([(1.0, 1.0), (0.0, 0.0), (2.0, 0.0), (0.5, 0.5),
+                      (2.0, 2.0), (1.0, 0.0), (0.0, 2.0)])
+        self.assertEqual(list(convexhull(P)), [1, 2, 4, 6])
+
+    def test_convex_polygon(self):
+        t = np.linspace(0, 2*np.pi, 40, endpoint=False)
+        P = np.c_[np.cos(t), np.sin(t)]
+        start = np.lexsort((P[:,1], P[:,0]))[0]
+        hull = list(convexhull(P))
+        self.assertEqual(hull, range(start, 40) + range(start))
+        hull = list(convexhull(P[::-1]))
+        self.assertEqual(hull, [39 - i for i in range(start, 40) + range(start)])
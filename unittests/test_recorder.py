@@ -0,0 +1,118 @@
+import unittest
+import os
+import shutil
+import tempfile
+import numpy as np
+from pose import Pose
+from recorder import RunRecorder, Recording
+
+class FakeSensor(object):
+    def __init__(self, distance):
+        self.value = distance
+    def distance(self):
+        return self.value
+    def reading(self):
+        return 2*self.value
+
+class FakeRobot(object):
+    def __init__(self, sensors, wheels = True):
+        self.pose = Pose(0.0, 0.0, 0.0)
+        self.sensors = [FakeSensor(0.1*k) for k in range(sensors)]
+        self.wheels = wheels
+    def get_pose(self):
+        return self.pose
+    def get_wheel_speeds(self):
+        if self.wheels:
+            return (self.pose.x, -self.pose.x)
+        return None
+    def get_external_sensors(self):
+        return self.sensors
+
+class TestRecorder(unittest.TestCase):
+
+    def setUp(self):
+        self.path = tempfile.mkdtemp()
+        self.world = os.path.join(self.path, 'world_source.xml')
+        with open(self.world, 'w') as f:
+            f.write('<simulation/>')
+        self.recording = os.path.join(self.path, 'run.rec')
+
+    def tearDown(self):
+        shutil.rmtree(self.path)
+
+    def record(self, steps, times = None):
+        if times is None:
+            times = [0.02*step for step in range(steps)]
+        robots = [FakeRobot(3), FakeRobot(2, False)]
+        controllers = ['a', 'b']
+        recorder = RunRecorder(self.recording, self.world, robots)
+        for step in range(steps):
+            for robot in robots:
+                robot.pose = Pose(step, 2*step, 0.1)
+            current = controllers[(step//2) % 2]
+            recorder.add_step(times[step], robots,
+                              [(current, current.upper()), (None, None)],
+                              [Pose(1.0, 2.0, 3.0), Pose(4.0, 5.0, 6.0)])
+        return recorder
+
+    def test_round_trip(self):
+        self.record(10).close()
+        recording = Recording(self.recording)
+        self.assertEqual(len(recording), 10)
+        self.assertTrue(os.path.exists(recording.get_world()))
+        self.assertAlmostEqual(recording.get_duration(), 0.18)
+        self.assertEqual(recording['pose'][5].tolist(),
+                         [[5.0, 10.0, 0.1], [5.0, 10.0, 0.1]])
+        self.assertEqual(recording['wheel_speeds'][5,0].tolist(), [5.0, -5.0])
+        self.assertTrue(np.isnan(recording['wheel_speeds'][5,1]).all())
+        self.assertAlmostEqual(recording['sensor_readings'][0,0,2], 0.4)
+        self.assertTrue(np.isnan(recording['sensor_distances'][0,1,2]))
+        self.assertEqual(recording['controller'][:5,0].tolist(), [0, 0, 1, 1, 0])
+        self.assertEqual(recording['controller'][:,1].tolist(), [-1]*10)
+        self.assertEqual(recording.get_controller_name(0, 1), 'B')
+        self.assertEqual(recording.get_controller_name(1, 0), None)
+        self.assertEqual(recording['pose_est'][9,1].tolist(), [4.0, 5.0, 6.0])
+
+    def test_find_step(self):
+        self.record(10).close()
+        recording = Recording(self.recording)
+        self.assertEqual(recording.find_step(-1.0), 0)
+        self.assertEqual(recording.find_step(0.05), 2)
+        self.assertEqual(recording.find_step(0.06), 3)
+        self.assertEqual(recording.find_step(10.0), 9)
+
+    def test_find_step_changed_period(self):
+        self.record(6, [0.0, 0.1, 0.2, 0.25, 0.3, 0.5]).close()
+        recording = Recording(self.recording)
+        for time, step in ((0.0, 0), (0.12, 1), (0.2, 2), (0.26, 3),
+                           (0.3, 4), (0.49, 4), (0.5, 5), (0.7, 5)):
+            self.assertEqual(recording.find_step(time), step)
+
+    def test_unfinished(self):
+        recorder = self.record(4)
+        recorder.close()
+        # a crashed writer leaves an incomplete step behind
+        with open(os.path.join(self.recording, 'pose.bin'), 'ab') as f:
+            f.write('\0'*10)
+        recording = Recording(self.recording)
+        self.assertEqual(len(recording), 4)
+
+    def test_replace(self):
+        self.record(6).close()
+        self.record(3).close()
+        self.assertEqual(len(Recording(self.recording)), 3)
+
+    def test_refuse(self):
+        robots = [FakeRobot(1)]
+        # not a recording
+        os.makedirs(self.recording)
+        other = os.path.join(self.recording, 'data.bin')
+        with open(other, 'w') as f:
+            f.write('data')
+        self.assertRaises(ValueError, RunRecorder, self.recording, self.world, robots)
+        self.assertTrue(os.path.exists(other))
+        # not a directory
+        self.assertRaises(ValueError, RunRecorder, other, self.world, robots)
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,73 @@
+import unittest
+from time import sleep, time
+from scheduler import Scheduler, Pacer
+
+class TestScheduler(unittest.TestCase):
+
+    def setUp(self):
+        self.scheduler = Scheduler()
+        self.scheduler.set_period('supervisors', 0.02)
+        self.scheduler.set_period('sensors', 0.05)
+
+    def test_next_time(self):
+        self.assertAlmostEqual(self.scheduler.next_time(['supervisors', 'sensors'], 0.0), 0.02)
+        self.assertAlmostEqual(self.scheduler.next_time(['sensors'], 0.0), 0.05)
+        self.assertEqual(self.scheduler.next_time(['render'], 0.0), None)
+
+    def test_due(self):
+        s = self.scheduler
+        s.next_time(['supervisors', 'sensors'], 0.0)
+        runs = {'supervisors': 0, 'sensors': 0}
+        t = 0.0
+        while t < 1.0 - 1e-9:
+            t = s.next_time(['supervisors', 'sensors'], t)
+            for stage in runs:
+                if s.due(stage, t):
+                    runs[stage] += 1
+        self.assertEqual(runs, {'supervisors': 50, 'sensors': 20})
+
+    def test_no_drift(self):
+        s = self.scheduler
+        t = 0.0
+        for i in range(10000):
+            t = s.next_time(['supervisors'], t)
+            self.assertTrue(s.due('supervisors', t))
+        self.assertEqual(t, 10000*0.02)
+
+    def test_missed_deadlines(self):
+        s = self.scheduler
+        s.next_time(['supervisors'], 0.0)
+        self.assertTrue(s.due('supervisors', 0.1))
+        self.assertFalse(s.due('supervisors', 0.11))
+        self.assertTrue(s.due('supervisors', 0.12))
+
+    def test_without_period(self):
+        self.assertTrue(self.scheduler.due('render', 0.0))
+        self.scheduler.set_period('sensors', None)
+        self.assertTrue(self.scheduler.due('sensors', 0.0))
+        self.assertRaises(ValueError, self.scheduler.set_period, 'render', 0)
+
+class TestPacer(unittest.TestCase):
+
+    def test_compensates_compute_time(self):
+        pacer = Pacer()
+        pacer.reset(0.0, 10.0)
+        start = time()
+        for k in range(1, 11):
+            sleep(0.001) # "computation"
+            pacer.wait(k*0.02)
+        self.assertAlmostEqual(time() - start, 0.02, delta=0.01)
+        self.assertAlmostEqual(pacer.get_real_time_factor(), 10.0, delta=3.0)
+
+    def test_overruns(self):
+        pacer = Pacer(max_lag = 0.01)
+        pacer.reset(0.0, 1.0)
+        self.assertEqual(pacer.get_real_time_factor(), None)
+        sleep(0.03)
+        pacer.wait(0.001)
+        # after a long lag, the deadlines start anew
+        pacer.wait(0.002)
+        self.assertEqual(pacer.get_overruns(), (1, 2))
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,77 @@
+import unittest
+from math import pi
+from pose import Pose
+from simobject import Polygon
+from sensor import MountedSensor
+from quadtree import QuadTree
+
+class TestSimObject(unittest.TestCase):
+
+    def setUp(self):
+        self.square = Polygon(Pose(1.0, 2.0, pi/2),
+                              [(0.0, 0.0), (1.0, 0.0), (1.0, 1.0), (0.0, 1.0)],
+                              0xFF0000)
+
+    def test_world_envelope(self):
+        envelope = self.square.get_world_envelope()
+        expected = [(1.0, 2.0), (1.0, 3.0), (0.0, 3.0), (0.0, 2.0)]
+        for (x, y), (ex, ey) in zip(envelope, expected):
+            self.assertAlmostEqual(x, ex)
+            self.assertAlmostEqual(y, ey)
+
+    def test_bounds_follow_pose_version(self):
+        version = self.square.get_pose_version()
+        bounds = self.square.get_bounds()
+        self.assertIs(bounds, self.square.get_bounds())
+
+        self.square.set_pose(Pose(5.0, 5.0, 0.0))
+        self.assertNotEqual(version, self.square.get_pose_version())
+        for b, e in zip(self.square.get_bounds(), (5.0, 5.0, 6.0, 6.0)):
+            self.assertAlmostEqual(b, e)
+
+    def test_mounted_sensor_pose(self):
+        sensor = MountedSensor(Pose(1.0, 0.0, 0.5), self.square)
+        x, y, theta = sensor.get_pose()
+        self.assertAlmostEqual(x, 1.0)
+        self.assertAlmostEqual(y, 3.0)
+        self.assertAlmostEqual(theta, pi/2 + 0.5)
+
+        self.square.set_pose(Pose(0.0, 0.0, 0.0))
+        x, y, theta = sensor.get_pose()
+        self.assertAlmostEqual(x, 1.0)
+        self.assertAlmostEqual(y, 0.0)
+        self.assertAlmostEqual(theta, 0.5)
+
+class TestNearest(unittest.TestCase):
+
+    def setUp(self):
+        self.squares = [Polygon(Pose(float(x), float(y), 0.0),
+                                [(0.0, 0.0), (0.5, 0.0), (0.5, 0.5), (0.0, 0.5)],
+                                0xFF0000)
+                        for x in range(-5, 6, 2) for y in range(-5, 6, 2)]
+        self.tree = QuadTree(self.squares)
+
+    def test_distance(self):
+        triangle = Polygon(Pose(1.5, 1.0, 0.0), [(0.0, 0.0), (0.5, 0.0), (0.5, 0.5)], 0)
+        self.assertAlmostEqual(triangle.get_distance(self.squares[0]),
+                               (6.0**2 + 5.5**2)**0.5)
+        triangle.set_pose(Pose(-5.2, -5.2, 0.0))
+        self.assertAlmostEqual(triangle.get_distance(self.squares[0]), 0.0)
+
+    def test_iter_nearest(self):
+        distances = [d for d, item in self.tree.iter_nearest((0.0, 0.0, 0.1, 0.1))]
+        self.assertEqual(len(distances), len(self.squares))
+        self.assertEqual(distances, sorted(distances))
+        nearest = self.tree.find_nearest((0.0, 0.0, 0.1, 0.1), 4)
+        self.assertEqual(len(nearest), 4)
+        for (d, item), expected in zip(nearest, (0.5**2 + 0.5**2, 0.9**2 + 0.5**2,
+                                                 0.9**2 + 0.5**2, 0.9**2 + 0.9**2)):
+            self.assertAlmostEqual(d, expected**0.5)
+
+    def test_get_nearest(self):
+        triangle = Polygon(Pose(2.0, 2.0, 0.3), [(0.0, 0.0), (0.3, 0.0), (0.0, 0.3)], 0)
+        distance, nearest = triangle.get_nearest(self.tree)
+        expected = min(triangle.get_distance(square) for square in self.squares)
+        self.assertAlmostEqual(distance, expected)
+        self.assertAlmostEqual(triangle.get_distance(nearest), expected)
+        self.assertEqual(triangle.get_nearest(QuadTree([])), (None, None))
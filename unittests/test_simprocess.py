@@ -0,0 +1,53 @@
+import unittest
+import os
+import Queue as queue
+from time import time
+from headless import NullRenderer
+from eventlog import WARNING
+from simprocess import SimulatorProcess
+
+WORLD = os.path.join(os.path.dirname(os.path.abspath(__file__)),
+                     '..', 'worlds', 'settings.xml')
+
+class TestSimulatorProcess(unittest.TestCase):
+
+    def setUp(self):
+        self.in_queue = queue.Queue()
+        self.simulator = SimulatorProcess(NullRenderer(), self.in_queue)
+        self.simulator.start()
+
+    def tearDown(self):
+        self.in_queue.put(('stop', ()))
+        deadline = time() + 10
+        while self.simulator.is_alive() and time() < deadline:
+            self.wait_for(None, 0.1)
+        self.simulator.join(1)
+
+    def wait_for(self, name, timeout = 10):
+        """Get the events until the event *name*, and return its args"""
+        deadline = time() + timeout
+        while time() < deadline:
+            try:
+                event, args = self.simulator._out_queue.get(timeout = 0.1)
+            except queue.Empty:
+                continue
+            self.simulator._out_queue.task_done()
+            if event == name:
+                return args
+        if name is not None:
+            self.fail("No '{}' event".format(name))
+
+    def test_command(self):
+        self.in_queue.put(('read_config', (WORLD,)))
+        robot_id, window_name, parameters = self.wait_for('make_param_window')
+        self.assertEqual(robot_id, 0)
+        self.wait_for('reset')
+
+        self.in_queue.put(('apply_parameters', (5, None)))
+        self.in_queue.put(('get_events', (WARNING,)))
+        events, = self.wait_for('events')
+        self.assertEqual([(event.kind, event.message) for event in events],
+                         [('parameters', 'Robot not found')])
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,93 @@
+import unittest
+import numpy as np
+from stats import RollingStats, StepTimers, DecimatedHistory, timer
+
+class TestRollingStats(unittest.TestCase):
+
+    def test_empty(self):
+        self.assertEqual(RollingStats().get_summary(), None)
+
+    def test_summary(self):
+        stats = RollingStats()
+        for value in range(1, 101):
+            stats.add(float(value))
+        summary = stats.get_summary()
+        self.assertAlmostEqual(summary['mean'], 50.5)
+        self.assertAlmostEqual(summary['p95'], 95.05)
+        self.assertEqual(summary['max'], 100.0)
+        self.assertEqual(summary['count'], 100)
+
+    def test_window(self):
+        stats = RollingStats(10)
+        for value in range(100):
+            stats.add(float(value))
+        summary = stats.get_summary()
+        self.assertAlmostEqual(summary['mean'], 94.5)
+        self.assertEqual(summary['max'], 99.0)
+        self.assertEqual(summary['count'], 100)
+        stats.reset()
+        self.assertEqual(stats.get_count(), 0)
+
+class TestStepTimers(unittest.TestCase):
+
+    def test_lap(self):
+        timers = StepTimers()
+        start = timer()
+        t = timers.lap('first', start)
+        t = timers.lap('second', t)
+        timers.add('first', 1.0)
+        summary = timers.get_summary()
+        self.assertEqual(sorted(summary.keys()), ['first', 'second'])
+        self.assertEqual(summary['first']['count'], 2)
+        self.assertEqual(summary['first']['max'], 1.0)
+        self.assertTrue(summary['second']['max'] >= 0.0)
+        timers.reset()
+        self.assertEqual(timers.get_summary(), {})
+
+class TestDecimatedHistory(unittest.TestCase):
+
+    def test_short(self):
+        history = DecimatedHistory(2, 8)
+        for i in range(5):
+            history.add(0.1*i, [i, -i])
+        times, mins, maxs = history.get()
+        self.assertEqual(history.get_span(), 1)
+        self.assertEqual(mins[:,0].tolist(), [0, 1, 2, 3, 4])
+        self.assertEqual(maxs[:,1].tolist(), [0, -1, -2, -3, -4])
+
+    def test_decimation(self):
+        history = DecimatedHistory(1, 8)
+        for i in range(100):
+            history.add(float(i), [float(i % 10)])
+        times, mins, maxs = history.get()
+        # 100 samples in buckets of 16
+        self.assertEqual(history.get_span(), 16)
+        self.assertEqual(len(times), 7)
+        self.assertEqual(times[0].tolist(), [0.0, 15.0])
+        self.assertEqual(times[-1].tolist(), [96.0, 99.0])
+        self.assertEqual(mins[:,0].tolist(), [0.0]*6 + [6.0])
+        self.assertEqual(maxs[:,0].tolist(), [9.0]*7)
+
+    def test_get_fewer(self):
+        history = DecimatedHistory(1, 16)
+        for i in range(16):
+            history.add(float(i), [float(i)])
+        times, mins, maxs = history.get(3)
+        self.assertEqual(times.tolist(), [[0.0, 4.0], [5.0, 9.0], [10.0, 15.0]])
+        self.assertEqual(mins[:,0].tolist(), [0.0, 5.0, 10.0])
+        self.assertEqual(maxs[:,0].tolist(), [4.0, 9.0, 15.0])
+
+    def test_nan(self):
+        history = DecimatedHistory(2, 4)
+        history.add(0.0, [1.0, np.nan])
+        history.add(1.0, [2.0, 3.0])
+        history.add(2.0, [np.nan, np.nan])
+        history.add(3.0, [4.0, np.nan])
+        history.add(4.0, [5.0, np.nan])
+        times, mins, maxs = history.get()
+        self.assertEqual(mins[:,0].tolist(), [1.0, 4.0, 5.0])
+        self.assertEqual(maxs[:,1].tolist()[0], 3.0)
+        self.assertTrue(np.isnan(maxs[1,1]))
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,95 @@
+import unittest
+import numpy as np
+from helpers import Struct
+from supervisorpool import SupervisorPool, _info_layout, _layout_size, _pack_info, _unpack_info
+
+class CountingRobot(object):
+    def __init__(self, ticks):
+        self.info = Struct()
+        self.info.name = "counter"
+        self.info.ticks = ticks
+        self.info.readings = [ticks, 0.5*ticks]
+
+    def get_info(self):
+        return self.info
+
+class CountingSupervisor(object):
+    """A supervisor with internal state"""
+    def __init__(self):
+        self.total = 0.0
+
+    def execute(self, info, dt):
+        self.total += info.ticks*dt + sum(info.readings)
+        return (self.total, info.ticks)
+
+    def can_sleep(self):
+        return False
+
+    def set_parameters(self, params):
+        self.total = params
+
+    def draw(self, renderer):
+        renderer.draw_line(0, 0, self.total, 0)
+
+class Recorder(object):
+    def __init__(self):
+        self.lines = []
+    def draw_line(self, *args):
+        self.lines.append(args)
+
+class TestSupervisorPool(unittest.TestCase):
+
+    def test_info_roundtrip(self):
+        info = CountingRobot(3).get_info()
+        layout = _info_layout(info)
+        n = _layout_size(layout)
+        self.assertEqual(n, 3)
+        values, integers = np.zeros(n), np.zeros(n)
+        _pack_info(info, layout, values, integers)
+
+        other = CountingRobot(0).get_info()
+        _unpack_info(other, layout, values, integers)
+        self.assertEqual(other.ticks, 3)
+        self.assertTrue(isinstance(other.ticks, int))
+        self.assertEqual(other.readings, [3, 1.5])
+        self.assertTrue(isinstance(other.readings[1], float))
+        self.assertEqual(other.name, "counter")
+
+    def test_info_array(self):
+        info = CountingRobot(3).get_info()
+        info.scan = np.array([1.0, np.inf, 2.5])
+        layout = _info_layout(info)
+        n = _layout_size(layout)
+        self.assertEqual(n, 6)
+        values, integers = np.zeros(n), np.zeros(n)
+        _pack_info(info, layout, values, integers)
+
+        other = CountingRobot(0).get_info()
+        other.scan = np.zeros(3)
+        _unpack_info(other, layout, values, integers)
+        self.assertTrue(isinstance(other.scan, np.ndarray))
+        self.assertTrue(np.array_equal(other.scan, info.scan))
+
+    def test_same_as_serial(self):
+        robots = [CountingRobot(i) for i in range(5)]
+        serial = [CountingSupervisor() for robot in robots]
+        pool = SupervisorPool(robots, [CountingSupervisor() for robot in robots], 2)
+        try:
+            for step in range(10):
+                for robot in robots:
+                    robot.info.ticks += 1
+                    robot.info.readings = [robot.info.ticks, 0.1*step]
+                active = range(step % 2, 5)
+                results = pool.execute(active, 0.02)
+                for i, (inputs, controller, can_sleep) in zip(active, results):
+                    self.assertEqual(inputs, serial[i].execute(robots[i].get_info(), 0.02))
+                    self.assertFalse(can_sleep)
+
+            pool.set_parameters(3, 42.0)
+            serial[3].set_parameters(42.0)
+            recorder = Recorder()
+            pool.draw(recorder)
+            self.assertEqual(sorted(recorder.lines),
+                             sorted((0, 0, s.total, 0) for s in serial))
+        finally:
+            pool.stop()
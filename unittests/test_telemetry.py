@@ -0,0 +1,83 @@
+import unittest
+import os
+import shutil
+import tempfile
+import numpy as np
+from pose import Pose
+from telemetry import TelemetryWriter, TelemetryReader
+
+class FakeSensor(object):
+    def __init__(self, value):
+        self.value = value
+    def reading(self):
+        return self.value
+
+class FakeRobot(object):
+    def __init__(self, sensors):
+        self.pose = Pose(0.0, 0.0, 0.0)
+        self.sensors = [FakeSensor(k) for k in range(sensors)]
+    def get_pose(self):
+        return self.pose
+    def get_wheel_speeds(self):
+        return (1.0, 2.0)
+    def get_external_sensors(self):
+        return self.sensors
+
+class TestTelemetry(unittest.TestCase):
+
+    def setUp(self):
+        self.folder = tempfile.mkdtemp()
+        self.path = os.path.join(self.folder, 'telemetry')
+        self.robots = [FakeRobot(3), FakeRobot(1)]
+
+    def tearDown(self):
+        shutil.rmtree(self.folder)
+
+    def publish(self, writer, steps):
+        for step in steps:
+            self.robots[1].pose = Pose(step, 0.0, 0.5)
+            writer.publish(0.02*step, self.robots)
+
+    def test_read(self):
+        writer = TelemetryWriter(self.path, self.robots, 4)
+        reader = TelemetryReader(self.path)
+        self.assertEqual((reader.robots, reader.sensors, reader.capacity), (2, 3, 4))
+        self.assertEqual(reader.get_sequence(), -1)
+        self.assertEqual(reader.read(), None)
+
+        self.publish(writer, range(3))
+        step = reader.read()
+        self.assertEqual(step['sequence'], 2)
+        self.assertAlmostEqual(step['time'], 0.04)
+        self.assertEqual(step['pose'][1].tolist(), [2.0, 0.0, 0.5])
+        self.assertEqual(step['wheel_speeds'][0].tolist(), [1.0, 2.0])
+        self.assertEqual(step['sensor_readings'][0].tolist(), [0.0, 1.0, 2.0])
+        self.assertEqual(step['sensor_readings'][1,0], 0.0)
+        self.assertTrue(np.isnan(step['sensor_readings'][1,1:]).all())
+        writer.close()
+        reader.close()
+
+    def test_overwritten(self):
+        writer = TelemetryWriter(self.path, self.robots, 4)
+        reader = TelemetryReader(self.path)
+        self.publish(writer, range(10))
+        self.assertEqual(reader.read(2), None)
+        self.assertEqual(reader.read(7)['pose'][1,0], 7.0)
+        self.assertEqual([step['sequence'] for step in reader.read_since(0)],
+                         [6, 7, 8, 9])
+        self.assertEqual([step['sequence'] for step in reader.read_since(8)], [9])
+
+    def test_stale(self):
+        writer = TelemetryWriter(self.path, self.robots, 4)
+        reader = TelemetryReader(self.path)
+        self.publish(writer, range(2))
+        self.assertFalse(reader.is_stale())
+        writer.close()
+        TelemetryWriter(self.path, self.robots[:1], 8)
+        self.assertTrue(reader.is_stale())
+        # the old buffer can still be read
+        self.assertEqual(reader.read()['sequence'], 1)
+        self.assertEqual(TelemetryReader(self.path).robots, 1)
+
+if __name__ == "__main__":
+    unittest.main()